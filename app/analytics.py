@@ -0,0 +1,232 @@
+"""
+Click time series.
+
+Redirects append a row to click_events (batched by the click buffer, off
+the request path). A periodic job folds new events into hourly and daily
+per-code counts and prunes raw events past CLICK_EVENT_RETENTION_DAYS.
+Time-series queries read only the rollup tables.
+
+Events are folded in id order behind a watermark, and the watermark moves
+in the same transaction as the rollup upserts, so each event is counted
+exactly once even if several workers run the job. That relies on no event
+committing below the watermark after it has moved: true on SQLite (one
+writer at a time), not on PostgreSQL, where a transaction can commit after
+one holding higher ids. There the rollup only folds ids that were already
+allocated CLICK_ROLLUP_GRACE_SECONDS ago (see CommitHorizon).
+"""
+import hashlib
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import ClickEvent, ClickRollupDaily, ClickRollupHourly, RollupWatermark
+
+settings = get_settings()
+
+Granularity = Literal["hour", "day"]
+
+ROLLUP_TABLES = {"hour": ClickRollupHourly, "day": ClickRollupDaily}
+BUCKET_WIDTH = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+_WATERMARK = "click_events"
+
+
+def utc_naive(value: datetime) -> datetime:
+    """Datetimes are stored as naive UTC; convert aware values first."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucket_start(value: datetime, granularity: Granularity) -> datetime:
+    value = utc_naive(value).replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0) if granularity == "day" else value
+
+
+def _short_hash(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return hashlib.blake2b(value.encode("utf-8", "replace"), digest_size=8).hexdigest()
+
+
+def click_event(
+    short_code: str, referrer: Optional[str] = None, user_agent: Optional[str] = None
+) -> dict:
+    """A click_events row for a redirect happening now. Referrer and user agent are stored hashed."""
+    return {
+        "short_code": short_code,
+        "occurred_at": utc_naive(datetime.now(timezone.utc)),
+        "referrer_hash": _short_hash(referrer),
+        "user_agent_hash": _short_hash(user_agent),
+    }
+
+
+# ── Rollup job ───────────────────────────────────────────────
+
+
+def add_rollup_counts(db: Session, model, counts: Counter) -> None:
+    """clicks += n for each (short_code, bucket_start), inserting missing buckets."""
+    if not counts:
+        return
+    table = model.__table__
+    rows = [{"short_code": code, "bucket_start": bucket, "clicks": n} for (code, bucket), n in counts.items()]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["short_code", "bucket_start"],
+                set_={"clicks": table.c.clicks + stmt.excluded.clicks},
+            ),
+            rows,
+        )
+        return
+    for row in rows:
+        updated = db.execute(
+            update(table)
+            .where(table.c.short_code == row["short_code"], table.c.bucket_start == row["bucket_start"])
+            .values(clicks=table.c.clicks + row["clicks"])
+        ).rowcount
+        if not updated:
+            db.execute(insert(table).values(**row))
+
+
+def _watermark(db: Session) -> int:
+    last_id = db.scalar(select(RollupWatermark.last_id).where(RollupWatermark.name == _WATERMARK))
+    if last_id is None:
+        db.add(RollupWatermark(name=_WATERMARK, last_id=0))
+        db.commit()
+        return 0
+    return last_id
+
+
+class CommitHorizon:
+    """
+    The highest click_events id that no in-flight transaction can still
+    commit below: the max id as seen at least `grace_seconds` ago. Ids are
+    per database, so there is one horizon per database (shard); each process
+    keeps its own samples, and any of them is a safe bound.
+    """
+
+    def __init__(self, grace_seconds: float):
+        self.grace_seconds = grace_seconds
+        self._seen: deque[tuple[float, int]] = deque()
+
+    def observe(self, max_id: int, now: Optional[float] = None) -> int:
+        """Record the current max id and return the horizon (0 until a sample is old enough)."""
+        now = time.monotonic() if now is None else now
+        self._seen.append((now, max_id))
+        cutoff = now - self.grace_seconds
+        while len(self._seen) > 1 and self._seen[1][0] <= cutoff:
+            self._seen.popleft()
+        seen_at, horizon = self._seen[0]
+        return horizon if seen_at <= cutoff else 0
+
+
+commit_horizons: dict[str, CommitHorizon] = {}  # by database URL
+
+
+def _commit_horizon(db: Session) -> CommitHorizon:
+    key = str(db.get_bind().url)
+    horizon = commit_horizons.get(key)
+    if horizon is None:
+        horizon = commit_horizons.setdefault(key, CommitHorizon(settings.CLICK_ROLLUP_GRACE_SECONDS))
+    return horizon
+
+
+def _ids_commit_in_order(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def _roll_up_batch(db: Session, batch_size: int, horizon: Optional[int] = None) -> int:
+    last_id = _watermark(db)
+    query = select(ClickEvent.id, ClickEvent.short_code, ClickEvent.occurred_at).where(ClickEvent.id > last_id)
+    if horizon is not None:
+        query = query.where(ClickEvent.id <= horizon)
+    events = db.execute(query.order_by(ClickEvent.id).limit(batch_size)).all()
+    if not events:
+        return 0
+
+    hourly: Counter = Counter()
+    daily: Counter = Counter()
+    for _, code, occurred_at in events:
+        hour = bucket_start(occurred_at, "hour")
+        hourly[(code, hour)] += 1
+        daily[(code, hour.replace(hour=0))] += 1
+    add_rollup_counts(db, ClickRollupHourly, hourly)
+    add_rollup_counts(db, ClickRollupDaily, daily)
+
+    moved = db.execute(
+        update(RollupWatermark)
+        .where(RollupWatermark.name == _WATERMARK, RollupWatermark.last_id == last_id)
+        .values(last_id=events[-1].id)
+    ).rowcount
+    if not moved:
+        db.rollback()  # another worker folded this range in first
+        return 0
+    db.commit()
+    return len(events)
+
+
+def roll_up_clicks(db: Session, batch_size: Optional[int] = None) -> int:
+    """
+    Fold every not-yet-counted click event (up to the commit horizon, off
+    SQLite) into the rollups. Returns how many events were folded.
+    """
+    batch_size = batch_size or settings.CLICK_ROLLUP_BATCH_SIZE
+    horizon = None
+    if not _ids_commit_in_order(db):
+        horizon = _commit_horizon(db).observe(db.scalar(select(func.max(ClickEvent.id))) or 0)
+    total = 0
+    while True:
+        folded = _roll_up_batch(db, batch_size, horizon)
+        total += folded
+        if folded < batch_size:
+            return total
+
+
+def prune_click_events(db: Session, retention: Optional[timedelta] = None, now: Optional[datetime] = None) -> int:
+    """Delete rolled-up events older than the retention window. Returns the number deleted."""
+    retention = retention if retention is not None else timedelta(days=settings.CLICK_EVENT_RETENTION_DAYS)
+    cutoff = utc_naive(now or datetime.now(timezone.utc)) - retention
+    deleted = db.execute(
+        delete(ClickEvent).where(ClickEvent.id <= _watermark(db), ClickEvent.occurred_at < cutoff)
+    ).rowcount
+    db.commit()
+    return deleted
+
+
+def run_click_rollup(session_factory) -> None:
+    """Periodic job: roll up new events, then prune old ones."""
+    with session_factory() as db:
+        roll_up_clicks(db)
+        prune_click_events(db)
+
+
+# ── Queries ──────────────────────────────────────────────────
+
+
+def get_click_timeseries(
+    db: Session, short_code: str, granularity: Granularity, start: datetime, end: datetime
+) -> list[tuple[datetime, int]]:
+    """(bucket_start, clicks) for buckets overlapping [start, end), oldest first; empty buckets omitted."""
+    model = ROLLUP_TABLES[granularity]
+    rows = db.execute(
+        select(model.bucket_start, model.clicks)
+        .where(
+            model.short_code == short_code,
+            model.bucket_start >= bucket_start(start, granularity),
+            model.bucket_start < utc_naive(end),
+        )
+        .order_by(model.bucket_start)
+    )
+    return [(bucket, clicks) for bucket, clicks in rows]
@@ -1,25 +1,27 @@
+"""
+JWT sessions and Google sign-in. python-jose is imported on first use, so a
+worker that only serves redirects never loads it (or its crypto backend).
+"""
 from datetime import datetime, timedelta, timezone
 
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-from jose import JWTError, jwt
-
 from app.config import get_settings
+from app.google_keys import google_keys
 
 settings = get_settings()
 
 
+class InvalidToken(ValueError):
+    """A JWT that doesn't verify: bad signature, expired or malformed."""
+
+
 def verify_google_token(token: str) -> dict:
     """
     Verify a Google ID token and return the decoded payload.
     Raises ValueError if the token is invalid or expired.
+    The signature is checked locally against Google's cached signing keys.
     """
     try:
-        payload = id_token.verify_oauth2_token(
-            token,
-            google_requests.Request(),
-            settings.GOOGLE_CLIENT_ID,
-        )
+        payload = google_keys.verify(token, settings.GOOGLE_CLIENT_ID)
         return {
             "email": payload["email"],
             "name": payload.get("name"),
@@ -31,6 +33,8 @@ def verify_google_token(token: str) -> dict:
 
 def create_jwt(user_id: int, email: str) -> str:
     """Create a signed JWT containing the user's id and email."""
+    from jose import jwt
+
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.JWT_EXPIRE_MINUTES)
     payload = {
         "sub": str(user_id),
@@ -43,6 +47,11 @@ def create_jwt(user_id: int, email: str) -> str:
 def decode_jwt(token: str) -> dict:
     """
     Decode and verify a JWT. Returns the payload dict.
-    Raises JWTError on invalid / expired tokens.
+    Raises InvalidToken on invalid / expired tokens.
     """
-    return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError as exc:
+        raise InvalidToken(str(exc)) from exc
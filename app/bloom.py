@@ -0,0 +1,218 @@
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import URL
+from app.sharding import fan_out
+from app.tasks import PeriodicTask
+
+settings = get_settings()
+
+# Ids below the watermark that catch_up() re-reads, for rowids reused after deletes
+CATCH_UP_OVERLAP = 1000
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Sized for `capacity` items at false-positive rate `fp_rate`; uses
+    double hashing on a single blake2b digest to derive the k bit positions.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+
+class ShortCodeFilter:
+    """
+    Process-wide Bloom filter over every urls.short_code.
+
+    A code the filter has never seen definitely doesn't exist, so the
+    redirect path can 404 without a query. Until the first build finishes,
+    every code "might exist" and lookups fall through to the database. The
+    filter is per process: codes created by another worker are folded in by
+    catch_up(), which reads only the urls rows above the highest id already
+    seen, every BLOOM_CATCHUP_INTERVAL_SECONDS; a full rebuild
+    (BLOOM_REBUILD_INTERVAL_SECONDS) resizes the filter and drops deleted codes.
+    """
+
+    def __init__(self, fp_rate: float, min_capacity: int, growth_factor: float):
+        self.fp_rate = fp_rate
+        self.min_capacity = min_capacity
+        self.growth_factor = growth_factor
+        self._filter: Optional[BloomFilter] = None
+        self._lock = threading.Lock()
+        # Codes added recently are replayed into every freshly built filter, so a
+        # row that was flushed but not yet committed when the rebuild scanned
+        # the table is not lost.
+        self._recent: deque[str] = deque(maxlen=100_000)
+        self._task: Optional[PeriodicTask] = None
+        self._catch_up_task: Optional[PeriodicTask] = None
+        # Highest urls.id per shard already in the filter (ids are per shard)
+        self._max_ids: dict[str, int] = {}
+        self.rebuilds = 0
+        self.last_rebuild_seconds: Optional[float] = None
+        self.last_rebuild_at: Optional[float] = None
+        self.negative_hits = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def might_exist(self, short_code: str) -> bool:
+        bloom = self._filter
+        if bloom is None:
+            return True
+        if short_code in bloom:
+            return True
+        self.negative_hits += 1
+        return False
+
+    def add(self, short_code: str) -> None:
+        """Record a newly created code (call before or at commit)."""
+        with self._lock:
+            self._recent.append(short_code)
+            if self._filter is not None:
+                self._filter.add(short_code)
+                overfull = self._filter.count > self._filter.capacity
+            else:
+                overfull = False
+        if overfull and self._task is not None:
+            # Past capacity the false-positive rate climbs; resize.
+            self._task.trigger()
+
+    def rebuild(self, db: Session, batch_size: int = 10_000) -> None:
+        """Build a right-sized filter from a streaming scan of urls.short_code and swap it in."""
+        started = time.perf_counter()
+        max_ids = {
+            str(shard): rows[0][0] or 0
+            for shard, rows in enumerate(fan_out(db, select(func.max(URL.id))))  # in shard order
+        }
+        total = sum(db.scalars(select(func.count()).select_from(URL)))  # one count per shard when sharded
+        bloom = BloomFilter(max(self.min_capacity, int(total * self.growth_factor)), self.fp_rate)
+        rows = db.execute(select(URL.short_code).execution_options(yield_per=batch_size)).scalars()
+        for code in rows:
+            bloom.add(code)
+        with self._lock:
+            for code in self._recent:
+                bloom.add(code)
+            self._filter = bloom
+            self._max_ids = max_ids
+        self.rebuilds += 1
+        self.last_rebuild_seconds = time.perf_counter() - started
+        self.last_rebuild_at = time.time()
+
+    def catch_up(self, db: Session, overlap: int = CATCH_UP_OVERLAP) -> int:
+        """
+        Add the codes of rows inserted since the filter last looked (e.g. by
+        other workers). Returns how many rows were read.
+
+        SQLite gives a new row max(rowid) + 1, so deleting the newest rows
+        frees their ids for reuse; re-reading `overlap` ids below the
+        watermark picks those up (the next full rebuild catches the rest).
+        """
+        if self._filter is None:
+            return 0
+        since = min(self._max_ids.values(), default=0) - overlap
+        per_shard = fan_out(db, select(URL.id, URL.short_code).where(URL.id > since))  # in shard order
+        read = 0
+        with self._lock:
+            bloom = self._filter
+            for shard, rows in enumerate(per_shard):
+                for _, code in rows:
+                    bloom.add(code)
+                if rows:
+                    self._max_ids[str(shard)] = max(row.id for row in rows)
+                read += len(rows)
+        return read
+
+    def start(self, session_factory: Callable[[], Session], interval: float, catch_up_interval: float = 0) -> None:
+        """
+        Build in the background now, then rebuild every `interval` seconds
+        (or when overfull) and catch up every `catch_up_interval` seconds.
+        """
+
+        def _run(method: Callable[[Session], object]) -> Callable[[], None]:
+            def run() -> None:
+                db = session_factory()
+                try:
+                    method(db)
+                finally:
+                    db.close()
+
+            return run
+
+        self._task = PeriodicTask("bloom-rebuild", interval if interval > 0 else None, _run(self.rebuild))
+        self._task.start(run_immediately=True)
+        if catch_up_interval > 0:
+            self._catch_up_task = PeriodicTask("bloom-catch-up", catch_up_interval, _run(self.catch_up))
+            self._catch_up_task.start()
+
+    def stop(self) -> None:
+        for task in (self._task, self._catch_up_task):
+            if task is not None:
+                task.stop()
+        self._task = self._catch_up_task = None
+
+    def reset(self) -> None:
+        """Forget the filter so every code falls through to the database again."""
+        with self._lock:
+            self._filter = None
+            self._recent.clear()
+            self._max_ids = {}
+
+    def stats(self) -> dict:
+        bloom = self._filter
+        return {
+            "ready": bloom is not None,
+            "items": bloom.count if bloom else 0,
+            "capacity": bloom.capacity if bloom else 0,
+            "num_bits": bloom.num_bits if bloom else 0,
+            "num_hashes": bloom.num_hashes if bloom else 0,
+            "memory_bytes": bloom.memory_bytes if bloom else 0,
+            "target_fp_rate": self.fp_rate,
+            "negative_hits": self.negative_hits,
+            "rebuilds": self.rebuilds,
+            "last_rebuild_seconds": self.last_rebuild_seconds,
+            "last_rebuild_at": self.last_rebuild_at,
+        }
+
+
+short_code_filter = ShortCodeFilter(
+    fp_rate=settings.BLOOM_FALSE_POSITIVE_RATE,
+    min_capacity=settings.BLOOM_MIN_CAPACITY,
+    growth_factor=settings.BLOOM_GROWTH_FACTOR,
+)
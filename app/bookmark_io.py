@@ -0,0 +1,179 @@
+"""
+Incremental parsers and encoders for bookmark import/export.
+
+Both formats are handled chunk by chunk, so memory stays bounded by the
+chunk size rather than the size of the file:
+
+- NDJSON: one BookmarkCreate-shaped JSON object per line.
+- Netscape bookmark HTML: the format every browser exports
+  (<DT><A HREF="..." TAGS="a,b">Title</A> followed by an optional <DD> note).
+"""
+import codecs
+import json
+from datetime import timezone
+from html import escape
+from html.parser import HTMLParser
+from typing import Any, AsyncIterator, Iterator, Optional
+
+NETSCAPE_HEADER = (
+    "<!DOCTYPE NETSCAPE-Bookmark-file-1>\n"
+    '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n'
+    "<TITLE>Bookmarks</TITLE>\n"
+    "<H1>Bookmarks</H1>\n"
+    "<DL><p>\n"
+)
+NETSCAPE_FOOTER = "</DL><p>\n"
+
+
+class RecordError(ValueError):
+    """A single record that could not be parsed (reported per line / entry)."""
+
+
+class LineTooLong(ValueError):
+    """An NDJSON line over the length limit: the upload is rejected rather than buffered."""
+
+    def __init__(self, line: int, limit: int):
+        super().__init__(f"line {line} is longer than {limit} characters")
+        self.line = line
+
+
+async def decode_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """UTF-8 decode a byte stream without splitting multi-byte characters."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+class NDJSONParser:
+    """
+    Feed text chunks, get back (line_number, record-or-RecordError) per complete
+    line. A line longer than `max_line_length` raises LineTooLong, so a file
+    without newlines can't grow the buffer without bound.
+    """
+
+    def __init__(self, max_line_length: int = 65_536):
+        self.max_line_length = max_line_length
+        self._buffer = ""
+        self._line = 0
+
+    def feed(self, text: str) -> list[tuple[int, Any]]:
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for offset, line in enumerate([*lines, self._buffer], start=1):
+            if len(line) > self.max_line_length:
+                raise LineTooLong(self._line + offset, self.max_line_length)
+        return [r for r in (self._parse(line) for line in lines) if r is not None]
+
+    def close(self) -> list[tuple[int, Any]]:
+        tail, self._buffer = self._buffer, ""
+        record = self._parse(tail)
+        return [record] if record is not None else []
+
+    def _parse(self, line: str) -> Optional[tuple[int, Any]]:
+        self._line += 1
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return self._line, json.loads(line)
+        except json.JSONDecodeError as exc:
+            return self._line, RecordError(f"invalid JSON: {exc.msg}")
+
+
+class NetscapeParser(HTMLParser):
+    """Feed HTML chunks, get back (entry_number, record) for each completed <A> entry."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._entries = 0
+        self._ready: list[tuple[int, dict]] = []
+        self._current: Optional[dict] = None  # entry whose <A> is open
+        self._last: Optional[dict] = None  # entry that may still get a <DD>
+        self._in_dd = False
+
+    def feed(self, data: str) -> list[tuple[int, dict]]:
+        super().feed(data)
+        return self._drain()
+
+    def close(self) -> list[tuple[int, dict]]:
+        super().close()
+        self._finish_last()
+        return self._drain()
+
+    def _drain(self) -> list[tuple[int, dict]]:
+        ready, self._ready = self._ready, []
+        return ready
+
+    def _finish_last(self) -> None:
+        if self._last is not None:
+            entry = self._last
+            if entry.get("description"):
+                entry["description"] = entry["description"].strip() or None
+            self._entries += 1
+            self._ready.append((self._entries, entry))
+            self._last = None
+        self._in_dd = False
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        if tag == "a":
+            self._finish_last()
+            attributes = {k.lower(): v for k, v in attrs}
+            tags = [t.strip() for t in (attributes.get("tags") or "").split(",") if t.strip()]
+            self._current = {"url": attributes.get("href") or "", "title": "", "tags": tags or None}
+        elif tag == "dd" and self._last is not None:
+            self._in_dd = True
+            self._last["description"] = ""
+        elif tag in ("dt", "dl", "h3"):
+            self._finish_last()
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "a" and self._current is not None:
+            self._current["title"] = self._current["title"].strip() or None
+            self._last, self._current = self._current, None
+        elif tag == "dl":
+            self._finish_last()
+
+    def handle_data(self, data: str) -> None:
+        if self._current is not None:
+            self._current["title"] += data
+        elif self._in_dd and self._last is not None:
+            self._last["description"] += data
+
+
+# ── Export encoders ──────────────────────────────────────────
+
+
+def bookmark_to_dict(bookmark) -> dict:
+    return {
+        "url": bookmark.url,
+        "title": bookmark.title,
+        "description": bookmark.description,
+        "tags": bookmark.tags.split(",") if bookmark.tags else None,
+        "created_at": bookmark.created_at.isoformat() if bookmark.created_at else None,
+    }
+
+
+def encode_ndjson(bookmarks) -> Iterator[bytes]:
+    for bookmark in bookmarks:
+        yield (json.dumps(bookmark_to_dict(bookmark)) + "\n").encode()
+
+
+def encode_netscape(bookmarks) -> Iterator[bytes]:
+    yield NETSCAPE_HEADER.encode()
+    for bookmark in bookmarks:
+        attrs = f'HREF="{escape(bookmark.url)}"'
+        if bookmark.created_at:
+            added = int(bookmark.created_at.replace(tzinfo=timezone.utc).timestamp())
+            attrs += f' ADD_DATE="{added}"'
+        if bookmark.tags:
+            attrs += f' TAGS="{escape(bookmark.tags)}"'
+        line = f"    <DT><A {attrs}>{escape(bookmark.title or '')}</A>\n"
+        if bookmark.description:
+            line += f"    <DD>{escape(bookmark.description)}\n"
+        yield line.encode()
+    yield NETSCAPE_FOOTER.encode()
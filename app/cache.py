@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Hashable, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Returned by TTLCache.get when a key is absent, so that ``None`` can be cached
+# as a legitimate value (e.g. a negative lookup).
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache with per-entry expiry.
+
+    Keeps hit / miss / eviction / expiration counters so callers can
+    check how well the cache is doing.
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Return the cached value for key, or default if absent or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        if self.max_size <= 0:
+            return
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single key (no-op if absent)."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Snapshot of size and counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+@dataclass(frozen=True)
+class ResolvedURL:
+    """Detached, immutable snapshot of the URL columns needed to serve a redirect."""
+    id: int
+    short_code: str
+    original_url: str
+    user_id: Optional[int]
+    created_at: datetime
+    redirect_status: Optional[int] = None
+
+    @classmethod
+    def from_model(cls, db_url) -> "ResolvedURL":
+        return cls(
+            id=db_url.id,
+            short_code=db_url.short_code,
+            original_url=db_url.original_url,
+            user_id=db_url.user_id,
+            created_at=db_url.created_at,
+            redirect_status=db_url.redirect_status,
+        )
+
+
+# short_code -> ResolvedURL (or None for a cached "not found")
+url_cache = TTLCache(
+    max_size=settings.URL_CACHE_MAX_SIZE if settings.URL_CACHE_ENABLED else 0,
+    ttl=settings.URL_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,173 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy import bindparam
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import URL, ClickEvent
+from app.sharding import group_by_shard
+from app.tasks import PeriodicTask
+from app.versions import bump_code_owners
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_urls = URL.__table__
+
+# One statement, executed with executemany for the whole batch.
+_increment_stmt = (
+    _urls.update()
+    .where(_urls.c.short_code == bindparam("b_short_code"))
+    .values(clicks=_urls.c.clicks + bindparam("b_delta"))
+)
+_insert_events_stmt = ClickEvent.__table__.insert()
+
+
+class ClickBuffer:
+    """
+    Write-behind click counter.
+
+    Redirects only bump an in-memory per-code delta; a background task
+    writes all deltas in a single batched UPDATE (one per shard) every
+    CLICK_FLUSH_INTERVAL_SECONDS, or sooner once CLICK_FLUSH_THRESHOLD
+    clicks are pending. `stop()` performs a final flush so a clean
+    shutdown loses nothing.
+
+    Click events (see app.analytics) ride along and are appended to
+    click_events in the same transaction as the counter update.
+    """
+
+    def __init__(self, flush_interval: float, flush_threshold: int, max_pending_events: int = 100_000):
+        self.flush_threshold = flush_threshold
+        self.max_pending_events = max_pending_events
+        self._pending: dict[str, int] = {}
+        self._in_flight: dict[str, int] = {}
+        self._events: list[dict] = []
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._task = PeriodicTask("click-flusher", flush_interval, self._flush_in_background)
+        self.flushes = 0
+        self.flushed_clicks = 0
+        self.flushed_events = 0
+        self.dropped_events = 0
+
+    def add(self, short_code: str, count: int = 1, event: Optional[dict] = None) -> None:
+        """Record `count` clicks for a short code, plus an optional click_events row."""
+        with self._lock:
+            self._pending[short_code] = self._pending.get(short_code, 0) + count
+            self._pending_total += count
+            if event is not None:
+                if len(self._events) < self.max_pending_events:
+                    self._events.append(event)
+                else:
+                    self.dropped_events += 1
+            over_threshold = self._pending_total >= self.flush_threshold
+        if over_threshold:
+            self._task.trigger()
+
+    def pending(self, short_code: str) -> int:
+        """Clicks recorded for a code that are not yet committed to the database."""
+        with self._lock:
+            return self._pending.get(short_code, 0) + self._in_flight.get(short_code, 0)
+
+    def pending_total(self) -> int:
+        with self._lock:
+            return self._pending_total + sum(self._in_flight.values())
+
+    def flush(self, db: Session) -> int:
+        """Write every pending delta with one batched UPDATE. Returns the number of clicks written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending and not self._events:
+                    return 0
+                batch, self._pending, self._pending_total = self._pending, {}, 0
+                events, self._events = self._events, []
+                self._in_flight = batch
+
+            try:
+                for shard_id, deltas in group_by_shard(db, batch.items(), lambda item: item[0]).items():
+                    db.execute(
+                        _increment_stmt,
+                        [{"b_short_code": code, "b_delta": delta} for code, delta in deltas],
+                        bind_arguments={"shard_id": shard_id},
+                    )
+                if batch:
+                    bump_code_owners(db, batch)
+                for shard_id, rows in group_by_shard(db, events, lambda event: event["short_code"]).items():
+                    db.execute(_insert_events_stmt, rows, bind_arguments={"shard_id": shard_id})
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    # Put the deltas and events back so the next flush retries them.
+                    for code, delta in batch.items():
+                        self._pending[code] = self._pending.get(code, 0) + delta
+                        self._pending_total += delta
+                    keep = events[: max(0, self.max_pending_events - len(self._events))]
+                    self._events[:0] = keep
+                    self.dropped_events += len(events) - len(keep)
+                    self._in_flight = {}
+                raise
+
+            with self._lock:
+                self._in_flight = {}
+            written = sum(batch.values())
+            self.flushes += 1
+            self.flushed_clicks += written
+            self.flushed_events += len(events)
+            return written
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        """Start the background flusher, opening a new session per flush."""
+        self._session_factory = session_factory
+        self._task.start()
+
+    def stop(self) -> None:
+        """Stop the background flusher and flush whatever is left."""
+        self._task.stop()
+        if self._session_factory is None:
+            return
+        try:
+            self._flush_with_new_session()
+        except Exception:
+            logger.exception("Final click flush failed; %d clicks were not persisted", self.pending_total())
+
+    def _flush_with_new_session(self) -> int:
+        db = self._session_factory()
+        try:
+            return self.flush(db)
+        finally:
+            db.close()
+
+    def _flush_in_background(self) -> None:
+        if self._session_factory is not None:
+            self._flush_with_new_session()
+
+    def clear(self) -> None:
+        """Drop all pending clicks without writing them (tests only)."""
+        with self._lock:
+            self._pending.clear()
+            self._in_flight.clear()
+            self._events.clear()
+            self._pending_total = 0
+
+    def stats(self) -> dict:
+        return {
+            "pending_clicks": self.pending_total(),
+            "flushes": self.flushes,
+            "flushed_clicks": self.flushed_clicks,
+            "pending_events": len(self._events),
+            "flushed_events": self.flushed_events,
+            "dropped_events": self.dropped_events,
+        }
+
+
+click_buffer = ClickBuffer(
+    flush_interval=settings.CLICK_FLUSH_INTERVAL_SECONDS,
+    flush_threshold=settings.CLICK_FLUSH_THRESHOLD,
+    max_pending_events=settings.CLICK_EVENTS_MAX_PENDING,
+)
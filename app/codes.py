@@ -0,0 +1,184 @@
+import hashlib
+import secrets
+import string
+import threading
+from functools import lru_cache
+from typing import Protocol
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import CodeSequence
+
+settings = get_settings()
+
+ALPHABET = string.ascii_letters + string.digits
+BASE = len(ALPHABET)
+
+
+def encode_base62(value: int, length: int) -> str:
+    """Encode a non-negative integer as a fixed-width base62 string."""
+    chars = []
+    for _ in range(length):
+        value, rem = divmod(value, BASE)
+        chars.append(ALPHABET[rem])
+    if value:
+        raise ValueError("value does not fit in the requested length")
+    return "".join(reversed(chars))
+
+
+class CodeAllocator(Protocol):
+    """Hands out short codes. Codes must be unique without querying the urls table."""
+
+    def allocate(self, db: Session) -> str: ...
+
+    def allocate_many(self, db: Session, count: int) -> list[str]: ...
+
+
+class RandomCodeAllocator:
+    """
+    Random codes from a CSPRNG. Uniqueness is left to the unique index on
+    urls.short_code; callers retry on IntegrityError, which is rare while the
+    table is small compared to 62**length.
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+
+    def allocate(self, db: Session) -> str:
+        return "".join(secrets.choice(ALPHABET) for _ in range(self.length))
+
+    def allocate_many(self, db: Session, count: int) -> list[str]:
+        return [self.allocate(db) for _ in range(count)]
+
+
+class SequenceCodeAllocator:
+    """
+    Collision-free codes from a database sequence.
+
+    Each process reserves a block of `block_size` ids with one UPDATE on
+    code_sequences (committed on its own connection, so a later rollback
+    can't hand the same block out twice). Ids are then put through a keyed
+    Feistel permutation of [0, 62**length) and base62-encoded, so
+    consecutive ids give unrelated-looking codes. A permutation never maps two ids
+    to the same code, so no existence check is needed.
+
+    The key must stay the same once codes have been issued, otherwise new
+    codes can collide with old ones.
+    """
+
+    ROUNDS = 4
+    SEQUENCE_NAME = "urls"
+
+    def __init__(self, length: int, block_size: int, key: str):
+        self.length = length
+        self.block_size = block_size
+        self.space = BASE ** length
+        bits = self.space.bit_length()
+        self._half_bits = (bits + 1) // 2
+        self._half_mask = (1 << self._half_bits) - 1
+        self._key = hashlib.sha256(key.encode()).digest()
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    # ── permutation ──────────────────────────────────────────
+
+    def _round(self, round_no: int, value: int) -> int:
+        digest = hashlib.blake2b(
+            value.to_bytes(8, "big") + bytes([round_no]), key=self._key, digest_size=8
+        ).digest()
+        return int.from_bytes(digest, "big") & self._half_mask
+
+    def _feistel(self, value: int) -> int:
+        left, right = value >> self._half_bits, value & self._half_mask
+        for round_no in range(self.ROUNDS):
+            left, right = right, left ^ self._round(round_no, right)
+        return (left << self._half_bits) | right
+
+    def scramble(self, value: int) -> int:
+        """Bijective map of [0, 62**length) onto itself (cycle-walking Feistel)."""
+        if not 0 <= value < self.space:
+            raise ValueError("sequence value out of range")
+        value = self._feistel(value)
+        while value >= self.space:
+            value = self._feistel(value)
+        return value
+
+    def code_for(self, value: int) -> str:
+        return encode_base62(self.scramble(value), self.length)
+
+    # ── sequence blocks ──────────────────────────────────────
+
+    def _reserve_block(self, db: Session, size: int) -> int:
+        """Reserve `size` ids; returns the first one."""
+        table = CodeSequence.__table__
+        with db.get_bind().begin() as conn:
+            bumped = conn.execute(
+                update(table)
+                .where(table.c.name == self.SEQUENCE_NAME)
+                .values(next_value=table.c.next_value + size)
+            ).rowcount
+            if not bumped:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(table.insert().values(name=self.SEQUENCE_NAME, next_value=size))
+                    return 0
+                except IntegrityError:
+                    # Another process created the row first.
+                    conn.execute(
+                        update(table)
+                        .where(table.c.name == self.SEQUENCE_NAME)
+                        .values(next_value=table.c.next_value + size)
+                    )
+            end = conn.execute(
+                select(table.c.next_value).where(table.c.name == self.SEQUENCE_NAME)
+            ).scalar_one()
+        if end > self.space:
+            raise RuntimeError("short code space exhausted; increase SHORT_CODE_LENGTH")
+        return end - size
+
+    def allocate(self, db: Session) -> str:
+        return self.allocate_many(db, 1)[0]
+
+    def allocate_many(self, db: Session, count: int) -> list[str]:
+        ids: list[int] = []
+        while len(ids) < count:
+            with self._lock:
+                take = min(count - len(ids), self._end - self._next)
+                if take > 0:
+                    ids.extend(range(self._next, self._next + take))
+                    self._next += take
+                    continue
+            # Reserve outside the lock: the round-trip may yield to other
+            # coroutines (async sessions) that need the lock meanwhile.
+            size = max(self.block_size, count - len(ids))
+            start = self._reserve_block(db, size)
+            take = count - len(ids)
+            ids.extend(range(start, start + take))
+            with self._lock:
+                if self._next >= self._end:
+                    self._next, self._end = start + take, start + size
+                # else someone else refilled first; the rest of our block is simply skipped
+        return [self.code_for(i) for i in ids]
+
+    def reset(self) -> None:
+        """Forget the in-process block (e.g. after the database was recreated)."""
+        with self._lock:
+            self._next = self._end = 0
+
+
+@lru_cache
+def get_code_allocator() -> CodeAllocator:
+    """The allocator selected by SHORT_CODE_ALLOCATOR ("sequence" or "random")."""
+    if settings.SHORT_CODE_ALLOCATOR == "random":
+        return RandomCodeAllocator(settings.SHORT_CODE_LENGTH)
+    if settings.SHORT_CODE_ALLOCATOR == "sequence":
+        return SequenceCodeAllocator(
+            settings.SHORT_CODE_LENGTH,
+            settings.SHORT_CODE_BLOCK_SIZE,
+            settings.SHORT_CODE_SCRAMBLE_KEY,
+        )
+    raise ValueError(f"Unknown SHORT_CODE_ALLOCATOR: {settings.SHORT_CODE_ALLOCATOR!r}")
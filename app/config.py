@@ -6,17 +6,124 @@ class Settings(BaseSettings):
     """Application settings loaded from environment variables / .env file."""
 
     DATABASE_URL: str = "sqlite:///./url_shortener.db"
+    DB_MODE: str = "sync"  # "sync" (threadpool handlers) or "async" (AsyncSession on the URL routes)
+    ASYNC_DATABASE_URL: str = ""  # derived from DATABASE_URL when empty
+
+    # Connection pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+
+    # SQLite storage profile (PRAGMAs applied to every new connection)
+    SQLITE_JOURNAL_MODE: str = "WAL"  # readers no longer block behind the writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # durable at checkpoints; safe with WAL
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # wait for the write lock instead of failing
+    SQLITE_CACHE_SIZE: int = -20000  # negative = KiB, i.e. 20 MB page cache per connection
+    SQLITE_MMAP_SIZE: int = 268_435_456  # 256 MB
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_MAINTENANCE_INTERVAL_SECONDS: float = 300.0  # WAL checkpoint + PRAGMA optimize; 0 disables
+
+    # Hash sharding (app.sharding): URLs by short_code, bookmarks by user_id; 1 = a single database
+    SHARD_COUNT: int = 1
+    SHARD_DATABASE_URLS: str = ""  # shards 1..N-1, comma-separated; empty = <name>.shard<i>.db next to DATABASE_URL
+
+    # Read replica for the read-only routes (app.replica): "off", "readonly", "backup" or "url"
+    READ_REPLICA_MODE: str = "off"
+    READ_DATABASE_URL: str = ""  # "url": the replica; "backup": where the copy goes (default <name>.replica.db)
+    READ_REPLICA_MAX_LAG_SECONDS: float = 5.0  # staler replicas are skipped; "backup" refreshes twice per interval
+
     FRONTEND_URL: str = "http://localhost:3000"
     SHORT_CODE_LENGTH: int = 6
+    SHORT_CODE_ALLOCATOR: str = "sequence"  # "sequence" (collision-free) or "random"
+    SHORT_CODE_BLOCK_SIZE: int = 100  # ids reserved per database round-trip
+    SHORT_CODE_SCRAMBLE_KEY: str = "change-me-in-production"  # never change once codes are issued
+    SHORTEN_BATCH_MAX_SIZE: int = 1000
+    URL_DEDUP_DEFAULT: bool = False  # reuse the caller's existing code for the same URL unless the request says otherwise
+
+    # Direct redirects (GET /r/{short_code})
+    REDIRECT_DEFAULT_STATUS: int = 302  # for links created without a redirect_status
+    REDIRECT_PERMANENT_CACHE_CONTROL: str = "public, max-age=86400"  # 301/308: cacheable; cached hits aren't counted
+    REDIRECT_TEMPORARY_CACHE_CONTROL: str = "no-cache"  # 302/307: caches must revalidate, so every hit is counted
+
+    # List endpoints (/my-urls, /bookmarks) are cursor-paginated
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 1000
+    STREAM_BATCH_SIZE: int = 1000  # ?stream=true: rows fetched per cursor batch and per written chunk
+    FAST_SERIALIZATION: bool = True  # list endpoints: rows straight to JSON bytes (app.serialization), no pydantic
 
     # Google OAuth2
     GOOGLE_CLIENT_ID: str = ""
+    GOOGLE_JWKS_URL: str = "https://www.googleapis.com/oauth2/v3/certs"
+    GOOGLE_JWKS_DEFAULT_TTL_SECONDS: float = 3600.0  # when the response has no usable max-age
+    GOOGLE_JWKS_MIN_TTL_SECONDS: float = 60.0
+    GOOGLE_JWKS_MAX_TTL_SECONDS: float = 86_400.0
+    GOOGLE_JWKS_REFRESH_MARGIN_SECONDS: float = 300.0  # refresh this long before the keys expire
+    GOOGLE_JWKS_CHECK_INTERVAL_SECONDS: float = 60.0  # how often the background refresher wakes up
+    GOOGLE_JWKS_UNKNOWN_KID_COOLDOWN_SECONDS: float = 30.0  # min gap between refetches for unknown key ids
+    GOOGLE_JWKS_HTTP_TIMEOUT_SECONDS: float = 5.0
 
     # JWT
     JWT_SECRET_KEY: str = "change-me-in-production"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE_MINUTES: int = 1440  # 24 hours
 
+    # Short-code resolution cache (redirect path)
+    URL_CACHE_ENABLED: bool = True
+    URL_CACHE_MAX_SIZE: int = 10_000
+    URL_CACHE_TTL_SECONDS: float = 300.0
+    URL_CACHE_NEGATIVE_TTL_SECONDS: float = 5.0  # how long a "not found" is remembered
+
+    # Authenticated-principal cache (verified JWT claims + user snapshot)
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0  # never longer than the token's own exp
+
+    # Bookmark search
+    BOOKMARK_FTS_ENABLED: bool = True  # SQLite FTS5 index; falls back to LIKE scans when off/unavailable
+
+    # Bookmark import/export
+    BOOKMARK_IMPORT_CHUNK_SIZE: int = 500  # rows per insert transaction
+    BOOKMARK_IMPORT_MAX_ERRORS: int = 50  # per-record errors echoed back in the response
+    BOOKMARK_IMPORT_MAX_LINE_LENGTH: int = 65_536  # characters per NDJSON line; a longer one fails the import (413)
+
+    # Bloom filter over existing short codes (404 unknown codes without a query)
+    BLOOM_FILTER_ENABLED: bool = True
+    BLOOM_FALSE_POSITIVE_RATE: float = 0.001
+    BLOOM_MIN_CAPACITY: int = 100_000
+    BLOOM_GROWTH_FACTOR: float = 2.0  # capacity headroom over the row count at build time
+    BLOOM_REBUILD_INTERVAL_SECONDS: float = 3600.0  # full rebuild (resize, drop deleted codes); 0 disables
+    BLOOM_CATCHUP_INTERVAL_SECONDS: float = 5.0  # fold in codes created by other workers; 0 disables
+
+    # Write-behind click counting
+    CLICK_BUFFER_ENABLED: bool = True
+    CLICK_FLUSH_INTERVAL_SECONDS: float = 2.0
+    CLICK_FLUSH_THRESHOLD: int = 1000  # flush early once this many clicks are pending
+
+    # Click event log and time-series rollups
+    CLICK_EVENTS_ENABLED: bool = True
+    CLICK_EVENTS_MAX_PENDING: int = 100_000  # buffered events beyond this are dropped (counters still count)
+    CLICK_ROLLUP_INTERVAL_SECONDS: float = 60.0  # 0 disables the background rollup job
+    CLICK_ROLLUP_BATCH_SIZE: int = 50_000
+    CLICK_ROLLUP_GRACE_SECONDS: float = 30.0  # non-SQLite: only fold event ids allocated at least this long ago
+    CLICK_EVENT_RETENTION_DAYS: float = 30.0  # raw events older than this are pruned once rolled up
+    CLICK_TIMESERIES_MAX_POINTS: int = 1000
+
+    # Prometheus /metrics: per-route latency, SQL statement timing, pool waits, cache hit ratios
+    METRICS_ENABLED: bool = True
+
+    # /stats/* (cache and filter internals) answer only "X-Admin-Token: <token>"; empty: they 404
+    STATS_ADMIN_TOKEN: str = ""
+
+    # On-demand request profiling (nothing is installed unless PROFILING_ENABLED)
+    PROFILING_ENABLED: bool = False
+    PROFILING_MODE: str = "sampling"  # "sampling" (collapsed stacks) or "cprofile" (deterministic, slower)
+    PROFILING_SAMPLE_RATE: float = 0.0  # fraction of requests to PROFILING_ROUTES profiled automatically
+    PROFILING_ROUTES: str = ""  # comma-separated endpoint names, e.g. "redirect_to_url,list_bookmarks"; empty = all
+    PROFILING_ADMIN_TOKEN: str = ""  # "X-Profile: <token>" profiles that request; empty disables the header
+    PROFILING_SAMPLE_INTERVAL_MS: float = 1.0
+    PROFILING_DIR: str = "./profiles"
+    PROFILING_MAX_PROFILES: int = 200  # ring buffer: older profiles are deleted
+
     class Config:
         env_file = ".env"
 
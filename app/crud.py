@@ -1,62 +1,372 @@
-import string
-import random
-from typing import Optional
+import secrets
+from itertools import islice
+from typing import Iterable, Iterator, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app.models import URL, Bookmark
+from sqlalchemy import Select, bindparam, or_, event, inspect, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.horizontal_shard import set_shard_id
+from app.models import URL, Bookmark, ClickEvent, get_utcnow
 from app.schemas import URLCreate, BookmarkCreate, BookmarkUpdate
 from app.config import get_settings
+from app.cache import url_cache, ResolvedURL, MISSING
+from app.bloom import short_code_filter
+from app.clicks import click_buffer
+from app.analytics import click_event
+from app.codes import ALPHABET, get_code_allocator
+from app.dedup import url_hash
+from app import fts
+from app import tags as tag_store
+from app.pagination import SortKey, page_query, finish_page, merge_pages
+from app.sharding import ShardedSession, code_shard, fan_out, group_by_shard, pinned, user_shard
+from app.versions import bump_code_owners, bump_user
 
 
 settings = get_settings()
 
+# Only legacy rows (random codes issued before the sequence allocator) can
+# collide with an allocated code, so a handful of retries is plenty.
+MAX_CODE_ATTEMPTS = 5
+
+# 1000 rows x 5 columns stays well below SQLite's bound-parameter limit.
+BATCH_INSERT_ROWS = 1000
+
 
 def generate_short_code(length: int) -> str:
     """Generate a random string of fixed length."""
-    chars = string.ascii_letters + string.digits
-    return "".join(random.choice(chars) for _ in range(length))
+    return "".join(secrets.choice(ALPHABET) for _ in range(length))
+
+
+def wants_dedupe(url: URLCreate) -> bool:
+    return settings.URL_DEDUP_DEFAULT if url.dedupe is None else url.dedupe
+
+
+DedupeKey = tuple[str, Optional[int]]  # (url_hash, redirect_status)
+
+
+def find_existing_urls(db: Session, user_id: Optional[int], hashes: Iterable[str]) -> dict[DedupeKey, URL]:
+    """
+    The oldest URL per (url_hash, redirect_status) owned by user_id (None:
+    anonymous links), via ix_urls_user_id_url_hash. A link is only reused
+    for a request asking for the same redirect status.
+    """
+    hashes = list(hashes)
+    found: dict[DedupeKey, URL] = {}
+    for start in range(0, len(hashes), BATCH_INSERT_ROWS):
+        chunk = hashes[start:start + BATCH_INSERT_ROWS]
+        query = select(URL).where(URL.user_id == user_id, URL.url_hash.in_(chunk)).order_by(URL.id)
+        for db_url in db.scalars(query):
+            found.setdefault((db_url.url_hash, db_url.redirect_status), db_url)
+    return found
 
 
 def create_short_url(db: Session, url: URLCreate, user_id: Optional[int] = None) -> URL:
-    """Create a new shortened URL in the database."""
+    """
+    Create a new shortened URL in the database. With dedupe (per request,
+    or URL_DEDUP_DEFAULT) the caller's existing URL for the same canonical
+    link and redirect status is returned instead.
+    """
     # Handle the HttpUrl from Pydantic which is an object in v2
     original_url_str = str(url.original_url)
-    
-    # Generate a unique code
+    digest = url_hash(original_url_str)
+    if wants_dedupe(url):
+        existing = find_existing_urls(db, user_id, [digest]).get((digest, url.redirect_status))
+        if existing is not None:
+            return existing
+    allocator = get_code_allocator()
+
+    for _ in range(MAX_CODE_ATTEMPTS):
+        db_url = URL(
+            short_code=allocator.allocate(db),
+            original_url=original_url_str,
+            user_id=user_id,
+            url_hash=digest,
+            redirect_status=url.redirect_status,
+        )
+        db.add(db_url)
+        if user_id is not None:
+            db.execute(bump_user(user_id))
+        try:
+            db.commit()
+        except IntegrityError:
+            # The unique index caught a collision with a pre-existing code
+            db.rollback()
+            continue
+        db.refresh(db_url)
+        return db_url
+
+    raise RuntimeError("Could not allocate a unique short code")
+
+
+def create_short_urls(db: Session, urls: list[URLCreate], user_id: Optional[int] = None) -> list[URL]:
+    """
+    Create many shortened URLs in one transaction.
+
+    Codes are allocated in bulk and the rows written with multi-row INSERTs
+    (BATCH_INSERT_ROWS per statement). Returns URL objects in input order:
+    transient ones for new rows, persistent ones for items answered by an
+    existing URL (dedupe). Repeats of a deduped link within the batch share
+    one new row.
+    """
+    if not urls:
+        return []
+    keys = [(url_hash(str(url.original_url)), url.redirect_status) for url in urls]
+    deduped = {digest for (digest, _), url in zip(keys, urls) if wants_dedupe(url)}
+    existing = find_existing_urls(db, user_id, deduped) if deduped else {}
+
+    results: list[Optional[URL]] = [None] * len(urls)
+    first_new: dict[DedupeKey, int] = {}
+    new_indexes: list[int] = []
+    for i, (key, url) in enumerate(zip(keys, urls)):
+        if wants_dedupe(url):
+            if key in existing:
+                results[i] = existing[key]
+                continue
+            if key in first_new:
+                continue
+            first_new[key] = i
+        new_indexes.append(i)
+
+    if new_indexes:
+        for i, db_url in zip(new_indexes, _insert_short_urls(db, [urls[i] for i in new_indexes], user_id)):
+            results[i] = db_url
+    for i, key in enumerate(keys):
+        if results[i] is None:
+            results[i] = results[first_new[key]]
+    return results
+
+
+def _insert_short_urls(db: Session, urls: list[URLCreate], user_id: Optional[int]) -> list[URL]:
+    allocator = get_code_allocator()
+    # Naive UTC, as a DateTime column hands it back: the returned rows are not
+    # re-read, and must serialize like a URL loaded from the database
+    created_at = get_utcnow().replace(tzinfo=None)
+
+    for _ in range(MAX_CODE_ATTEMPTS):
+        codes = allocator.allocate_many(db, len(urls))
+        rows = [
+            {
+                "short_code": code,
+                "original_url": str(url.original_url),
+                "user_id": user_id,
+                "url_hash": url_hash(str(url.original_url)),
+                "redirect_status": url.redirect_status,
+                "clicks": 0,
+                "created_at": created_at,
+            }
+            for code, url in zip(codes, urls)
+        ]
+        for code in codes:
+            short_code_filter.add(code)
+        try:
+            for shard_id, shard_rows in group_by_shard(db, rows, lambda row: row["short_code"]).items():
+                for start in range(0, len(shard_rows), BATCH_INSERT_ROWS):
+                    db.execute(
+                        insert(URL).values(shard_rows[start:start + BATCH_INSERT_ROWS]),
+                        bind_arguments={"shard_id": shard_id},
+                    )
+            if user_id is not None:
+                db.execute(bump_user(user_id))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            continue
+        for code in codes:
+            url_cache.invalidate(code)  # drop any cached "not found"
+        return [URL(**row) for row in rows]
+
+    raise RuntimeError("Could not allocate unique short codes")
+
+
+def backfill_url_hashes(db: Session, batch_size: int = 1000) -> int:
+    """Fill url_hash for rows created before dedupe existed. Returns how many rows were updated."""
+    updated = 0
+    last_id = 0
+    table = URL.__table__
     while True:
-        code = generate_short_code(settings.SHORT_CODE_LENGTH)
-        # Check if it already exists (collision)
-        existing = db.query(URL).filter(URL.short_code == code).first()
-        if not existing:
-            break
-
-    db_url = URL(
-        short_code=code,
-        original_url=original_url_str,
-        user_id=user_id,
-    )
-    db.add(db_url)
-    db.commit()
-    db.refresh(db_url)
+        rows = db.execute(
+            select(URL.id, URL.original_url)
+            .where(URL.id > last_id, URL.url_hash.is_(None))
+            .order_by(URL.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        db.execute(
+            table.update().where(table.c.id == bindparam("b_id")).values(url_hash=bindparam("b_hash")),
+            [{"b_id": row.id, "b_hash": url_hash(row.original_url)} for row in rows],
+        )
+        db.commit()
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+def get_url_by_code(db: Session, short_code: str, primary: Optional[Session] = None) -> Optional[URL]:
+    """
+    Retrieve a URL by its short code. When `db` is a read replica, a miss
+    there is checked on `primary`: a link created since the last refresh
+    must not 404.
+    """
+    db_url = db.query(URL).filter(URL.short_code == short_code).first()
+    if db_url is None and primary is not None and primary is not db:
+        db_url = primary.query(URL).filter(URL.short_code == short_code).first()
     return db_url
 
 
-def get_url_by_code(db: Session, short_code: str) -> Optional[URL]:
-    """Retrieve a URL by its short code."""
-    return db.query(URL).filter(URL.short_code == short_code).first()
+def resolve_url(db: Session, short_code: str, primary: Optional[Session] = None) -> Optional[ResolvedURL]:
+    """
+    Cached variant of get_url_by_code for the redirect path.
+    Misses are cached too (for URL_CACHE_NEGATIVE_TTL_SECONDS) so that
+    repeated lookups of unknown codes don't hit the database either.
+    `primary` as for get_url_by_code.
+    """
+    cached = url_cache.get(short_code)
+    if cached is not MISSING:
+        return cached
+
+    if not short_code_filter.might_exist(short_code):
+        return None
+
+    db_url = get_url_by_code(db, short_code, primary)
+    if db_url is None:
+        url_cache.set(short_code, None, ttl=settings.URL_CACHE_NEGATIVE_TTL_SECONDS)
+        return None
+
+    resolved = ResolvedURL.from_model(db_url)
+    url_cache.set(short_code, resolved)
+    return resolved
 
 
 def increment_clicks(db: Session, db_url: URL) -> URL:
     """Increment the click counter for a URL."""
     db_url.clicks += 1
+    if db_url.user_id is not None:
+        db.execute(bump_user(db_url.user_id))
     db.commit()
     db.refresh(db_url)
     return db_url
 
 
+def record_click(
+    db: Session, short_code: str, referrer: Optional[str] = None, user_agent: Optional[str] = None
+) -> None:
+    """
+    Count a click and log a click event (CLICK_EVENTS_ENABLED). Buffered in
+    memory and flushed in batches when CLICK_BUFFER_ENABLED, otherwise
+    written through.
+    """
+    event = click_event(short_code, referrer, user_agent) if settings.CLICK_EVENTS_ENABLED else None
+    if settings.CLICK_BUFFER_ENABLED:
+        click_buffer.add(short_code, event=event)
+        return
+    with pinned(db, code_shard(db, short_code)):
+        db.query(URL).filter(URL.short_code == short_code).update(
+            {URL.clicks: URL.clicks + 1}, synchronize_session=False
+        )
+        if event is not None:
+            db.execute(ClickEvent.__table__.insert(), [event])
+        bump_code_owners(db, [short_code])
+        db.commit()
+
+
+def get_click_count(db_url: URL) -> int:
+    """Persisted click count plus clicks still waiting in the write-behind buffer."""
+    return (db_url.clicks or 0) + click_buffer.pending(db_url.short_code)
+
+
+# Newest first; id breaks ties. Matches the (user_id, created_at, id) indexes.
+URL_SORT_KEYS: list[SortKey] = [(URL.created_at, True), (URL.id, True)]
+BOOKMARK_SORT_KEYS: list[SortKey] = [(Bookmark.created_at, True), (Bookmark.id, True)]
+
+
+def get_urls_page(
+    db: Session, user_id: int, limit: Optional[int] = None, cursor: Optional[str] = None
+) -> tuple[list[URL], Optional[str]]:
+    """
+    One page of a user's URLs, newest first, plus the cursor for the next page (None on the last).
+    Sharded, every shard returns its own first page in parallel and the pages are merged.
+    """
+    stmt = page_query(select(URL).where(URL.user_id == user_id), URL_SORT_KEYS, limit, cursor)
+    rows = merge_pages(fan_out(db, stmt), URL_SORT_KEYS)
+    return finish_page(list(islice(rows, limit + 1)) if limit is not None else list(rows), limit)
+
+
+def stream_urls(
+    db: Session, user_id: int, cursor: Optional[str] = None, batch_size: Optional[int] = None
+) -> Iterator[URL]:
+    """
+    All of a user's URLs in page order (from `cursor` on), read through a
+    server-side cursor (one per shard). Not a generator itself: a bad cursor
+    raises InvalidCursor here, before a streaming response has started.
+    """
+    stmt = page_query(select(URL).where(URL.user_id == user_id), URL_SORT_KEYS, None, cursor)
+    return _stream_urls(db, stmt.execution_options(yield_per=batch_size or settings.STREAM_BATCH_SIZE))
+
+
+def _stream_urls(db: Session, stmt) -> Iterator[URL]:
+    if not isinstance(db, ShardedSession):
+        yield from db.scalars(stmt)
+        return
+    streams = [db.execute(stmt.options(set_shard_id(shard_id))) for shard_id in db.shard_ids]
+    for row in merge_pages(streams, URL_SORT_KEYS):
+        yield row[0]
+
+
 def get_urls_by_user(db: Session, user_id: int) -> list[URL]:
     """List all shortened URLs owned by a user."""
-    return db.query(URL).filter(URL.user_id == user_id).order_by(URL.created_at.desc()).all()
+    return get_urls_page(db, user_id)[0]
+
+
+# ── Resolution cache invalidation ────────────────────────────
+# Codes touched by a flush are collected on the session and only dropped from
+# the cache once the transaction commits, so a concurrent reader can't
+# re-populate the cache with the old row in between.
+
+
+def _mark_url_dirty(session: Session, short_code: str) -> None:
+    session.info.setdefault("dirty_short_codes", set()).add(short_code)
+
+
+@event.listens_for(URL, "after_insert")
+def _url_inserted(mapper, connection, target: URL) -> None:
+    # Added to the Bloom filter right away: a false positive after a rollback
+    # is harmless, a missing code would 404 a valid link.
+    short_code_filter.add(target.short_code)
+    session = inspect(target).session
+    if session is not None:
+        _mark_url_dirty(session, target.short_code)
+
+
+@event.listens_for(URL, "after_delete")
+def _url_deleted(mapper, connection, target: URL) -> None:
+    session = inspect(target).session
+    if session is not None:
+        _mark_url_dirty(session, target.short_code)
+
+
+@event.listens_for(URL, "after_update")
+def _url_updated(mapper, connection, target: URL) -> None:
+    state = inspect(target)
+    if state.session is None:
+        return
+    if not any(state.attrs[a].history.has_changes() for a in ("short_code", "original_url", "user_id")):
+        return  # e.g. a clicks-only update: the cached snapshot is still valid
+    if state.attrs.short_code.history.has_changes():
+        short_code_filter.add(target.short_code)
+    for code in (*state.attrs.short_code.history.deleted, target.short_code):
+        _mark_url_dirty(state.session, code)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_urls(session: Session) -> None:
+    codes = session.info.pop("dirty_short_codes", None)
+    if codes:
+        for code in codes:
+            url_cache.invalidate(code)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty_urls(session: Session) -> None:
+    session.info.pop("dirty_short_codes", None)
 
 
 # ── Bookmark CRUD ────────────────────────────────────────────
@@ -72,60 +382,202 @@ def create_bookmark(db: Session, user_id: int, data: BookmarkCreate) -> Bookmark
         description=data.description,
         tags=tags_str,
     )
-    db.add(bookmark)
-    db.commit()
-    db.refresh(bookmark)
+    with pinned(db, user_shard(db, user_id)):
+        db.add(bookmark)
+        db.flush()
+        tag_names = tag_store.normalize_tags(data.tags)
+        if tag_names:
+            tag_store.link_tags(db, user_id, {bookmark.id: tag_names})
+        db.execute(bump_user(user_id))
+        db.commit()
+        db.refresh(bookmark)
     return bookmark
 
 
-def get_bookmarks(
+def bulk_create_bookmarks(db: Session, user_id: int, items: list[BookmarkCreate]) -> int:
+    """Insert many bookmarks for a user in one transaction (executemany). Returns the count."""
+    if not items:
+        return 0
+    with pinned(db, user_shard(db, user_id)):
+        return _insert_bookmarks(db, user_id, items)
+
+
+def _insert_bookmarks(db: Session, user_id: int, items: list[BookmarkCreate]) -> int:
+    created_at = get_utcnow()
+    # Core insert: the ORM's bulk insert can't route rows on a sharded session
+    bookmarks = Bookmark.__table__
+    ids = db.scalars(
+        bookmarks.insert().returning(bookmarks.c.id, sort_by_parameter_order=True),
+        [
+            {
+                "user_id": user_id,
+                "url": data.url,
+                "title": data.title,
+                "description": data.description,
+                "tags": ",".join(data.tags) if data.tags else None,
+                "created_at": created_at,
+            }
+            for data in items
+        ],
+    ).all()
+    names_by_bookmark = {
+        bookmark_id: names
+        for bookmark_id, data in zip(ids, items)
+        if (names := tag_store.normalize_tags(data.tags))
+    }
+    tag_store.link_tags(db, user_id, names_by_bookmark)
+    db.execute(bump_user(user_id))
+    db.commit()
+    return len(items)
+
+
+def iter_bookmarks(db: Session, user_id: int, batch_size: int = 1000) -> Iterator[Bookmark]:
+    """Stream a user's bookmarks (oldest first) with a server-side cursor instead of .all()."""
+    query = (
+        select(Bookmark)
+        .where(Bookmark.user_id == user_id)
+        .order_by(Bookmark.id)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.scalars(query)
+
+
+def _bookmarks_query(
     db: Session,
     user_id: int,
-    search: Optional[str] = None,
-    tag: Optional[str] = None,
-) -> list[Bookmark]:
-    """List bookmarks for a user, optionally filtered by search keyword or tag."""
-    query = db.query(Bookmark).filter(Bookmark.user_id == user_id)
+    search: Optional[str],
+    tag: Optional[str],
+    tags: Optional[list[str]],
+    match_all_tags: bool,
+) -> tuple[Select, list]:
+    """The filtered bookmark select and its sort keys (rank first when searching with FTS)."""
+    stmt = select(Bookmark).where(Bookmark.user_id == user_id)
+    sort_keys = list(BOOKMARK_SORT_KEYS)
 
     if search:
-        pattern = f"%{search}%"
-        query = query.filter(
-            or_(
-                Bookmark.title.ilike(pattern),
-                Bookmark.url.ilike(pattern),
-                Bookmark.description.ilike(pattern),
+        match = fts.build_match_query(search) if fts.fts_enabled(db.get_bind()) else None
+        if match:
+            stmt = stmt.join(fts.fts_table, fts.fts_table.c.rowid == Bookmark.id).where(
+                fts.match_clause(match)
+            )
+            sort_keys.insert(0, (fts.rank_expression(), False))
+        else:
+            pattern = f"%{search}%"
+            stmt = stmt.where(
+                or_(
+                    Bookmark.title.ilike(pattern),
+                    Bookmark.url.ilike(pattern),
+                    Bookmark.description.ilike(pattern),
+                )
             )
+
+    tag_names = tag_store.normalize_tags([tag] if tag else []) + tag_store.normalize_tags(tags)
+    if tag_names:
+        tag_names = list(dict.fromkeys(tag_names))
+        stmt = stmt.where(
+            Bookmark.id.in_(tag_store.tagged_bookmark_ids(user_id, tag_names, match_all_tags))
         )
+    return stmt, sort_keys
 
-    if tag:
-        # Match tag in comma-separated string
-        query = query.filter(Bookmark.tags.ilike(f"%{tag}%"))
 
-    return query.order_by(Bookmark.created_at.desc()).all()
+def get_bookmarks_page(
+    db: Session,
+    user_id: int,
+    search: Optional[str] = None,
+    tag: Optional[str] = None,
+    tags: Optional[list[str]] = None,
+    match_all_tags: bool = True,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> tuple[list[Bookmark], Optional[str]]:
+    """
+    One page of a user's bookmarks plus the cursor for the next page (None on the last).
+
+    Optionally filtered by search keyword or tags. Searches use the FTS5
+    index (BM25-ranked, prefix matching) when available. `tag` and `tags`
+    are combined; bookmarks must carry all of them, or any of them with
+    match_all_tags=False.
+    """
+    stmt, sort_keys = _bookmarks_query(db, user_id, search, tag, tags, match_all_tags)
+    stmt = page_query(stmt, sort_keys, limit, cursor)
+    return finish_page(db.execute(stmt).all(), limit)
+
+
+def stream_bookmarks(
+    db: Session,
+    user_id: int,
+    search: Optional[str] = None,
+    tag: Optional[str] = None,
+    tags: Optional[list[str]] = None,
+    match_all_tags: bool = True,
+    cursor: Optional[str] = None,
+    batch_size: Optional[int] = None,
+) -> Iterator[Bookmark]:
+    """
+    Every bookmark get_bookmarks_page would page through (from `cursor` on),
+    via a server-side cursor. The cursor is decoded eagerly, as in stream_urls.
+    """
+    stmt, sort_keys = _bookmarks_query(db, user_id, search, tag, tags, match_all_tags)
+    stmt = page_query(stmt, sort_keys, None, cursor)
+    return _stream_scalars(db, stmt.execution_options(yield_per=batch_size or settings.STREAM_BATCH_SIZE))
+
 
+def _stream_scalars(db: Session, stmt) -> Iterator:
+    yield from db.scalars(stmt)
 
-def get_bookmark_by_id(db: Session, bookmark_id: int) -> Optional[Bookmark]:
-    """Retrieve a single bookmark by its id."""
-    return db.query(Bookmark).filter(Bookmark.id == bookmark_id).first()
+
+def get_bookmarks(
+    db: Session,
+    user_id: int,
+    search: Optional[str] = None,
+    tag: Optional[str] = None,
+    tags: Optional[list[str]] = None,
+    match_all_tags: bool = True,
+) -> list[Bookmark]:
+    """List all of a user's bookmarks, with the same filters as get_bookmarks_page."""
+    return get_bookmarks_page(db, user_id, search, tag, tags, match_all_tags)[0]
+
+
+def get_bookmark_by_id(db: Session, bookmark_id: int, user_id: Optional[int] = None) -> Optional[Bookmark]:
+    """
+    Retrieve a single bookmark by its id; with user_id, only if that user owns
+    it. Pass user_id when sharded: ids are only unique within a shard.
+    """
+    query = db.query(Bookmark).filter(Bookmark.id == bookmark_id)
+    if user_id is not None:
+        query = query.filter(Bookmark.user_id == user_id)
+    return query.first()
 
 
 def update_bookmark(db: Session, bookmark: Bookmark, data: BookmarkUpdate) -> Bookmark:
     """Update bookmark fields (only those provided)."""
     update_data = data.model_dump(exclude_unset=True)
 
-    if "tags" in update_data:
-        tags_value = update_data.pop("tags")
-        bookmark.tags = ",".join(tags_value) if tags_value else None
+    with pinned(db, user_shard(db, bookmark.user_id)):
+        if "tags" in update_data:
+            tags_value = update_data.pop("tags")
+            tag_store.replace_tags(
+                db,
+                bookmark.user_id,
+                bookmark.id,
+                tag_store.normalize_tags(bookmark.tags.split(",") if bookmark.tags else None),
+                tag_store.normalize_tags(tags_value),
+            )
+            bookmark.tags = ",".join(tags_value) if tags_value else None
 
-    for field, value in update_data.items():
-        setattr(bookmark, field, value)
+        for field, value in update_data.items():
+            setattr(bookmark, field, value)
 
-    db.commit()
-    db.refresh(bookmark)
+        db.execute(bump_user(bookmark.user_id))
+        db.commit()
+        db.refresh(bookmark)
     return bookmark
 
 
 def delete_bookmark(db: Session, bookmark: Bookmark) -> None:
     """Delete a bookmark."""
-    db.delete(bookmark)
-    db.commit()
+    with pinned(db, user_shard(db, bookmark.user_id)):
+        tag_store.unlink_tags(db, bookmark.id)
+        db.delete(bookmark)
+        db.execute(bump_user(bookmark.user_id))
+        db.commit()
@@ -0,0 +1,139 @@
+"""
+Async counterparts of the URL functions in app.crud, used when DB_MODE=async.
+They share the resolution cache, click buffer and code allocator with the
+sync path, so both modes behave identically.
+"""
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import url_cache, ResolvedURL, MISSING
+from app.bloom import short_code_filter
+from app.clicks import click_buffer
+from app.analytics import click_event
+from app.codes import get_code_allocator
+from app.dedup import url_hash
+from app.config import get_settings
+from app.crud import MAX_CODE_ATTEMPTS, URL_SORT_KEYS, wants_dedupe
+from app.models import URL, User, ClickEvent
+from app.schemas import URLCreate
+from app.pagination import page_query, finish_page
+from app.versions import bump_user, bump_users, code_owners_query
+
+settings = get_settings()
+
+
+async def create_short_url(db: AsyncSession, url: URLCreate, user_id: Optional[int] = None) -> URL:
+    """Create a new shortened URL in the database (or reuse one, see crud.create_short_url)."""
+    original_url_str = str(url.original_url)
+    digest = url_hash(original_url_str)
+    if wants_dedupe(url):
+        existing = await db.scalar(
+            select(URL)
+            .where(URL.user_id == user_id, URL.url_hash == digest, URL.redirect_status == url.redirect_status)
+            .order_by(URL.id)
+            .limit(1)
+        )
+        if existing is not None:
+            return existing
+    allocator = get_code_allocator()
+
+    for _ in range(MAX_CODE_ATTEMPTS):
+        code = await db.run_sync(allocator.allocate)
+        db_url = URL(
+            short_code=code,
+            original_url=original_url_str,
+            user_id=user_id,
+            url_hash=digest,
+            redirect_status=url.redirect_status,
+        )
+        db.add(db_url)
+        if user_id is not None:
+            await db.execute(bump_user(user_id))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            continue
+        await db.refresh(db_url)
+        return db_url
+
+    raise RuntimeError("Could not allocate a unique short code")
+
+
+async def get_url_by_code(db: AsyncSession, short_code: str) -> Optional[URL]:
+    """Retrieve a URL by its short code."""
+    result = await db.execute(select(URL).where(URL.short_code == short_code).limit(1))
+    return result.scalars().first()
+
+
+async def resolve_url(db: AsyncSession, short_code: str) -> Optional[ResolvedURL]:
+    """Cached variant of get_url_by_code for the redirect path (see crud.resolve_url)."""
+    cached = url_cache.get(short_code)
+    if cached is not MISSING:
+        return cached
+
+    if not short_code_filter.might_exist(short_code):
+        return None
+
+    db_url = await get_url_by_code(db, short_code)
+    if db_url is None:
+        url_cache.set(short_code, None, ttl=settings.URL_CACHE_NEGATIVE_TTL_SECONDS)
+        return None
+
+    resolved = ResolvedURL.from_model(db_url)
+    url_cache.set(short_code, resolved)
+    return resolved
+
+
+async def record_click(
+    db: AsyncSession, short_code: str, referrer: Optional[str] = None, user_agent: Optional[str] = None
+) -> None:
+    """Count a click and log its event (buffered, or written through when the buffer is disabled)."""
+    event = click_event(short_code, referrer, user_agent) if settings.CLICK_EVENTS_ENABLED else None
+    if settings.CLICK_BUFFER_ENABLED:
+        click_buffer.add(short_code, event=event)
+        return
+    await db.execute(
+        update(URL).where(URL.short_code == short_code).values(clicks=URL.clicks + 1)
+    )
+    if event is not None:
+        await db.execute(insert(ClickEvent), [event])
+    owners = (await db.scalars(code_owners_query([short_code]))).all()
+    if owners:
+        await db.execute(bump_users(owners))
+    await db.commit()
+
+
+async def get_urls_page(
+    db: AsyncSession, user_id: int, limit: Optional[int] = None, cursor: Optional[str] = None
+) -> tuple[list[URL], Optional[str]]:
+    """One page of a user's URLs, newest first, plus the next cursor (see crud.get_urls_page)."""
+    stmt = page_query(select(URL).where(URL.user_id == user_id), URL_SORT_KEYS, limit, cursor)
+    result = await db.execute(stmt)
+    return finish_page(result.all(), limit)
+
+
+def stream_urls(
+    db: AsyncSession, user_id: int, cursor: Optional[str] = None, batch_size: Optional[int] = None
+) -> AsyncIterator[URL]:
+    """All of a user's URLs in page order, read through a server-side cursor (see crud.stream_urls)."""
+    stmt = page_query(select(URL).where(URL.user_id == user_id), URL_SORT_KEYS, None, cursor)
+    return _stream_urls(db, stmt.execution_options(yield_per=batch_size or settings.STREAM_BATCH_SIZE))
+
+
+async def _stream_urls(db: AsyncSession, stmt) -> AsyncIterator[URL]:
+    result = await db.stream_scalars(stmt)
+    async for url in result:
+        yield url
+
+
+async def get_urls_by_user(db: AsyncSession, user_id: int) -> list[URL]:
+    """List all shortened URLs owned by a user."""
+    return (await get_urls_page(db, user_id))[0]
+
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+    return await db.get(User, user_id)
@@ -1,17 +1,160 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import logging
+import time
+from functools import lru_cache
+from typing import Optional
 
+from fastapi import Depends
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app import metrics, profiling
+from app.replica import BackupReplica, ReadReplica, read_database_url, replica_copy_url, sqlite_path
+from app.sharding import shard_database_urls, sharded_sessionmaker
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# SQLite requires connect_args for multi-thread access
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # needed for SQLite only
-)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def is_sqlite(database_url: str) -> bool:
+    return make_url(database_url).get_backend_name() == "sqlite"
+
+
+def is_sqlite_memory(database_url: str) -> bool:
+    return is_sqlite(database_url) and make_url(database_url).database in (None, "", ":memory:")
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """`connect` event handler — applies the SQLITE_* storage profile to a new connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    finally:
+        cursor.close()
+    apply_sqlite_read_pragmas(dbapi_connection, connection_record)
+
+
+def apply_sqlite_read_pragmas(dbapi_connection, connection_record) -> None:
+    """`connect` event handler for read-only connections — the storage profile minus the write settings."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}")
+    finally:
+        cursor.close()
+
+
+class _TimedCheckout:
+    """Pool mixin that reports how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe_pool_wait(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(database_url: str) -> dict:
+    """create_engine keyword arguments for DATABASE_URL (pool sizing, SQLite threading)."""
+    if is_sqlite_memory(database_url):
+        # One private database per connection; pool sizing doesn't apply.
+        return {"connect_args": {"check_same_thread": False}}
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": not is_sqlite(database_url),
+    }
+    if is_sqlite(database_url):
+        # SQLite requires connect_args for multi-thread access
+        options["connect_args"] = {"check_same_thread": False}
+        options["poolclass"] = QueuePool
+    if settings.METRICS_ENABLED:
+        options["poolclass"] = TimedQueuePool
+    return options
+
+
+def configure_engine(engine: Engine, read_only: bool = False) -> Engine:
+    """Attach the SQLite storage profile (SQLite only) and the metrics/profiling statement hooks if enabled."""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", apply_sqlite_read_pragmas if read_only else apply_sqlite_pragmas)
+    if settings.METRICS_ENABLED:
+        event.listen(engine, "before_cursor_execute", metrics.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", metrics.after_cursor_execute)
+    if settings.PROFILING_ENABLED:
+        event.listen(engine, "before_cursor_execute", profiling.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", profiling.after_cursor_execute)
+    return engine
+
+
+def run_sqlite_maintenance(engine: Engine) -> None:
+    """Checkpoint the WAL into the main database file and refresh query planner statistics."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as conn:
+        busy, log_frames, checkpointed = conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").one()
+        conn.exec_driver_sql("PRAGMA optimize")
+    logger.debug("WAL checkpoint: %s/%s frames (busy=%s)", checkpointed, log_frames, busy)
+
+
+def create_configured_engine(database_url: str, read_only: bool = False) -> Engine:
+    return configure_engine(create_engine(database_url, **engine_options(database_url)), read_only)
+
+
+engine = create_configured_engine(settings.DATABASE_URL)
+
+# ── Shards (SHARD_COUNT > 1, see app.sharding) ───────────────
+# Shard 0 is `engine`; every shard has its own engine and pool.
+
+shard_engines: list[Engine] = [engine] + [
+    create_configured_engine(url)
+    for url in shard_database_urls(settings.DATABASE_URL, settings.SHARD_COUNT, settings.SHARD_DATABASE_URLS)[1:]
+]
+
+# One plain session factory per shard, for jobs that work shard by shard (rollups, backfills)
+shard_sessionmakers = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in shard_engines]
+
+if len(shard_engines) > 1:
+    if settings.DB_MODE == "async":
+        raise RuntimeError("SHARD_COUNT > 1 requires DB_MODE=sync")
+    SessionLocal = sharded_sessionmaker(shard_engines, autocommit=False, autoflush=False)
+else:
+    SessionLocal = shard_sessionmakers[0]
+
+
+# ── Read replica (READ_REPLICA_MODE, see app.replica) ────────
+
+read_replica: Optional[ReadReplica] = None
+_read_url = read_database_url(settings.READ_REPLICA_MODE, settings.DATABASE_URL, settings.READ_DATABASE_URL)
+if _read_url is not None:
+    if len(shard_engines) > 1:
+        raise RuntimeError("READ_REPLICA_MODE requires SHARD_COUNT=1")
+    _read_engine = create_configured_engine(_read_url, read_only=True)
+    if settings.READ_REPLICA_MODE == "backup":
+        read_replica = BackupReplica(
+            _read_engine,
+            settings.READ_REPLICA_MAX_LAG_SECONDS,
+            source_path=sqlite_path(settings.DATABASE_URL),
+            copy_path=sqlite_path(settings.READ_DATABASE_URL or replica_copy_url(settings.DATABASE_URL)),
+        )
+    else:
+        read_replica = ReadReplica(_read_engine, settings.READ_REPLICA_MAX_LAG_SECONDS)
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_replica.engine if read_replica else engine)
 
 
 class Base(DeclarativeBase):
@@ -19,6 +162,12 @@ class Base(DeclarativeBase):
     pass
 
 
+def missing_tables(bind: Engine) -> list[str]:
+    """Model tables that `bind` doesn't have yet (one catalog query; columns aren't checked)."""
+    existing = set(inspect(bind).get_table_names())
+    return [name for name in Base.metadata.tables if name not in existing]
+
+
 def get_db():
     """FastAPI dependency — yields a DB session per request, auto-closes after."""
     db = SessionLocal()
@@ -26,3 +175,66 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db(db: Session = Depends(get_db)):
+    """
+    FastAPI dependency for read-only routes — a session on the read replica,
+    or the request's primary session (get_db) when there is no replica or it
+    is staler than READ_REPLICA_MAX_LAG_SECONDS. Never write through it.
+    """
+    if read_replica is None or not read_replica.is_fresh():
+        yield db
+        return
+    read_db = ReadSessionLocal()
+    try:
+        yield read_db
+    finally:
+        read_db.close()
+
+
+# ── Async mode (DB_MODE=async) ───────────────────────────────
+# Built lazily so the sync-only deployment never imports aiosqlite.
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def async_database_url(database_url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching async driver (sqlite -> aiosqlite)."""
+    url = make_url(database_url)
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {url.drivername!r}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+@lru_cache
+def get_async_engine():
+    """The process-wide AsyncEngine."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+    options = engine_options(url)
+    # The async engine needs an async-adapted pool (its default one unless checkouts are timed)
+    if options.pop("poolclass", None) is not None and settings.METRICS_ENABLED:
+        options["poolclass"] = TimedAsyncAdaptedQueuePool
+    async_engine = create_async_engine(url, **options)
+    configure_engine(async_engine.sync_engine)
+    return async_engine
+
+
+@lru_cache
+def get_async_sessionmaker():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=True)
+
+
+async def get_async_db():
+    """FastAPI dependency — async counterpart of get_db."""
+    async with get_async_sessionmaker()() as db:
+        yield db
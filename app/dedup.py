@@ -0,0 +1,36 @@
+"""
+URL canonicalization and hashing for idempotent shortening.
+
+Two submissions are treated as the same link when their canonical forms
+match: scheme and host lower-cased, default ports dropped and an empty
+path written as "/". Everything else (path case, query order, fragment)
+is kept, since servers may treat those as significant.
+"""
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, _DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+    if parts.username or parts.password:
+        userinfo = parts.username or ""
+        if parts.password:
+            userinfo += f":{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, parts.fragment))
+
+
+def url_hash(url: str) -> str:
+    """32-hex-char digest of the canonical URL, stored in urls.url_hash."""
+    return hashlib.blake2b(canonicalize_url(url).encode(), digest_size=16).hexdigest()
@@ -1,51 +1,96 @@
+import hmac
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status, Request
+from fastapi import Depends, Header, HTTPException, Query, Response, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.auth import decode_jwt
+from app.auth import InvalidToken
+from app.database import get_db, get_async_db
 from app.models import User
+from app.cache import MISSING
+from app.principals import Principal, principal_cache
+from app import crud_async
+from app.config import get_settings
+
+settings = get_settings()
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
 # tokenUrl is only used for Swagger UI's "Authorize" dialog
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/google", auto_error=True)
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/auth/google", auto_error=False)
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
+class PageParams:
     """
-    FastAPI dependency — extracts and verifies the JWT from the
-    Authorization header, then returns the corresponding User.
-    Raises 401 if the token is missing, invalid, or the user no longer exists.
+    FastAPI dependency for cursor-paginated lists: `limit` and the opaque
+    `cursor` returned in the X-Next-Cursor header of the previous page.
     """
-    credentials_exception = HTTPException(
+
+    def __init__(
+        self,
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+    @staticmethod
+    def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+        """Expose the next page's cursor; absent on the last page."""
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+def _user_id_from_token(token: str) -> Optional[int]:
+    """The token's subject, or None if the token doesn't verify."""
+    try:
+        user_id = principal_cache.claims(token).get("sub")
+    except InvalidToken:
+        return None
+    return int(user_id) if user_id is not None else None
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = decode_jwt(token)
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
-    return user
+
+def _load_principal(db: Session, user_id: Optional[int]) -> Optional[Principal]:
+    if user_id is None:
+        return None
+    principal = principal_cache.get_user(user_id)
+    if principal is MISSING:
+        user = db.query(User).filter(User.id == user_id).first()
+        principal = principal_cache.put_user(user) if user else None
+    return principal
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """
+    FastAPI dependency — extracts and verifies the JWT from the
+    Authorization header, then returns a snapshot of the corresponding User.
+    Raises 401 if the token is missing, invalid, or the user no longer exists.
+    Verified tokens and users are cached (see app.principals).
+    """
+    principal = _load_principal(db, _user_id_from_token(token))
+    if principal is None:
+        raise _credentials_exception()
+    return principal
 
 
 def get_optional_user(
     token: Optional[str] = Depends(oauth2_scheme_optional),
     db: Session = Depends(get_db),
-) -> Optional[User]:
+) -> Optional[Principal]:
     """
     Same as get_current_user but returns None instead of 401
     when no token is provided.  Useful for routes that work
@@ -53,12 +98,49 @@ def get_optional_user(
     """
     if token is None:
         return None
-    try:
-        payload = decode_jwt(token)
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-    except JWTError:
+    return _load_principal(db, _user_id_from_token(token))
+
+
+# ── Async variants (DB_MODE=async) ───────────────────────────
+
+
+async def _load_principal_async(db: AsyncSession, user_id: Optional[int]) -> Optional[Principal]:
+    if user_id is None:
         return None
+    principal = principal_cache.get_user(user_id)
+    if principal is MISSING:
+        user = await crud_async.get_user_by_id(db, user_id)
+        principal = principal_cache.put_user(user) if user else None
+    return principal
+
 
-    return db.query(User).filter(User.id == int(user_id)).first()
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """Async counterpart of get_current_user."""
+    principal = await _load_principal_async(db, _user_id_from_token(token))
+    if principal is None:
+        raise _credentials_exception()
+    return principal
+
+
+async def get_optional_user_async(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    db: AsyncSession = Depends(get_async_db),
+) -> Optional[Principal]:
+    """Async counterpart of get_optional_user."""
+    if token is None:
+        return None
+    return await _load_principal_async(db, _user_id_from_token(token))
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Guard for operational endpoints: the X-Admin-Token header must match
+    STATS_ADMIN_TOKEN. With no token configured the endpoints don't exist (404).
+    """
+    if not settings.STATS_ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), settings.STATS_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
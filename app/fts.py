@@ -0,0 +1,121 @@
+"""
+SQLite FTS5 full-text index over bookmarks (title, url, description).
+
+`bookmarks_fts` is an external-content FTS5 table: it stores only the
+index, reads column values from `bookmarks`, and is kept in sync by
+triggers on insert, update and delete. The index is created alongside the
+bookmarks table, and `ensure_fts` / `python -m app.manage fts-rebuild`
+bring an existing database up to date.
+"""
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import DDL, Table, column, event, inspect, literal_column, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+FTS_TABLE = "bookmarks_fts"
+
+_CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, url, description,
+        content='bookmarks', content_rowid='id', tokenize='unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS bookmarks_fts_ai AFTER INSERT ON bookmarks BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, url, description)
+        VALUES (new.id, new.title, new.url, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS bookmarks_fts_ad AFTER DELETE ON bookmarks BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, url, description)
+        VALUES ('delete', old.id, old.title, old.url, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS bookmarks_fts_au AFTER UPDATE OF title, url, description ON bookmarks BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, url, description)
+        VALUES ('delete', old.id, old.title, old.url, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, url, description)
+        VALUES (new.id, new.title, new.url, new.description);
+    END""",
+]
+
+# Relevance weights for bm25(): title, url, description
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+fts_table = table(FTS_TABLE, column("rowid"))
+
+# Engines (by URL) where FTS5 turned out to be unavailable
+_unavailable: set[str] = set()
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def install(bookmarks: Table) -> None:
+    """Create/drop the FTS table and triggers together with the bookmarks table (SQLite only)."""
+    for statement in _CREATE_STATEMENTS:
+        event.listen(bookmarks, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(
+        bookmarks, "before_drop", DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite")
+    )
+
+
+def fts_enabled(bind) -> bool:
+    """Whether searches on this engine/connection should use the FTS index."""
+    engine = bind.engine if isinstance(bind, Connection) else bind
+    return (
+        settings.BOOKMARK_FTS_ENABLED
+        and engine.dialect.name == "sqlite"
+        and str(engine.url) not in _unavailable
+    )
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query: every word must match, each as a
+    prefix ("fast api" -> "fast"* "api"*). None if there are no words.
+    """
+    tokens = _TOKEN.findall(search)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def match_clause(query: str):
+    return text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=query)
+
+
+def rank_expression():
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    return literal_column(f"bm25({FTS_TABLE}, {weights})")
+
+
+def ensure_fts(engine: Engine) -> bool:
+    """
+    Create the FTS table and triggers if missing (e.g. a database created
+    before full-text search existed) and index existing rows. Returns
+    whether FTS is usable on this engine.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    try:
+        with engine.begin() as conn:
+            existed = inspect(conn).has_table(FTS_TABLE)
+            for statement in _CREATE_STATEMENTS:
+                conn.exec_driver_sql(statement)
+            if not existed:
+                rebuild(conn)
+    except OperationalError:
+        logger.warning("SQLite FTS5 is unavailable; bookmark search falls back to LIKE scans")
+        _unavailable.add(str(engine.url))
+        return False
+    _unavailable.discard(str(engine.url))
+    return True
+
+
+def rebuild(conn: Connection) -> None:
+    """Re-index every bookmark from the content table."""
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
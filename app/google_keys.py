@@ -0,0 +1,196 @@
+"""
+Google ID-token verification against a cached copy of Google's signing
+keys (JWKS).
+
+The key set is fetched over a pooled HTTP session and kept for as long as
+the response's Cache-Control allows. A background task refreshes it shortly
+before it expires, so a login verifies the signature locally instead of
+waiting on a round-trip to Google. A token signed with a key id we haven't
+seen triggers an early, rate-limited refetch, which covers key rotation.
+
+requests and python-jose are imported on first use: most workers never
+verify a Google token, and importing them is a large share of cold start.
+"""
+import logging
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Mapping, Optional
+
+from app.config import get_settings
+from app.tasks import PeriodicTask
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def cache_ttl(headers: Mapping[str, str], default: float, min_ttl: float, max_ttl: float) -> float:
+    """Seconds a JWKS response may be reused: max-age minus Age, clamped to [min_ttl, max_ttl]."""
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        ttl = min_ttl
+    elif match := _MAX_AGE.search(cache_control):
+        try:
+            age = float(headers.get("Age") or 0)
+        except ValueError:
+            age = 0.0
+        ttl = float(match.group(1)) - age
+    else:
+        ttl = default
+    return max(min_ttl, min(max_ttl, ttl))
+
+
+def _pooled_session() -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class GoogleKeySet:
+    """Process-wide cache of Google's public signing keys, keyed by `kid`."""
+
+    def __init__(
+        self,
+        url: str,
+        session: Optional["requests.Session"] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.url = url
+        self._session = session  # created on the first fetch
+        self._clock = clock
+        self._keys: dict[str, dict] = {}
+        self._etag: Optional[str] = None
+        self._lock = threading.Lock()
+        self._task: Optional[PeriodicTask] = None
+        self.expires_at = 0.0
+        self.last_fetch_at: Optional[float] = None
+        self.fetches = 0
+        self.not_modified = 0
+        self.failures = 0
+
+    # ── Fetching ─────────────────────────────────────────────
+
+    def _fetch(self) -> None:
+        """Fetch (or revalidate) the key set. Caller holds the lock."""
+        headers = {"If-None-Match": self._etag} if self._etag and self._keys else {}
+        self.last_fetch_at = self._clock()
+        if self._session is None:
+            self._session = _pooled_session()
+        resp = self._session.get(self.url, headers=headers, timeout=settings.GOOGLE_JWKS_HTTP_TIMEOUT_SECONDS)
+        if resp.status_code == 304:
+            self.not_modified += 1
+        else:
+            resp.raise_for_status()
+            keys = {key["kid"]: key for key in resp.json()["keys"] if "kid" in key}
+            if not keys:
+                raise ValueError("JWKS response has no keys")
+            self._keys = keys
+            self._etag = resp.headers.get("ETag")
+        self.fetches += 1
+        self.expires_at = self._clock() + cache_ttl(
+            resp.headers,
+            settings.GOOGLE_JWKS_DEFAULT_TTL_SECONDS,
+            settings.GOOGLE_JWKS_MIN_TTL_SECONDS,
+            settings.GOOGLE_JWKS_MAX_TTL_SECONDS,
+        )
+
+    def _fetch_or_keep_stale(self) -> None:
+        """Fetch; on failure keep serving the keys we have (if any) and retry after a cooldown."""
+        import requests
+
+        try:
+            self._fetch()
+        except (requests.RequestException, ValueError, KeyError):
+            self.failures += 1
+            if not self._keys:
+                raise
+            logger.warning("Refreshing Google signing keys failed; keeping the cached set", exc_info=True)
+            self.expires_at = self._clock() + settings.GOOGLE_JWKS_UNKNOWN_KID_COOLDOWN_SECONDS
+
+    def refresh_if_due(self) -> None:
+        """Refresh when the keys are within GOOGLE_JWKS_REFRESH_MARGIN_SECONDS of expiring."""
+        with self._lock:
+            if self._clock() >= self.expires_at - settings.GOOGLE_JWKS_REFRESH_MARGIN_SECONDS:
+                self._fetch_or_keep_stale()
+
+    def get_key(self, kid: Optional[str]) -> dict:
+        """The JWK for `kid`; raises ValueError if Google doesn't publish it."""
+        key = self._keys.get(kid)
+        if key is not None and self._clock() < self.expires_at:
+            return key  # fast path, no lock
+        with self._lock:
+            now = self._clock()
+            if now >= self.expires_at:
+                self._fetch_or_keep_stale()
+            elif kid not in self._keys and (
+                self.last_fetch_at is None
+                or now - self.last_fetch_at >= settings.GOOGLE_JWKS_UNKNOWN_KID_COOLDOWN_SECONDS
+            ):
+                self._fetch_or_keep_stale()
+            key = self._keys.get(kid)
+        if key is None:
+            raise ValueError(f"Unknown signing key id {kid!r}")
+        return key
+
+    # ── Verification ─────────────────────────────────────────
+
+    def verify(self, token: str, audience: str) -> dict:
+        """Verify an ID token's signature, audience, issuer and expiry locally; returns its claims."""
+        import requests
+        from jose import JWTError, jwt
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            return jwt.decode(
+                token,
+                self.get_key(kid),
+                algorithms=["RS256"],
+                audience=audience,
+                issuer=GOOGLE_ISSUERS,
+                options={"verify_at_hash": False},
+            )
+        except (JWTError, requests.RequestException) as exc:
+            raise ValueError(str(exc)) from exc
+
+    # ── Background refresh ───────────────────────────────────
+
+    def start(self, interval: float) -> None:
+        """Fetch the keys in the background now, then keep them fresh."""
+        self._task = PeriodicTask("google-jwks-refresh", interval, self.refresh_if_due)
+        self._task.start(run_immediately=True)
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.stop()
+            self._task = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys = {}
+            self._etag = None
+            self.expires_at = 0.0
+            self.last_fetch_at = None
+
+    def stats(self) -> dict:
+        return {
+            "keys": sorted(self._keys),
+            "expires_in_seconds": max(0.0, self.expires_at - self._clock()),
+            "fetches": self.fetches,
+            "not_modified": self.not_modified,
+            "failures": self.failures,
+        }
+
+
+google_keys = GoogleKeySet(settings.GOOGLE_JWKS_URL)
@@ -0,0 +1,57 @@
+"""
+HTTP validators (ETag / Last-Modified) and conditional-request checks.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+LISTING_CACHE_CONTROL = "private, no-cache"  # per-user data: keep it, but revalidate before reuse
+
+
+def http_date(value: datetime) -> str:
+    """An HTTP-date; naive datetimes are taken as UTC (that is how they are stored)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag (RFC 9110 13.1.2)."""
+    if if_none_match.strip() == "*":
+        return True
+    ours = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == ours for candidate in if_none_match.split(","))
+
+
+def not_modified(request: Request, etag: Optional[str] = None, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Whether a GET can be answered with 304. If-None-Match wins when both
+    validators are sent; If-Modified-Since has one-second resolution.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def set_validators(response: Response, etag: str, cache_control: str = LISTING_CACHE_CONTROL) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def not_modified_response(etag: str, cache_control: str = LISTING_CACHE_CONTROL) -> Response:
+    return set_validators(Response(status_code=304), etag, cache_control)
@@ -1,18 +1,98 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
-from app.database import engine, Base
-from app.routers import url, auth, bookmarks
+from app.config import get_settings
+from app.database import (
+    engine,
+    SessionLocal,
+    shard_engines,
+    shard_sessionmakers,
+    read_replica,
+    get_async_engine,
+    missing_tables,
+    run_sqlite_maintenance,
+)
+from app.clicks import click_buffer
+from app.bloom import short_code_filter
+from app.google_keys import google_keys
+from app.tasks import PeriodicTask
+from app.replica import BackupReplica
+from app.analytics import run_click_rollup
+from app.dependencies import NEXT_CURSOR_HEADER
+from app.metrics import MetricsMiddleware
+from app.profiling import ProfilingMiddleware, install_endpoint_hooks
+from app.pagination import InvalidCursor
+from app.routers import url, url_async, auth, bookmarks, stats, metrics
+
+settings = get_settings()
+
+
+def maintain_every_shard() -> None:
+    for shard_engine in shard_engines:
+        run_sqlite_maintenance(shard_engine)
+
+
+sqlite_maintenance = PeriodicTask(
+    "sqlite-maintenance",
+    settings.SQLITE_MAINTENANCE_INTERVAL_SECONDS,
+    maintain_every_shard,
+)
+
+
+def roll_up_every_shard() -> None:
+    # Click events are stored with their URL, so each shard keeps its own rollups and watermark
+    for session_factory in shard_sessionmakers:
+        run_click_rollup(session_factory)
+
+
+click_rollup = PeriodicTask(
+    "click-rollup",
+    settings.CLICK_ROLLUP_INTERVAL_SECONDS,
+    roll_up_every_shard,
+)
+
+
+# Only a "backup" replica needs refreshing; twice per staleness bound keeps it inside the bound
+replica_refresh = PeriodicTask(
+    "read-replica-refresh",
+    settings.READ_REPLICA_MAX_LAG_SECONDS / 2,
+    read_replica.refresh if isinstance(read_replica, BackupReplica) else lambda: None,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create tables if they don't exist
-    Base.metadata.create_all(bind=engine)
+    # Startup: the schema is `python -m app.manage migrate`'s job, not every worker's; just fail fast without it
+    missing = missing_tables(engine)
+    if missing:
+        raise RuntimeError(f"Database has no {', '.join(missing)} table(s); run `python -m app.manage migrate` first")
+    click_buffer.start(SessionLocal)
+    if settings.BLOOM_FILTER_ENABLED:
+        short_code_filter.start(
+            SessionLocal, settings.BLOOM_REBUILD_INTERVAL_SECONDS, settings.BLOOM_CATCHUP_INTERVAL_SECONDS
+        )
+    if engine.dialect.name == "sqlite" and settings.SQLITE_MAINTENANCE_INTERVAL_SECONDS > 0:
+        sqlite_maintenance.start()
+    if settings.CLICK_EVENTS_ENABLED and settings.CLICK_ROLLUP_INTERVAL_SECONDS > 0:
+        click_rollup.start()
+    if settings.GOOGLE_CLIENT_ID:
+        google_keys.start(settings.GOOGLE_JWKS_CHECK_INTERVAL_SECONDS)
+    if isinstance(read_replica, BackupReplica):
+        replica_refresh.start(run_immediately=True)  # reads use the primary until the first copy exists
     yield
-    # Shutdown: Clean up resources if needed
-    pass
+    # Shutdown: persist buffered clicks, then checkpoint what they wrote
+    replica_refresh.stop()
+    google_keys.stop()
+    click_rollup.stop()
+    short_code_filter.stop()
+    click_buffer.stop()
+    if sqlite_maintenance.running:
+        sqlite_maintenance.stop()
+        maintain_every_shard()
+    if settings.DB_MODE == "async":
+        await get_async_engine().dispose()
 
 
 app = FastAPI(
@@ -29,12 +109,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],  # Lets the frontend read pagination cursors and ETags
 )
 
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+if settings.METRICS_ENABLED:
+    # Added last so it is outermost and times the whole stack, CORS included
+    app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(InvalidCursor)
+def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+
 # Include routers (url router LAST — it has a catch-all /{short_code} route)
 app.include_router(auth.router)
 app.include_router(bookmarks.router)
-app.include_router(url.router)
+app.include_router(stats.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
+app.include_router(url_async.router if settings.DB_MODE == "async" else url.router)
+
+if settings.PROFILING_ENABLED:
+    install_endpoint_hooks(app.routes)
 
 
 @app.get("/")
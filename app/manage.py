@@ -0,0 +1,167 @@
+"""
+Maintenance commands.
+
+    python -m app.manage migrate        # create missing tables, columns and indexes, then backfill
+    python -m app.manage fts-rebuild    # re-index all bookmarks for full-text search
+    python -m app.manage backfill-tags  # move comma-separated bookmark tags into the tags tables
+    python -m app.manage backfill-url-hashes  # hash existing URLs so dedupe can match them
+    python -m app.manage rollup-clicks  # fold click events into the hourly/daily rollups, prune old ones
+    python -m app.manage reshard --from-count 2  # move rows into the configured SHARD_COUNT layout
+"""
+import argparse
+import sys
+from typing import Optional
+
+from sqlalchemy import inspect, literal, text
+from sqlalchemy.engine import Engine, make_url
+
+from app.config import get_settings
+from app.database import engine, Base, create_configured_engine, shard_engines, shard_sessionmakers
+from app.crud import backfill_url_hashes
+from app import fts
+from app.tags import backfill_tags
+from app.analytics import roll_up_clicks, prune_click_events
+from app.reshard import reshard
+from app.sharding import shard_database_urls
+import app.models  # noqa: F401  (register tables on Base.metadata)
+
+settings = get_settings()
+
+
+def _column_ddl(column, dialect) -> str:
+    ddl = f"{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect=dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        ddl += " DEFAULT " + str(literal(default).compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    if not column.nullable:
+        if default is None:
+            raise RuntimeError(f"Cannot add NOT NULL column {column.table.name}.{column.name} without a default")
+        ddl += " NOT NULL"
+    return ddl
+
+
+def add_missing_columns(bind: Optional[Engine] = None) -> list[str]:
+    """create_all() never alters existing tables; add columns the models gained since. Returns what was added."""
+    bind = bind or engine
+    inspector = inspect(bind)
+    added = []
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    quoted = bind.dialect.identifier_preparer.quote(table.name)
+                    conn.execute(text(f"ALTER TABLE {quoted} ADD COLUMN {_column_ddl(column, bind.dialect)}"))
+                    added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def create_missing_indexes(bind: Optional[Engine] = None) -> None:
+    """create_all() skips indexes of tables that already exist; add any that are new."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind or engine, checkfirst=True)
+
+
+def ensure_schema() -> list[str]:
+    """
+    Bring the schema up to date without touching data, on every shard.
+    Returns the columns that were added (to shard 0; the others match it).
+    """
+    added = []
+    for bind in [engine, *shard_engines[1:]]:
+        Base.metadata.create_all(bind=bind)
+        columns = add_missing_columns(bind)
+        create_missing_indexes(bind)
+        fts.ensure_fts(bind)
+        added = added or columns
+    return added
+
+
+def migrate() -> None:
+    """Create missing tables, columns, indexes and the full-text index, then run data backfills."""
+    for column in ensure_schema():
+        print(f"Added column {column}.")
+    print("Schema is up to date.")
+    tags_backfill()
+    url_hashes_backfill()
+
+
+def fts_rebuild() -> None:
+    """Re-index every bookmark (creates the FTS table first if needed)."""
+    for shard_engine in shard_engines:
+        if not fts.ensure_fts(shard_engine):
+            sys.exit("FTS5 is not available on this database.")
+        with shard_engine.begin() as conn:
+            fts.rebuild(conn)
+    print("Bookmark search index rebuilt.")
+
+
+def tags_backfill() -> None:
+    """Link bookmarks created before normalized tags existed."""
+    migrated = 0
+    for session_factory in shard_sessionmakers:
+        with session_factory() as db:
+            migrated += backfill_tags(db)
+    print(f"Backfilled tags for {migrated} bookmarks.")
+
+
+def url_hashes_backfill() -> None:
+    """Fill urls.url_hash for links shortened before dedupe existed."""
+    updated = 0
+    for session_factory in shard_sessionmakers:
+        with session_factory() as db:
+            updated += backfill_url_hashes(db)
+    print(f"Backfilled url hashes for {updated} URLs.")
+
+
+def rollup_clicks() -> None:
+    """Run the click rollup job once (it also runs in the app every CLICK_ROLLUP_INTERVAL_SECONDS)."""
+    folded = pruned = 0
+    for session_factory in shard_sessionmakers:
+        with session_factory() as db:
+            folded += roll_up_clicks(db)
+            pruned += prune_click_events(db)
+    print(f"Rolled up {folded} click events, pruned {pruned}.")
+
+
+def reshard_databases(from_count: int = 1, from_urls: str = "") -> None:
+    """Move rows from the layout the data is in (from_count / from_urls) to the configured one."""
+    ensure_schema()
+    engines = {e.url.render_as_string(hide_password=False): e for e in shard_engines}
+    sources = []
+    for url in shard_database_urls(settings.DATABASE_URL, from_count, from_urls):
+        key = make_url(url).render_as_string(hide_password=False)
+        if key not in engines:
+            engines[key] = create_configured_engine(url)
+        sources.append(engines[key])
+    moved = reshard(sources, shard_engines)
+    print(f"Moved {moved['urls']} URLs and the bookmarks of {moved['bookmark_owners']} users.")
+
+
+COMMANDS = {
+    "migrate": migrate,
+    "fts-rebuild": fts_rebuild,
+    "backfill-tags": tags_backfill,
+    "backfill-url-hashes": url_hashes_backfill,
+    "rollup-clicks": rollup_clicks,
+    "reshard": reshard_databases,
+}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="URL shortener maintenance commands")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("--from-count", type=int, default=1, help="reshard: SHARD_COUNT of the current layout")
+    parser.add_argument("--from-urls", default="", help="reshard: SHARD_DATABASE_URLS of the current layout")
+    args = parser.parse_args(argv)
+    if args.command == "reshard":
+        reshard_databases(args.from_count, args.from_urls)
+    else:
+        COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+In-process request and database metrics, exposed in the Prometheus text
+format by GET /metrics.
+
+Recording has to stay cheap enough to leave on under full redirect load,
+so nothing on the hot path takes a lock: every thread writes to its own
+shard of counters (the event loop thread for the middleware, threadpool
+workers for SQL timings), and a scrape sums the shards.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+Labels = tuple[tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class _Shard:
+    """One thread's counters. Only the owning thread writes to it."""
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: dict[tuple[str, Labels], float] = {}
+        # (name, labels) -> [count per bucket..., count above the last bucket, sum]
+        self.histograms: dict[tuple[str, Labels], list] = {}
+
+
+class MetricsRegistry:
+    """Counters and histograms declared up front, recorded into per-thread shards."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: list[_Shard] = []
+        self._lock = threading.Lock()  # only taken when a thread records for the first time
+        self._families: dict[str, tuple[str, str]] = {}  # name -> (type, help)
+        self._buckets: dict[str, tuple[float, ...]] = {}
+
+    def counter(self, name: str, help: str) -> None:
+        self._families[name] = ("counter", help)
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self._families[name] = ("histogram", help)
+        self._buckets[name] = buckets
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    # ── Recording (hot path) ─────────────────────────────────
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1) -> None:
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        histograms = self._shard().histograms
+        key = (name, labels)
+        counts = histograms.get(key)
+        if counts is None:
+            counts = histograms[key] = [0] * (len(self._buckets[name]) + 2)
+        counts[bisect.bisect_left(self._buckets[name], value)] += 1
+        counts[-1] += value
+
+    # ── Scraping ─────────────────────────────────────────────
+
+    def _merged(self) -> tuple[dict, dict]:
+        counters: dict[tuple[str, Labels], float] = {}
+        histograms: dict[tuple[str, Labels], list] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # list() copies under the GIL, so a concurrent write can't break the iteration
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, counts in list(shard.histograms.items()):
+                counts = list(counts)
+                total = histograms.get(key)
+                histograms[key] = counts if total is None else [a + b for a, b in zip(total, counts)]
+        return counters, histograms
+
+    def snapshot(self) -> dict:
+        """Merged values: counters as numbers, histograms as {"count", "sum", "buckets"}."""
+        counters, histograms = self._merged()
+        result: dict = dict(counters)
+        for key, counts in histograms.items():
+            result[key] = {"count": sum(counts[:-1]), "sum": counts[-1], "buckets": counts[:-2]}
+        return result
+
+    def render(self) -> str:
+        counters, histograms = self._merged()
+        lines: list[str] = []
+        for name, (kind, help) in self._families.items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+                continue
+            buckets = self._buckets[name]
+            for (metric, labels), counts in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', format_value(bound)),))} {cumulative}")
+                cumulative += counts[-2]
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(counts[-1])}")
+                lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def gauge_family(name: str, help: str, samples: Iterable[tuple[Labels, float]], kind: str = "gauge") -> str:
+    """Prometheus text for values read at scrape time (cache sizes, pool state, ...)."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in samples]
+    return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.counter("http_requests_total", "HTTP requests by method, route template and status code.")
+metrics.histogram("http_request_duration_seconds", "HTTP request latency by method and route template.")
+metrics.histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request, by route.", QUERY_COUNT_BUCKETS
+)
+metrics.counter("http_request_db_seconds_total", "Time spent in SQL statements by HTTP requests, by route.")
+metrics.histogram("db_query_duration_seconds", "SQL statement execution time by operation.")
+metrics.histogram(
+    "db_pool_checkout_wait_seconds", "Time to check a connection out of the pool (waiting for one, or opening one)."
+)
+
+
+# ── SQL statement timing (SQLAlchemy engine events) ─────────
+
+# [statements, seconds] for the request being served; None outside requests
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+_OPERATIONS = {"select", "insert", "update", "delete", "with", "pragma", "begin", "commit", "rollback"}
+
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip()[:8].split(None, 1)
+    verb = verb[0].lower() if verb else ""
+    return verb if verb in _OPERATIONS else "other"
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    metrics.observe("db_query_duration_seconds", elapsed, (("operation", _operation(statement)),))
+    request_db = _request_db.get()
+    if request_db is not None:
+        request_db[0] += 1
+        request_db[1] += elapsed
+
+
+def observe_pool_wait(seconds: float) -> None:
+    metrics.observe("db_pool_checkout_wait_seconds", seconds)
+
+
+# ── Request middleware ───────────────────────────────────────
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no per-request task or response wrapping) that
+    records count, latency and SQL usage per route template, so
+    /{short_code} is one series rather than one per code.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        request_db = [0, 0.0]
+        token = _request_db.set(request_db)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            route = scope.get("route")
+            labels = (("method", scope["method"]), ("route", getattr(route, "path", None) or "unmatched"))
+            registry = self.registry
+            registry.inc("http_requests_total", labels + (("status", str(status_code)),))
+            registry.observe("http_request_duration_seconds", elapsed, labels)
+            registry.observe("http_request_db_queries", request_db[0], labels)
+            if request_db[1]:
+                registry.inc("http_request_db_seconds_total", labels, request_db[1])
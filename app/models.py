@@ -1,7 +1,8 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index, Table
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app import fts
 
 
 def get_utcnow():
@@ -19,9 +20,16 @@ class URL(Base):
     clicks = Column(Integer, default=0)
     created_at = Column(DateTime, default=get_utcnow)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    url_hash = Column(String(32), nullable=True)  # app.dedup.url_hash(original_url)
+    redirect_status = Column(Integer, nullable=True)  # 301/302/307/308 for /r/{code}; NULL = REDIRECT_DEFAULT_STATUS
 
     owner = relationship("User", back_populates="urls")
 
+    __table_args__ = (
+        Index("ix_urls_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_urls_user_id_url_hash", "user_id", "url_hash"),
+    )
+
 
 class User(Base):
     """SQLAlchemy model for authenticated users."""
@@ -33,6 +41,8 @@ class User(Base):
     name = Column(String, nullable=True)
     picture = Column(String, nullable=True)
     created_at = Column(DateTime, default=get_utcnow)
+    # Bumped with every change to this user's URLs or bookmarks; ETags of their listings derive from it
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     bookmarks = relationship("Bookmark", back_populates="owner", cascade="all, delete-orphan")
     urls = relationship("URL", back_populates="owner")
@@ -48,7 +58,88 @@ class Bookmark(Base):
     url = Column(String, nullable=False)
     title = Column(String, nullable=True)
     description = Column(Text, nullable=True)
-    tags = Column(String, nullable=True)  # comma-separated
+    tags = Column(String, nullable=True)  # comma-separated, as entered; filtering uses the tags table
     created_at = Column(DateTime, default=get_utcnow)
 
     owner = relationship("User", back_populates="bookmarks")
+
+    __table_args__ = (Index("ix_bookmarks_user_id_created_at_id", "user_id", "created_at", "id"),)
+
+
+fts.install(Bookmark.__table__)
+
+
+class Tag(Base):
+    """A user's tag with a maintained count of bookmarks carrying it."""
+
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String, nullable=False)  # normalized: stripped, lower-case
+    bookmark_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_tags_user_id_name", "user_id", "name", unique=True),)
+
+
+# Bookmark <-> Tag links
+bookmark_tags = Table(
+    "bookmark_tags",
+    Base.metadata,
+    Column("bookmark_id", Integer, ForeignKey("bookmarks.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_bookmark_tags_tag_id", "tag_id", "bookmark_id"),
+)
+
+
+class CodeSequence(Base):
+    """Named counters used to hand out blocks of short-code ids."""
+
+    __tablename__ = "code_sequences"
+
+    name = Column(String, primary_key=True)
+    next_value = Column(Integer, nullable=False, default=0)
+
+
+# ── Click analytics ──────────────────────────────────────────
+
+
+class ClickEvent(Base):
+    """Append-only log of redirects, rolled up into the click_rollups_* tables and then pruned."""
+
+    __tablename__ = "click_events"
+
+    id = Column(Integer, primary_key=True)
+    short_code = Column(String, nullable=False)
+    occurred_at = Column(DateTime, nullable=False, index=True)
+    referrer_hash = Column(String(16), nullable=True)
+    user_agent_hash = Column(String(16), nullable=True)
+
+
+class ClickRollupHourly(Base):
+    """Clicks per short code per hour (bucket_start is the UTC hour)."""
+
+    __tablename__ = "click_rollups_hourly"
+
+    short_code = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    clicks = Column(Integer, nullable=False, default=0)
+
+
+class ClickRollupDaily(Base):
+    """Clicks per short code per day (bucket_start is midnight UTC)."""
+
+    __tablename__ = "click_rollups_daily"
+
+    short_code = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    clicks = Column(Integer, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    """Highest click_events id already folded into the rollups."""
+
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
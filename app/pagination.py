@@ -0,0 +1,106 @@
+"""
+Keyset (cursor) pagination.
+
+A page query is ordered by a list of sort keys, e.g. (created_at DESC,
+id DESC). The cursor is an opaque token holding the key values of the last
+row served, and the next page starts with a range predicate just past
+them. That predicate can use a matching composite index, so a deep page
+costs the same as the first one, unlike OFFSET.
+"""
+import base64
+import heapq
+import json
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.sql import ColumnElement
+
+# (expression, descending)
+SortKey = tuple[ColumnElement, bool]
+
+
+class InvalidCursor(ValueError):
+    """The cursor could not be decoded or doesn't fit this listing."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, expected_length: int) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != expected_length:
+            raise InvalidCursor("Cursor does not match this listing")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError) as exc:
+        if isinstance(exc, InvalidCursor):
+            raise
+        raise InvalidCursor("Malformed cursor") from exc
+
+
+def _after(keys: Sequence[SortKey], values: Sequence[Any]):
+    """Rows strictly after `values` in the sort order: a row-value comparison spelled out with OR/AND."""
+    clauses = []
+    for i, (expr, descending) in enumerate(keys):
+        equal_prefix = [keys[j][0] == values[j] for j in range(i)]
+        step = expr < values[i] if descending else expr > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def page_query(stmt: Select, keys: Sequence[SortKey], limit: Optional[int], cursor: Optional[str]) -> Select:
+    """
+    Add ordering, the cursor predicate and LIMIT (one extra row to detect a
+    next page) to a select of a single entity. The sort key values are
+    appended as extra columns so finish_page can build the next cursor.
+    """
+    stmt = stmt.add_columns(*(expr.label(f"_sort{i}") for i, (expr, _) in enumerate(keys)))
+    if cursor:
+        stmt = stmt.where(_after(keys, decode_cursor(cursor, len(keys))))
+    stmt = stmt.order_by(*(expr.desc() if descending else expr.asc() for expr, descending in keys))
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+def finish_page(rows: Sequence[Any], limit: Optional[int]) -> tuple[list, Optional[str]]:
+    """Split rows fetched with page_query into (entities, next_cursor or None)."""
+    has_more = limit is not None and len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+    items = [row[0] for row in rows]
+    next_cursor = encode_cursor(list(rows[-1][1:])) if has_more else None
+    return items, next_cursor
+
+
+def _sort_values(row: Any) -> tuple:
+    return tuple(row[1:])
+
+
+def merge_pages(parts: Sequence[Iterable], keys: Sequence[SortKey]) -> Iterator:
+    """
+    Merge rows from several page_query results over the same keys (e.g. one
+    per shard) into one stream in page order. Every key must sort the same way.
+    """
+    if len(parts) == 1:
+        return iter(parts[0])
+    directions = {descending for _, descending in keys}
+    if len(directions) != 1:
+        raise ValueError("Merging pages needs all sort keys in the same direction")
+    return heapq.merge(*parts, key=_sort_values, reverse=directions.pop())
@@ -0,0 +1,111 @@
+"""
+Cache of authenticated principals, so an authenticated request needn't
+decode its JWT and look up its user every time.
+
+Two bounded TTL caches:
+  - token hash -> verified claims, kept no longer than the token's `exp`
+  - user id    -> Principal, a detached snapshot of the user's profile
+
+Profile changes (google_login) invalidate the snapshot by user id, which
+covers every token issued to that user.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from app.auth import decode_jwt
+from app.cache import TTLCache, MISSING
+from app.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Detached, immutable snapshot of the user columns request handlers read."""
+    id: int
+    email: str
+    name: Optional[str]
+    picture: Optional[str]
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            picture=user.picture,
+            created_at=user.created_at,
+        )
+
+
+def _token_key(token: str) -> bytes:
+    # Keyed by digest so raw bearer tokens aren't kept in memory.
+    return hashlib.sha256(token.encode()).digest()
+
+
+class PrincipalCache:
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self._clock = clock
+        self.claims_cache = TTLCache(max_size, ttl)
+        self.users = TTLCache(max_size, ttl)
+        self._lock = threading.Lock()
+        self.decodes = 0
+        self.user_lookups = 0
+
+    def claims(self, token: str) -> dict:
+        """Verified claims for a token; raises InvalidToken if it doesn't verify."""
+        key = _token_key(token)
+        claims = self.claims_cache.get(key)
+        if claims is not MISSING:
+            return claims
+        claims = decode_jwt(token)
+        with self._lock:
+            self.decodes += 1
+        ttl = self.ttl
+        if isinstance(claims.get("exp"), (int, float)):
+            ttl = min(ttl, claims["exp"] - self._clock())
+        if ttl > 0:
+            self.claims_cache.set(key, claims, ttl=ttl)
+        return claims
+
+    def get_user(self, user_id: int) -> Any:
+        """Cached Principal for a user id, or MISSING."""
+        return self.users.get(user_id)
+
+    def put_user(self, user) -> Principal:
+        """Snapshot a freshly loaded User and cache it."""
+        with self._lock:
+            self.user_lookups += 1
+        principal = Principal.from_model(user)
+        self.users.set(user.id, principal)
+        return principal
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.users.invalidate(user_id)
+
+    def clear(self) -> None:
+        self.claims_cache.clear()
+        self.users.clear()
+        with self._lock:
+            self.decodes = self.user_lookups = 0
+
+    def stats(self) -> dict:
+        """Cache counters; `user_lookups` is how many requests still hit the users table."""
+        return {
+            "claims": self.claims_cache.stats(),
+            "users": self.users.stats(),
+            "jwt_decodes": self.decodes,
+            "user_lookups": self.user_lookups,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE if settings.PRINCIPAL_CACHE_ENABLED else 0,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
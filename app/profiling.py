@@ -0,0 +1,316 @@
+"""
+On-demand request profiling.
+
+With PROFILING_ENABLED, a request is profiled when it carries
+`X-Profile: <PROFILING_ADMIN_TOKEN>`, or when it hits one of
+PROFILING_ROUTES (every route if unset) and wins the PROFILING_SAMPLE_RATE
+draw. Each profile is written to PROFILING_DIR as a stack file plus a JSON
+file with the request, its SQL statements and their timings. Only the
+newest PROFILING_MAX_PROFILES are kept.
+
+Two modes:
+  sampling  a background thread samples the request's threads every
+            PROFILING_SAMPLE_INTERVAL_MS into collapsed stacks (`.collapsed`,
+            for flamegraph.pl / speedscope). Cheap enough for production.
+  cprofile  deterministic cProfile of the endpoint call (`.prof`, for pstats
+            or snakeviz). Exact call counts, much higher overhead.
+
+Sampling covers the request's threads: the event loop thread (middleware,
+async endpoints, response serialization) and the threadpool worker running a
+sync endpoint. Other requests interleaved on the event loop show up in the
+loop thread's samples, so profile under the traffic you want to explain.
+
+cProfile runs one profiler per request, enabled in the thread that runs the
+endpoint: from Python 3.12 only one profiler can be active in the process at
+a time. If one already is (a debugger, coverage), the request is sampled
+instead.
+
+Only one request is profiled at a time; requests arriving meanwhile run
+unprofiled. When PROFILING_ENABLED is off nothing here is installed.
+"""
+import cProfile
+import functools
+import hmac
+import inspect
+import json
+import logging
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+import anyio
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+_PROFILE_HEADER_KEY = PROFILE_HEADER.lower().encode()
+
+_MAX_SQL_STATEMENTS = 1000
+_MAX_STATEMENT_CHARS = 2000
+
+_active: ContextVar[Optional["ProfileSession"]] = ContextVar("active_profile", default=None)
+_busy = threading.Lock()  # one profiled request at a time
+_sequence = 0
+
+
+def _collapse(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class ProfileSession:
+    """Profile data for one request, collected from every thread that works on it."""
+
+    def __init__(self, mode: str, interval: float):
+        global _sequence
+        _sequence += 1
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{_sequence:06d}"
+        self.mode = mode
+        self.interval = interval
+        self.sql: list[dict] = []
+        self.stacks: Counter = Counter()
+        self._profile: Optional[cProfile.Profile] = None
+        self._threads: dict[int, int] = {}  # thread ident -> nesting depth
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    @contextmanager
+    def thread(self):
+        """Sample the calling thread for the duration of the block (sampling mode only)."""
+        if self.mode == "cprofile":
+            yield
+            return
+        ident = threading.get_ident()
+        self._threads[ident] = self._threads.get(ident, 0) + 1
+        try:
+            yield
+        finally:
+            self._threads[ident] -= 1
+            if not self._threads[ident]:
+                del self._threads[ident]
+
+    @contextmanager
+    def endpoint(self):
+        """Profile an endpoint call: under the request's one cProfile, or sampled with its thread."""
+        if self.mode == "cprofile" and self._profile is None:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:  # Python 3.12+: another profiler is already active
+                logger.warning("cProfile unavailable, sampling profile %s instead", self.id)
+                self.mode = "sampling"
+                self.start()
+            else:
+                self._profile = profile
+                try:
+                    yield
+                finally:
+                    profile.disable()
+                return
+        with self.thread():
+            yield
+
+    def start(self) -> None:
+        if self.mode == "sampling":
+            self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self._threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_collapse(frame)] += 1
+
+    def record_sql(self, statement: str, seconds: float) -> None:
+        if len(self.sql) < _MAX_SQL_STATEMENTS:
+            self.sql.append({"statement": statement[:_MAX_STATEMENT_CHARS], "ms": seconds * 1000})
+
+    # ── Ring buffer on disk ──────────────────────────────────
+
+    def save(self, directory: Path, max_profiles: int, meta: dict) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        if self.mode == "cprofile":
+            if self._profile is not None:
+                pstats.Stats(self._profile).dump_stats(directory / f"{self.id}.prof")
+        else:
+            lines = (f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+            (directory / f"{self.id}.collapsed").write_text("".join(lines))
+        meta = {
+            "id": self.id,
+            "mode": self.mode,
+            **meta,
+            "samples": sum(self.stacks.values()),
+            "sql_count": len(self.sql),
+            "sql_ms": sum(q["ms"] for q in self.sql),
+            "sql": self.sql,
+        }
+        (directory / f"{self.id}.json").write_text(json.dumps(meta, indent=2))
+        prune_profiles(directory, max_profiles)
+
+
+def prune_profiles(directory: Path, max_profiles: int) -> None:
+    """Delete the oldest profiles beyond max_profiles (ids sort chronologically)."""
+    ids = sorted(path.stem for path in directory.glob("*.json"))
+    for old in ids[: max(0, len(ids) - max_profiles)]:
+        for path in directory.glob(f"{old}.*"):
+            path.unlink(missing_ok=True)
+
+
+# ── SQL capture (SQLAlchemy engine events) ──────────────────
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None and _active.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    session = _active.get()
+    started = getattr(context, "_profile_started", None)
+    if session is not None and started is not None:
+        session.record_sql(statement, time.perf_counter() - started)
+
+
+# ── Request selection and middleware ─────────────────────────
+
+
+def _route_name(scope) -> Optional[str]:
+    """Name of the endpoint the router will pick (the first full match)."""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.name
+    return None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware that decides whether to profile a request and saves the result."""
+
+    def __init__(self, app):
+        self.app = app
+        self.mode = settings.PROFILING_MODE
+        self.interval = settings.PROFILING_SAMPLE_INTERVAL_MS / 1000
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.routes = {name.strip() for name in settings.PROFILING_ROUTES.split(",") if name.strip()}
+        self.token = settings.PROFILING_ADMIN_TOKEN.encode()
+        self.directory = Path(settings.PROFILING_DIR)
+        self.max_profiles = settings.PROFILING_MAX_PROFILES
+
+    def _trigger(self, scope) -> Optional[str]:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == _PROFILE_HEADER_KEY:
+                    if hmac.compare_digest(value, self.token):
+                        return "header"
+                    break
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if self.routes and _route_name(scope) not in self.routes:
+            return None
+        return "sample"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None or not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(self.mode, self.interval)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER.lower().encode(), session.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _active.set(session)
+        session.start()
+        started = time.perf_counter()
+        try:
+            with session.thread():
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            session.stop()
+            _active.reset(token)
+            route = scope.get("route")
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "name", None),
+                "status": status_code,
+                "trigger": trigger,
+                "duration_ms": elapsed * 1000,
+            }
+            try:
+                await anyio.to_thread.run_sync(session.save, self.directory, self.max_profiles, meta)
+            except OSError:
+                logger.warning("Could not save profile %s", session.id, exc_info=True)
+            finally:
+                _busy.release()
+
+
+# ── Endpoint wrapping ────────────────────────────────────────
+
+
+def _profiled(call):
+    """Wrap an endpoint so that, in a profiled request, the call (and the thread running it) is profiled."""
+    if inspect.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def async_wrapper(*args, **kwargs):
+            session = _active.get()
+            if session is None:
+                return await call(*args, **kwargs)
+            with session.endpoint():
+                return await call(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        session = _active.get()
+        if session is None:
+            return call(*args, **kwargs)
+        with session.endpoint():
+            return call(*args, **kwargs)
+
+    return wrapper
+
+
+def install_endpoint_hooks(routes) -> None:
+    """Wrap every endpoint; call after all routers are included."""
+    for route in routes:
+        if isinstance(route, APIRoute) and route.dependant.call is not None:
+            route.dependant.call = _profiled(route.dependant.call)
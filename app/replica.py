@@ -0,0 +1,126 @@
+"""
+Read replicas for the read-only routes (READ_REPLICA_MODE, see get_read_db).
+
+  * "readonly": SQLite only. A second engine opens DATABASE_URL itself with
+    `mode=ro`. Never stale (WAL readers see the last commit), but listing
+    queries get their own pool and can never take the write lock.
+  * "backup": SQLite only. A copy of the database made with the online backup
+    API and refreshed every READ_REPLICA_MAX_LAG_SECONDS / 2; readers never
+    touch the primary file. Each refresh copies the whole database, so this
+    suits small and medium databases.
+  * "url": READ_DATABASE_URL, e.g. a streaming replica of a server database.
+    Its lag is whatever the replication setup gives.
+
+A replica that is older than READ_REPLICA_MAX_LAG_SECONDS (refreshing failed,
+or the first copy isn't there yet) is skipped and reads go to the primary.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import PurePosixPath
+from typing import Optional
+
+from sqlalchemy.engine import Engine, make_url
+
+logger = logging.getLogger(__name__)
+
+REPLICA_MODES = ("off", "readonly", "backup", "url")
+
+
+def sqlite_path(database_url: str) -> str:
+    """Filesystem path of a SQLite database file URL."""
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError(f"READ_REPLICA_MODE needs a SQLite database file, not {database_url!r}")
+    return url.database
+
+
+def sqlite_readonly_url(database_url: str) -> str:
+    """The same SQLite file opened read-only (`file:<path>?mode=ro` URI)."""
+    url = make_url(database_url)
+    path = sqlite_path(database_url)
+    return url.set(database=f"file:{path}", query={"mode": "ro", "uri": "true"}).render_as_string(hide_password=False)
+
+
+def replica_copy_url(database_url: str) -> str:
+    """Where the "backup" copy lives by default: `<name>.replica.db` next to the database."""
+    url = make_url(database_url)
+    path = PurePosixPath(sqlite_path(database_url))
+    return url.set(database=str(path.with_name(f"{path.stem}.replica{path.suffix}"))).render_as_string(
+        hide_password=False
+    )
+
+
+def read_database_url(mode: str, database_url: str, replica_url: str = "") -> Optional[str]:
+    """URL of the read engine for READ_REPLICA_MODE, or None when reads use the primary."""
+    if mode not in REPLICA_MODES:
+        raise ValueError(f"READ_REPLICA_MODE must be one of {', '.join(REPLICA_MODES)}")
+    if mode == "off":
+        return None
+    if mode == "readonly":
+        return sqlite_readonly_url(database_url)
+    if mode == "backup":
+        return sqlite_readonly_url(replica_url or replica_copy_url(database_url))
+    if not replica_url:
+        raise ValueError('READ_REPLICA_MODE="url" needs READ_DATABASE_URL')
+    return replica_url
+
+
+class ReadReplica:
+    """The read engine plus how fresh it is; a plain replica is always considered fresh."""
+
+    def __init__(self, engine: Engine, max_lag: float):
+        self.engine = engine
+        self.max_lag = max_lag
+
+    def is_fresh(self) -> bool:
+        return True
+
+    def lag(self) -> float:
+        return 0.0
+
+
+class BackupReplica(ReadReplica):
+    """A SQLite copy of the primary, refreshed by refresh() (run on a PeriodicTask)."""
+
+    def __init__(self, engine: Engine, max_lag: float, source_path: str, copy_path: str):
+        super().__init__(engine, max_lag)
+        self.source_path = source_path
+        self.copy_path = copy_path
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        return self.lag() <= self.max_lag
+
+    def lag(self) -> float:
+        """Seconds since the copy was last taken (infinite before the first one)."""
+        if self._refreshed_at is None:
+            return float("inf")
+        return time.monotonic() - self._refreshed_at
+
+    def refresh(self) -> None:
+        """
+        Copy the primary into a temporary file and swap it in. Readers still on
+        the old copy finish undisturbed; the pool is recycled so new checkouts
+        open the new one.
+        """
+        with self._lock:
+            started = time.monotonic()
+            tmp_path = f"{self.copy_path}.tmp"
+            source = sqlite3.connect(self.source_path)
+            target = sqlite3.connect(tmp_path)
+            try:
+                source.backup(target)
+                # A plain rollback-journal file: mode=ro readers need no -wal/-shm files
+                target.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                target.close()
+                source.close()
+            os.replace(tmp_path, self.copy_path)
+            self.engine.dispose()
+            # Fresh as of when the copy started: commits after that aren't in it
+            self._refreshed_at = started
+        logger.debug("Read replica refreshed in %.3fs", time.monotonic() - started)
@@ -0,0 +1,139 @@
+"""
+Move sharded rows to the shard they belong on after the shard layout changed.
+
+    SHARD_COUNT=4 python -m app.manage reshard --from-count 2
+
+Every database of the old layout is scanned; URLs (with their click
+rollups) and bookmarks (with their tags) whose shard under the new layout is
+a different database are copied there and deleted from the old one, a batch
+per transaction. Run it with the app stopped and a backup taken.
+
+  * Click events are folded into the rollups first and then dropped for the
+    moved codes instead of copied: event ids are per-database watermarks.
+  * A moved bookmark gets a new id on its new shard.
+  * Re-running after an interruption is safe for URLs (codes already on the
+    target are skipped); an interrupted bookmark batch can leave duplicates.
+"""
+from collections import Counter
+from typing import Sequence
+
+from sqlalchemy import delete, distinct, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import tags as tag_store
+from app.analytics import ROLLUP_TABLES, add_rollup_counts, roll_up_clicks
+from app.models import URL, Bookmark, ClickEvent, Tag, bookmark_tags
+from app.sharding import shard_for_code, shard_for_user
+from app.versions import bump_users
+
+_URL_COLUMNS = [column for column in URL.__table__.columns if column.name != "id"]
+_BOOKMARK_COLUMNS = [column for column in Bookmark.__table__.columns if column.name != "id"]
+
+
+def _same_database(a: Engine, b: Engine) -> bool:
+    return a is b or a.url.render_as_string(hide_password=False) == b.url.render_as_string(hide_password=False)
+
+
+def _move_urls(source: Engine, targets: Sequence[Engine], batch_size: int) -> int:
+    moved, last_id = 0, 0
+    with Session(source) as src:
+        roll_up_clicks(src)
+        while True:
+            rows = src.execute(
+                select(URL.id, *_URL_COLUMNS).where(URL.id > last_id).order_by(URL.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return moved
+            last_id = rows[-1].id
+            by_target: dict[int, list] = {}
+            for row in rows:
+                shard_id = shard_for_code(row.short_code, len(targets))
+                if not _same_database(targets[shard_id], source):
+                    by_target.setdefault(shard_id, []).append(row)
+            for shard_id, group in by_target.items():
+                codes = [row.short_code for row in group]
+                with Session(targets[shard_id]) as dst:
+                    present = set(dst.scalars(select(URL.short_code).where(URL.short_code.in_(codes))))
+                    new_rows = [
+                        {column.name: getattr(row, column.name) for column in _URL_COLUMNS}
+                        for row in group
+                        if row.short_code not in present
+                    ]
+                    if new_rows:
+                        dst.execute(insert(URL), new_rows)
+                        for model in ROLLUP_TABLES.values():
+                            counts = Counter({
+                                (code, bucket): clicks
+                                for code, bucket, clicks in src.execute(
+                                    select(model.short_code, model.bucket_start, model.clicks)
+                                    .where(model.short_code.in_([r["short_code"] for r in new_rows]))
+                                )
+                            })
+                            add_rollup_counts(dst, model, counts)
+                    dst.commit()
+                src.execute(delete(URL).where(URL.short_code.in_(codes)))
+                src.execute(delete(ClickEvent).where(ClickEvent.short_code.in_(codes)))
+                for model in ROLLUP_TABLES.values():
+                    src.execute(delete(model).where(model.short_code.in_(codes)))
+                src.commit()
+                moved += len(group)
+
+
+def _move_bookmarks(source: Engine, targets: Sequence[Engine], batch_size: int) -> set[int]:
+    """Move every bookmark whose owner now lives on another database. Returns the owners moved."""
+    moved_users: set[int] = set()
+    with Session(source) as src:
+        user_ids = src.scalars(select(distinct(Bookmark.user_id))).all()
+        for user_id in user_ids:
+            target = targets[shard_for_user(user_id, len(targets))]
+            if _same_database(target, source):
+                continue
+            with Session(target) as dst:
+                while True:
+                    rows = src.execute(
+                        select(Bookmark.id, *_BOOKMARK_COLUMNS)
+                        .where(Bookmark.user_id == user_id)
+                        .order_by(Bookmark.id)
+                        .limit(batch_size)
+                    ).all()
+                    if not rows:
+                        break
+                    new_ids = dst.scalars(
+                        insert(Bookmark).returning(Bookmark.id, sort_by_parameter_order=True),
+                        [{column.name: getattr(row, column.name) for column in _BOOKMARK_COLUMNS} for row in rows],
+                    ).all()
+                    tag_store.link_tags(dst, user_id, {
+                        new_id: names
+                        for new_id, row in zip(new_ids, rows)
+                        if (names := tag_store.normalize_tags(row.tags.split(",") if row.tags else None))
+                    })
+                    dst.commit()
+                    old_ids = [row.id for row in rows]
+                    src.execute(delete(bookmark_tags).where(bookmark_tags.c.bookmark_id.in_(old_ids)))
+                    src.execute(delete(Bookmark).where(Bookmark.id.in_(old_ids)))
+                    src.commit()
+            src.execute(delete(Tag).where(Tag.user_id == user_id))
+            src.commit()
+            moved_users.add(user_id)
+    return moved_users
+
+
+def reshard(sources: Sequence[Engine], targets: Sequence[Engine], batch_size: int = 1000) -> dict[str, int]:
+    """
+    Move rows from the `sources` layout to the `targets` layout (engines in
+    shard order; shard 0 of both is the home database). Returns counts moved.
+    """
+    urls = 0
+    users: set[int] = set()
+    for source in sources:
+        urls += _move_urls(source, targets, batch_size)
+        users |= _move_bookmarks(source, targets, batch_size)
+    if users:
+        # Bookmark ids changed: make clients refetch listings they have cached
+        owners = sorted(users)
+        with Session(targets[0]) as home:
+            for start in range(0, len(owners), batch_size):
+                home.execute(bump_users(owners[start:start + batch_size]))
+            home.commit()
+    return {"urls": urls, "bookmark_owners": len(users)}
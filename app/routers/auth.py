@@ -6,6 +6,7 @@ from app.models import User
 from app.schemas import GoogleAuthRequest, AuthResponse, UserResponse
 from app.auth import verify_google_token, create_jwt
 from app.dependencies import get_current_user
+from app.principals import Principal, principal_cache
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -15,7 +16,7 @@ def google_login(body: GoogleAuthRequest, db: Session = Depends(get_db)):
     """
     Authenticate with a Google ID token.
 
-    1. Verifies the token against Google's servers.
+    1. Verifies the token's signature locally, against Google's cached signing keys (JWKS).
     2. Upserts the user (creates if new, updates name/picture if returning).
     3. Returns a JWT access token + user profile.
     """
@@ -39,6 +40,7 @@ def google_login(body: GoogleAuthRequest, db: Session = Depends(get_db)):
         user.picture = picture
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate_user(user.id)
     else:
         user = User(email=email, name=name, picture=picture)
         db.add(user)
@@ -54,6 +56,6 @@ def google_login(body: GoogleAuthRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: Principal = Depends(get_current_user)):
     """Return the profile of the currently authenticated user."""
     return UserResponse.model_validate(current_user)
@@ -1,40 +1,83 @@
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import User
-from app.schemas import BookmarkCreate, BookmarkUpdate, BookmarkResponse
+from app.bookmark_io import (
+    LineTooLong,
+    NDJSONParser,
+    NetscapeParser,
+    RecordError,
+    decode_stream,
+    encode_ndjson,
+    encode_netscape,
+)
+from app.config import get_settings
+from app.database import get_db, get_read_db
+from app.principals import Principal
+from app.schemas import (
+    BookmarkCreate,
+    BookmarkUpdate,
+    BookmarkResponse,
+    BookmarkImportResponse,
+    TagCountResponse,
+)
 from app.crud import (
     create_bookmark,
-    get_bookmarks,
+    bulk_create_bookmarks,
+    iter_bookmarks,
+    get_bookmarks_page,
+    stream_bookmarks,
     get_bookmark_by_id,
     update_bookmark,
     delete_bookmark,
 )
-from app.dependencies import get_current_user
+from app.tags import get_tag_counts
+from app.dependencies import PageParams, get_current_user
+from app.http_cache import not_modified, not_modified_response, set_validators
+from app.versions import data_version_query, listing_etag
+from app.serialization import FastJSONResponse, bookmark_item, dumps
+from app.streaming import json_array, json_stream_response
 
 router = APIRouter(prefix="/bookmarks", tags=["Bookmarks"])
+settings = get_settings()
+
+ImportFormat = Literal["ndjson", "html"]
 
 
 @router.post("", response_model=BookmarkResponse, status_code=status.HTTP_201_CREATED)
 def save_bookmark(
     data: BookmarkCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Save a new bookmark for the authenticated user."""
     bookmark = create_bookmark(db, current_user.id, data)
     return BookmarkResponse.from_model(bookmark)
 
 
+def encode_bookmark_row(bookmark) -> str:
+    """One listing item as JSON, for streamed listings."""
+    if settings.FAST_SERIALIZATION:
+        return dumps(bookmark_item(bookmark)).decode()
+    return BookmarkResponse.from_model(bookmark).model_dump_json()
+
+
 @router.get("", response_model=list[BookmarkResponse])
 def list_bookmarks(
+    request: Request,
+    response: Response,
     search: Optional[str] = None,
     tag: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    tags: Optional[list[str]] = Query(None),
+    tag_mode: Literal["all", "any"] = "all",
+    page: PageParams = Depends(),
+    stream: bool = Query(False, description="Stream every match (from `cursor` on) instead of one page"),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     List the authenticated user's bookmarks.
@@ -42,21 +85,155 @@ def list_bookmarks(
     Optional query params:
     - **search**: filter by keyword in title, url, or description
     - **tag**: filter by tag name
+    - **tags**: filter by several tags (repeat the param), combined with **tag**
+    - **tag_mode**: `all` (default) requires every tag, `any` requires at least one
+    - **limit** / **cursor**: page size, and the X-Next-Cursor header of the previous page
+
+    Newest first, or by relevance when searching. With **stream** the whole
+    listing is streamed as one JSON array instead of a page. Send the ETag
+    back as If-None-Match to get a 304 while nothing changed.
     """
-    bookmarks = get_bookmarks(db, current_user.id, search=search, tag=tag)
+    etag = listing_etag(current_user.id, db.scalar(data_version_query(current_user.id)), request.url.query)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+
+    filters = dict(search=search, tag=tag, tags=tags, match_all_tags=tag_mode == "all")
+    if stream:
+        # The request's session is reused for streaming; release it when done.
+        rows = stream_bookmarks(db, current_user.id, cursor=page.cursor, **filters)
+        return set_validators(json_stream_response(json_array(rows, encode_bookmark_row, on_close=db.close)), etag)
+
+    bookmarks, next_cursor = get_bookmarks_page(
+        db,
+        current_user.id,
+        limit=page.limit,
+        cursor=page.cursor,
+        **filters,
+    )
+    if settings.FAST_SERIALIZATION:
+        # Straight to bytes: no BookmarkResponse per row, no second validation against response_model
+        fast = FastJSONResponse([bookmark_item(bm) for bm in bookmarks])
+        PageParams.set_next_cursor(fast, next_cursor)
+        return set_validators(fast, etag)
+    PageParams.set_next_cursor(response, next_cursor)
+    set_validators(response, etag)
     return [BookmarkResponse.from_model(bm) for bm in bookmarks]
 
 
+@router.get("/tags", response_model=list[TagCountResponse])
+def list_tags(
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """The user's tags with bookmark counts, most used first."""
+    return [TagCountResponse(name=name, count=count) for name, count in get_tag_counts(db, current_user.id)]
+
+
+@router.post("/import", response_model=BookmarkImportResponse)
+async def import_bookmarks(
+    request: Request,
+    format: Optional[ImportFormat] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Bulk import bookmarks from the raw request body.
+
+    - **format**: `ndjson` (one bookmark object per line) or `html`
+      (Netscape bookmark file, as exported by browsers). Defaults from the
+      Content-Type header, then to ndjson.
+
+    The body is parsed as it streams in and inserted in transactions of
+    BOOKMARK_IMPORT_CHUNK_SIZE rows, so memory use doesn't grow with the file.
+    An NDJSON line longer than BOOKMARK_IMPORT_MAX_LINE_LENGTH stops the
+    import with a 413; chunks inserted before it are kept.
+    """
+    if format is None:
+        format = "html" if "html" in request.headers.get("content-type", "") else "ndjson"
+    if format == "html":
+        parser = NetscapeParser()
+    else:
+        parser = NDJSONParser(max_line_length=settings.BOOKMARK_IMPORT_MAX_LINE_LENGTH)
+    label = "entry" if format == "html" else "line"
+    user_id = current_user.id
+
+    imported, failed, errors = 0, 0, []
+    chunk: list[BookmarkCreate] = []
+
+    def collect(records) -> None:
+        nonlocal failed
+        for number, record in records:
+            try:
+                if isinstance(record, RecordError):
+                    raise record
+                chunk.append(BookmarkCreate.model_validate(record))
+            except (RecordError, ValidationError) as exc:
+                failed += 1
+                if len(errors) < settings.BOOKMARK_IMPORT_MAX_ERRORS:
+                    message = exc.errors()[0]["msg"] if isinstance(exc, ValidationError) else str(exc)
+                    errors.append(f"{label} {number}: {message}")
+
+    async def flush() -> None:
+        nonlocal imported, chunk
+        if chunk:
+            batch, chunk = chunk, []
+            imported += await run_in_threadpool(bulk_create_bookmarks, db, user_id, batch)
+
+    try:
+        async for text in decode_stream(request.stream()):
+            collect(parser.feed(text))
+            if len(chunk) >= settings.BOOKMARK_IMPORT_CHUNK_SIZE:
+                await flush()
+    except LineTooLong as exc:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"{exc}; {imported} bookmarks were imported before it",
+        )
+    collect(parser.close())
+    await flush()
+
+    return BookmarkImportResponse(imported=imported, failed=failed, errors=errors)
+
+
+@router.get("/export")
+def export_bookmarks(
+    format: ImportFormat = "ndjson",
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Stream all of the user's bookmarks as NDJSON or a Netscape bookmark file.
+    Rows are read through a server-side cursor, never loaded all at once.
+    """
+    user_id = current_user.id
+    encode = encode_netscape if format == "html" else encode_ndjson
+
+    def body():
+        try:
+            yield from encode(iter_bookmarks(db, user_id))
+        finally:
+            # The request's session is reused for streaming; release it when done.
+            db.close()
+
+    if format == "html":
+        return StreamingResponse(
+            body(),
+            media_type="text/html; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="bookmarks.html"'},
+        )
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
 @router.put("/{bookmark_id}", response_model=BookmarkResponse)
 def edit_bookmark(
     bookmark_id: int,
     data: BookmarkUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Update an existing bookmark. Only the provided fields are changed."""
-    bookmark = get_bookmark_by_id(db, bookmark_id)
-    if not bookmark or bookmark.user_id != current_user.id:
+    bookmark = get_bookmark_by_id(db, bookmark_id, current_user.id)
+    if not bookmark:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found")
 
     updated = update_bookmark(db, bookmark, data)
@@ -67,11 +244,11 @@ def edit_bookmark(
 def remove_bookmark(
     bookmark_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Delete a bookmark."""
-    bookmark = get_bookmark_by_id(db, bookmark_id)
-    if not bookmark or bookmark.user_id != current_user.id:
+    bookmark = get_bookmark_by_id(db, bookmark_id, current_user.id)
+    if not bookmark:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found")
 
     delete_bookmark(db, bookmark)
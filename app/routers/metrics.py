@@ -0,0 +1,66 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.bloom import short_code_filter
+from app.cache import url_cache
+from app.clicks import click_buffer
+from app.database import engine, read_replica
+from app.metrics import gauge_family, metrics
+from app.principals import principal_cache
+
+router = APIRouter(tags=["Stats"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _cache_metrics() -> str:
+    caches = {
+        "url": url_cache.stats(),
+        "principal_claims": principal_cache.claims_cache.stats(),
+        "principal_users": principal_cache.users.stats(),
+    }
+    families = [
+        ("cache_hits_total", "Cache lookups that found an entry.", "hits", "counter"),
+        ("cache_misses_total", "Cache lookups that found nothing.", "misses", "counter"),
+        ("cache_hit_ratio", "Hits over lookups since start.", "hit_ratio", "gauge"),
+        ("cache_entries", "Entries currently cached.", "size", "gauge"),
+    ]
+    text = "".join(
+        gauge_family(name, help, [((("cache", cache),), stats[key]) for cache, stats in caches.items()], kind)
+        for name, help, key, kind in families
+    )
+    text += gauge_family(
+        "bloom_negative_hits_total",
+        "Redirects for unknown codes answered by the Bloom filter without a query.",
+        [((), short_code_filter.negative_hits)],
+        "counter",
+    )
+    text += gauge_family("click_buffer_pending_clicks", "Clicks waiting to be flushed.", [((), click_buffer.pending_total())])
+    return text
+
+
+def _pool_metrics() -> str:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return ""
+    return (
+        gauge_family("db_pool_size", "Configured size of the connection pool.", [((), pool.size())])
+        + gauge_family("db_pool_checked_out", "Connections currently checked out.", [((), pool.checkedout())])
+        + gauge_family("db_pool_overflow", "Connections open beyond the pool size.", [((), max(0, pool.overflow()))])
+    )
+
+
+def _replica_metrics() -> str:
+    if read_replica is None:
+        return ""
+    return gauge_family(
+        "db_read_replica_lag_seconds", "Age of the read replica (0 when it can't lag).", [((), read_replica.lag())]
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Request, SQL, pool and cache metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(
+        metrics.render() + _pool_metrics() + _replica_metrics() + _cache_metrics(), media_type=PROMETHEUS_CONTENT_TYPE
+    )
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+
+from app.bloom import short_code_filter
+from app.dependencies import require_admin_token
+from app.google_keys import google_keys
+from app.principals import principal_cache
+
+router = APIRouter(prefix="/stats", tags=["Stats"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/bloom")
+def bloom_stats():
+    """Size, memory footprint and rebuild history of the short-code Bloom filter."""
+    return short_code_filter.stats()
+
+
+@router.get("/principals")
+def principal_stats():
+    """Hit ratios of the auth caches; `user_lookups` counts requests that still queried the users table."""
+    return principal_cache.stats()
+
+
+@router.get("/google-keys")
+def google_key_stats():
+    """Cached Google signing key ids, time until they expire and fetch counters."""
+    return google_keys.stats()
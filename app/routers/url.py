@@ -1,33 +1,79 @@
+import hashlib
+from datetime import datetime, timezone
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.responses import RedirectResponse
+from pydantic import ValidationError
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User
-from app.schemas import URLCreate, URLResponse, DestinationResponse
+from app.cache import ResolvedURL
+from app.database import get_db, get_read_db
+from app.models import URL
+from app.principals import Principal
+from app.schemas import (
+    URLCreate,
+    URLResponse,
+    URLBatchCreate,
+    URLBatchItemResult,
+    URLBatchResponse,
+    ClickTimeseriesPoint,
+    ClickTimeseriesResponse,
+    DestinationResponse,
+)
 from app.config import get_settings
-from app.crud import create_short_url, get_url_by_code, increment_clicks, get_urls_by_user
-from app.dependencies import get_current_user, get_optional_user
+from app.crud import (
+    create_short_url,
+    create_short_urls,
+    get_url_by_code,
+    resolve_url,
+    record_click,
+    get_click_count,
+    get_urls_page,
+    stream_urls,
+)
+from app.dependencies import PageParams, get_current_user, get_optional_user
+from app.http_cache import http_date, not_modified, not_modified_response, set_validators
+from app.versions import data_version_query, listing_etag
+from app.serialization import SHORT_URL_PREFIX, FastJSONResponse, dumps, url_item
+from app.streaming import json_array, json_stream_response
+from app.analytics import BUCKET_WIDTH, Granularity, get_click_timeseries, utc_naive
 
 
 router = APIRouter()
 settings = get_settings()
 
+PERMANENT_REDIRECTS = {301, 308}
+
 
 def get_full_url(short_code: str) -> str:
     """Helper to construct the full short URL focusing on the frontend domain."""
-    base_url = settings.FRONTEND_URL.rstrip("/")
-    return f"{base_url}/short/{short_code}"
+    return SHORT_URL_PREFIX + short_code
+
+
+def encode_url_row(u: URL) -> str:
+    """One /my-urls item as JSON, for streamed listings."""
+    if settings.FAST_SERIALIZATION:
+        return dumps(url_item(u)).decode()
+    return URLResponse(
+        original_url=u.original_url,
+        short_code=u.short_code,
+        short_url=get_full_url(u.short_code),
+        clicks=u.clicks,
+        created_at=u.created_at,
+    ).model_dump_json()
 
 
 @router.post("/shorten", response_model=URLResponse)
 def shorten_url(
     url: URLCreate,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user),
+    current_user: Optional[Principal] = Depends(get_optional_user),
 ):
-    """Creates a new short URL. If authenticated, the URL is linked to the user."""
+    """
+    Creates a new short URL. If authenticated, the URL is linked to the user.
+    With `dedupe` the caller's existing short URL for the same link is returned instead.
+    """
     user_id = current_user.id if current_user else None
     db_url = create_short_url(db, url, user_id=user_id)
     
@@ -35,18 +81,106 @@ def shorten_url(
         original_url=db_url.original_url,
         short_code=db_url.short_code,
         short_url=get_full_url(db_url.short_code),
-        clicks=db_url.clicks,
+        clicks=get_click_count(db_url),
         created_at=db_url.created_at
     )
 
 
+def validate_batch(body: URLBatchCreate) -> tuple[list[int], list[URLCreate], dict[int, str]]:
+    """Validate batch items individually. Returns (indexes, valid items, errors by index)."""
+    if len(body.items) > settings.SHORTEN_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.SHORTEN_BATCH_MAX_SIZE} items per batch",
+        )
+    indexes, valid, errors = [], [], {}
+    for index, item in enumerate(body.items):
+        try:
+            valid.append(URLCreate.model_validate(item))
+            indexes.append(index)
+        except ValidationError as exc:
+            first = exc.errors()[0]
+            field = ".".join(str(p) for p in first["loc"]) or "item"
+            errors[index] = f"{field}: {first['msg']}"
+    return indexes, valid, errors
+
+
+def batch_response(total: int, indexes: list[int], created: list[URL], errors: dict[int, str]) -> URLBatchResponse:
+    """Assemble per-item results in request order."""
+    results: list[Optional[URLBatchItemResult]] = [None] * total
+    for index, db_url in zip(indexes, created):
+        results[index] = URLBatchItemResult(
+            index=index,
+            url=URLResponse(
+                original_url=db_url.original_url,
+                short_code=db_url.short_code,
+                short_url=get_full_url(db_url.short_code),
+                clicks=db_url.clicks,
+                created_at=db_url.created_at,
+            ),
+        )
+    for index, error in errors.items():
+        results[index] = URLBatchItemResult(index=index, error=error)
+    # New rows come back transient; deduped items are existing rows or repeats of a new one.
+    new_rows = {id(db_url) for db_url in created if sa_inspect(db_url).transient}
+    return URLBatchResponse(
+        created=len(new_rows),
+        failed=len(errors),
+        reused=len(created) - len(new_rows),
+        results=results,
+    )
+
+
+@router.post("/shorten/batch", response_model=URLBatchResponse)
+def shorten_batch(
+    body: URLBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: Optional[Principal] = Depends(get_optional_user),
+):
+    """
+    Shorten many URLs in one request (up to SHORTEN_BATCH_MAX_SIZE).
+    Valid items are inserted together in one transaction; invalid ones are
+    reported with an error at their position.
+    """
+    indexes, valid, errors = validate_batch(body)
+    user_id = current_user.id if current_user else None
+    created = create_short_urls(db, valid, user_id=user_id)
+    return batch_response(len(body.items), indexes, created, errors)
+
+
 @router.get("/my-urls", response_model=list[URLResponse])
 def list_my_urls(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    stream: bool = Query(False, description="Stream every URL (from `cursor` on) instead of one page"),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user),
 ):
-    """List all shortened URLs created by the authenticated user."""
-    urls = get_urls_by_user(db, current_user.id)
+    """
+    List the authenticated user's shortened URLs, newest first, one page at a time.
+    Pass the X-Next-Cursor response header back as `cursor` for the next page.
+    With `stream=true` the whole listing is streamed as one JSON array instead.
+    Send the ETag back as If-None-Match to get a 304 while nothing changed.
+    """
+    # Read the version before the rows: a concurrent write then yields a stale ETag, never a stale body
+    etag = listing_etag(current_user.id, db.scalar(data_version_query(current_user.id)), request.url.query)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+
+    if stream:
+        # The request's session is reused for streaming; release it when done.
+        rows = stream_urls(db, current_user.id, page.cursor)
+        return set_validators(json_stream_response(json_array(rows, encode_url_row, on_close=db.close)), etag)
+
+    urls, next_cursor = get_urls_page(db, current_user.id, page.limit, page.cursor)
+    if settings.FAST_SERIALIZATION:
+        # Straight to bytes: no URLResponse per row, no second validation against response_model
+        fast = FastJSONResponse([url_item(u) for u in urls])
+        PageParams.set_next_cursor(fast, next_cursor)
+        return set_validators(fast, etag)
+    PageParams.set_next_cursor(response, next_cursor)
+    set_validators(response, etag)
     return [
         URLResponse(
             original_url=u.original_url,
@@ -59,30 +193,139 @@ def list_my_urls(
     ]
 
 
+def timeseries_window(
+    granularity: Granularity, start: Optional[datetime], end: Optional[datetime]
+) -> tuple[datetime, datetime]:
+    """Resolve the requested window (default: the last 48 hours / 30 days) and enforce the point limit."""
+    end = utc_naive(end or datetime.now(timezone.utc))
+    width = BUCKET_WIDTH[granularity]
+    start = utc_naive(start) if start else end - width * (48 if granularity == "hour" else 30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start) / width > settings.CLICK_TIMESERIES_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Window spans more than {settings.CLICK_TIMESERIES_MAX_POINTS} {granularity} buckets",
+        )
+    return start, end
+
+
+def timeseries_response(
+    short_code: str, granularity: Granularity, start: datetime, end: datetime, points
+) -> ClickTimeseriesResponse:
+    return ClickTimeseriesResponse(
+        short_code=short_code,
+        granularity=granularity,
+        start=start,
+        end=end,
+        points=[ClickTimeseriesPoint(bucket=bucket, clicks=clicks) for bucket, clicks in points],
+    )
+
+
+def redirect_response(resolved: ResolvedURL, request: Request) -> Response:
+    """
+    The redirect for /r/{short_code}, with validators so caches can reuse it:
+    permanent links are cacheable, temporary ones must be revalidated (and
+    so counted) on every hit. Conditional requests get a 304.
+    """
+    status_code = resolved.redirect_status or settings.REDIRECT_DEFAULT_STATUS
+    validator = f"{status_code} {resolved.short_code} {resolved.original_url}".encode()
+    etag = f'"{hashlib.blake2b(validator, digest_size=8).hexdigest()}"'
+    headers = {
+        "Cache-Control": (
+            settings.REDIRECT_PERMANENT_CACHE_CONTROL
+            if status_code in PERMANENT_REDIRECTS
+            else settings.REDIRECT_TEMPORARY_CACHE_CONTROL
+        ),
+        "ETag": etag,
+        "Last-Modified": http_date(resolved.created_at),
+    }
+    if not_modified(request, etag, resolved.created_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return RedirectResponse(resolved.original_url, status_code=status_code, headers=headers)
+
+
+@router.get(
+    "/r/{short_code}", response_class=RedirectResponse, responses={404: {"description": "Short URL not found"}}
+)
+def redirect_direct(
+    short_code: str, request: Request, db: Session = Depends(get_db), read_db: Session = Depends(get_read_db)
+):
+    """Redirects straight to the original URL (301/302/307/308, per link) with cache headers."""
+    resolved = resolve_url(read_db, short_code, primary=db)
+    if not resolved:
+        raise HTTPException(status_code=404, detail="Short URL not found")
+
+    # Buffered like every click, so a hit costs no database write of its own
+    record_click(db, short_code, request.headers.get("referer"), request.headers.get("user-agent"))
+
+    return redirect_response(resolved, request)
+
+
 @router.get("/{short_code}", response_model=DestinationResponse)
-def redirect_to_url(short_code: str, db: Session = Depends(get_db)):
+def redirect_to_url(
+    short_code: str, request: Request, db: Session = Depends(get_db), read_db: Session = Depends(get_read_db)
+):
     """Returns the original URL if the short code exists so frontend can handle redirect."""
-    db_url = get_url_by_code(db, short_code)
-    if not db_url:
+    # Looked up on the replica; only an unbuffered click touches the primary
+    resolved = resolve_url(read_db, short_code, primary=db)
+    if not resolved:
         raise HTTPException(status_code=404, detail="Short URL not found")
-        
-    # Increment click count
-    increment_clicks(db, db_url)
-    
-    return DestinationResponse(original_url=db_url.original_url)
+
+    # Increment click count and log the click event
+    record_click(db, short_code, request.headers.get("referer"), request.headers.get("user-agent"))
+
+    return DestinationResponse(original_url=resolved.original_url)
+
+
+def info_etag(db_url: URL, clicks: int) -> str:
+    """ETag of an /info response: changes whenever the link or its click count does."""
+    validator = f"{db_url.short_code} {db_url.original_url} {db_url.created_at} {clicks}".encode()
+    return f'"{hashlib.blake2b(validator, digest_size=8).hexdigest()}"'
 
 
 @router.get("/info/{short_code}", response_model=URLResponse)
-def get_url_info(short_code: str, db: Session = Depends(get_db)):
-    """Returns analytics/info about a specific short URL."""
-    db_url = get_url_by_code(db, short_code)
+def get_url_info(
+    short_code: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+):
+    """Returns analytics/info about a specific short URL (with an ETag; If-None-Match gets a 304)."""
+    db_url = get_url_by_code(read_db, short_code, primary=db)
     if not db_url:
         raise HTTPException(status_code=404, detail="Short URL not found")
-        
+
+    etag = info_etag(db_url, get_click_count(db_url))
+    if not_modified(request, etag):
+        return not_modified_response(etag, "no-cache")
+    set_validators(response, etag, "no-cache")
     return URLResponse(
         original_url=db_url.original_url,
         short_code=db_url.short_code,
         short_url=get_full_url(db_url.short_code),
-        clicks=db_url.clicks,
+        clicks=get_click_count(db_url),
         created_at=db_url.created_at
     )
+
+
+@router.get("/info/{short_code}/timeseries", response_model=ClickTimeseriesResponse)
+def get_url_timeseries(
+    short_code: str,
+    granularity: Granularity = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+):
+    """
+    Clicks over time for a short URL, per hour or per day (UTC buckets).
+    Served from the rollup tables, so the newest clicks show up once the
+    rollup job has run (every CLICK_ROLLUP_INTERVAL_SECONDS).
+    """
+    if not resolve_url(read_db, short_code, primary=db):
+        raise HTTPException(status_code=404, detail="Short URL not found")
+    start, end = timeseries_window(granularity, start, end)
+    points = get_click_timeseries(read_db, short_code, granularity, start, end)
+    return timeseries_response(short_code, granularity, start, end, points)
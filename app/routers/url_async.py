@@ -0,0 +1,184 @@
+"""
+Async versions of the URL routes, mounted instead of app.routers.url when
+DB_MODE=async. Handlers run on the event loop with an AsyncSession, so the
+hot redirect/shorten paths skip the threadpool handoff.
+"""
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud_async
+from app.crud import get_click_count, create_short_urls
+from app.database import get_async_db
+from app.principals import Principal
+from app.analytics import Granularity, get_click_timeseries
+from app.routers.url import (
+    get_full_url,
+    encode_url_row,
+    redirect_response,
+    info_etag,
+    validate_batch,
+    batch_response,
+    timeseries_window,
+    timeseries_response,
+)
+from app.schemas import (
+    URLCreate,
+    URLResponse,
+    URLBatchCreate,
+    URLBatchResponse,
+    ClickTimeseriesResponse,
+    DestinationResponse,
+)
+from app.config import get_settings
+from app.dependencies import PageParams, get_current_user_async, get_optional_user_async
+from app.http_cache import not_modified, not_modified_response, set_validators
+from app.versions import data_version_query, listing_etag
+from app.serialization import FastJSONResponse, url_item
+from app.streaming import json_array_async, json_stream_response
+
+
+router = APIRouter()
+settings = get_settings()
+
+
+@router.post("/shorten", response_model=URLResponse)
+async def shorten_url(
+    url: URLCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[Principal] = Depends(get_optional_user_async),
+):
+    """Creates a new short URL. If authenticated, the URL is linked to the user."""
+    user_id = current_user.id if current_user else None
+    db_url = await crud_async.create_short_url(db, url, user_id=user_id)
+
+    return URLResponse(
+        original_url=db_url.original_url,
+        short_code=db_url.short_code,
+        short_url=get_full_url(db_url.short_code),
+        clicks=get_click_count(db_url),
+        created_at=db_url.created_at
+    )
+
+
+@router.post("/shorten/batch", response_model=URLBatchResponse)
+async def shorten_batch(
+    body: URLBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[Principal] = Depends(get_optional_user_async),
+):
+    """Shorten many URLs in one request (see app.routers.url.shorten_batch)."""
+    indexes, valid, errors = validate_batch(body)
+    user_id = current_user.id if current_user else None
+    created = await db.run_sync(create_short_urls, valid, user_id)
+    return batch_response(len(body.items), indexes, created, errors)
+
+
+@router.get("/my-urls", response_model=list[URLResponse])
+async def list_my_urls(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    stream: bool = Query(False, description="Stream every URL (from `cursor` on) instead of one page"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+):
+    """List the authenticated user's shortened URLs, newest first, one page at a time (or streamed)."""
+    version = await db.scalar(data_version_query(current_user.id))
+    etag = listing_etag(current_user.id, version, request.url.query)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+
+    if stream:
+        rows = crud_async.stream_urls(db, current_user.id, page.cursor)
+        return set_validators(json_stream_response(json_array_async(rows, encode_url_row, on_close=db.close)), etag)
+
+    urls, next_cursor = await crud_async.get_urls_page(db, current_user.id, page.limit, page.cursor)
+    if settings.FAST_SERIALIZATION:
+        fast = FastJSONResponse([url_item(u) for u in urls])
+        PageParams.set_next_cursor(fast, next_cursor)
+        return set_validators(fast, etag)
+    PageParams.set_next_cursor(response, next_cursor)
+    set_validators(response, etag)
+    return [
+        URLResponse(
+            original_url=u.original_url,
+            short_code=u.short_code,
+            short_url=get_full_url(u.short_code),
+            clicks=u.clicks,
+            created_at=u.created_at,
+        )
+        for u in urls
+    ]
+
+
+@router.get(
+    "/r/{short_code}", response_class=RedirectResponse, responses={404: {"description": "Short URL not found"}}
+)
+async def redirect_direct(short_code: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Redirects straight to the original URL (301/302/307/308, per link) with cache headers."""
+    resolved = await crud_async.resolve_url(db, short_code)
+    if not resolved:
+        raise HTTPException(status_code=404, detail="Short URL not found")
+
+    await crud_async.record_click(
+        db, short_code, request.headers.get("referer"), request.headers.get("user-agent")
+    )
+
+    return redirect_response(resolved, request)
+
+
+@router.get("/{short_code}", response_model=DestinationResponse)
+async def redirect_to_url(short_code: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Returns the original URL if the short code exists so frontend can handle redirect."""
+    resolved = await crud_async.resolve_url(db, short_code)
+    if not resolved:
+        raise HTTPException(status_code=404, detail="Short URL not found")
+
+    await crud_async.record_click(
+        db, short_code, request.headers.get("referer"), request.headers.get("user-agent")
+    )
+
+    return DestinationResponse(original_url=resolved.original_url)
+
+
+@router.get("/info/{short_code}", response_model=URLResponse)
+async def get_url_info(
+    short_code: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)
+):
+    """Returns analytics/info about a specific short URL (with an ETag; If-None-Match gets a 304)."""
+    db_url = await crud_async.get_url_by_code(db, short_code)
+    if not db_url:
+        raise HTTPException(status_code=404, detail="Short URL not found")
+
+    etag = info_etag(db_url, get_click_count(db_url))
+    if not_modified(request, etag):
+        return not_modified_response(etag, "no-cache")
+    set_validators(response, etag, "no-cache")
+
+    return URLResponse(
+        original_url=db_url.original_url,
+        short_code=db_url.short_code,
+        short_url=get_full_url(db_url.short_code),
+        clicks=get_click_count(db_url),
+        created_at=db_url.created_at
+    )
+
+
+@router.get("/info/{short_code}/timeseries", response_model=ClickTimeseriesResponse)
+async def get_url_timeseries(
+    short_code: str,
+    granularity: Granularity = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Clicks over time for a short URL, per hour or per day, from the rollup tables."""
+    if not await crud_async.resolve_url(db, short_code):
+        raise HTTPException(status_code=404, detail="Short URL not found")
+    start, end = timeseries_window(granularity, start, end)
+    points = await db.run_sync(get_click_timeseries, short_code, granularity, start, end)
+    return timeseries_response(short_code, granularity, start, end, points)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, HttpUrl
 from datetime import datetime
-from typing import Optional
+from typing import Any, Literal, Optional
 
 
 class URLBase(BaseModel):
@@ -10,7 +10,11 @@ class URLBase(BaseModel):
 
 class URLCreate(URLBase):
     """Schema for parsing incoming URL creation requests."""
-    pass
+    # Reuse this caller's existing short URL for the same link; None follows URL_DEDUP_DEFAULT.
+    dedupe: Optional[bool] = None
+    # How /r/{code} redirects: 301/308 may be cached by browsers and CDNs (cached hits aren't counted),
+    # 302/307 are revalidated so every hit is counted. None follows REDIRECT_DEFAULT_STATUS.
+    redirect_status: Optional[Literal[301, 302, 307, 308]] = None
 
 
 class URLResponse(URLBase):
@@ -24,6 +28,41 @@ class URLResponse(URLBase):
         from_attributes = True  # Allows Pydantic to read from SQLAlchemy ORM models
 
 
+class URLBatchCreate(BaseModel):
+    """Request body for batch shortening. Items are validated one by one so a bad URL only fails itself."""
+    items: list[Any]
+
+
+class URLBatchItemResult(BaseModel):
+    """Outcome of one batch item, at the same position as in the request."""
+    index: int
+    url: Optional[URLResponse] = None
+    error: Optional[str] = None
+
+
+class URLBatchResponse(BaseModel):
+    """Response for batch shortening."""
+    created: int
+    failed: int
+    reused: int = 0  # items answered with an existing short URL (dedupe)
+    results: list[URLBatchItemResult]
+
+
+class ClickTimeseriesPoint(BaseModel):
+    """Clicks in one bucket, which starts at `bucket` (UTC)."""
+    bucket: datetime
+    clicks: int
+
+
+class ClickTimeseriesResponse(BaseModel):
+    """Clicks over time for a short URL, read from the hourly/daily rollups. Empty buckets are omitted."""
+    short_code: str
+    granularity: str
+    start: datetime
+    end: datetime
+    points: list[ClickTimeseriesPoint]
+
+
 class DestinationResponse(BaseModel):
     """Schema returned by redirection endpoint to tell frontend where to navigate."""
     original_url: str
@@ -100,3 +139,16 @@ class BookmarkResponse(BaseModel):
             tags=bookmark.tags.split(",") if bookmark.tags else None,
             created_at=bookmark.created_at,
         )
+
+
+class TagCountResponse(BaseModel):
+    """A tag and how many of the user's bookmarks carry it."""
+    name: str
+    count: int
+
+
+class BookmarkImportResponse(BaseModel):
+    """Summary of a bulk bookmark import."""
+    imported: int
+    failed: int
+    errors: list[str]
@@ -0,0 +1,77 @@
+"""
+Low-overhead JSON for the hot list endpoints (FAST_SERIALIZATION).
+
+FastAPI's default path builds a pydantic model per row (re-validating every
+stored URL as an HttpUrl), validates the whole list against response_model a
+second time, and encodes it with the stdlib json module. Stored rows were
+validated on the way in, so this path goes from ORM rows to plain dicts and
+straight to bytes with orjson, or the stdlib encoder if orjson isn't
+installed. The bytes are the same JSON the models produce; routes keep their
+response_model for the OpenAPI schema.
+"""
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi import Response
+
+from app.config import get_settings
+
+try:
+    import orjson
+except ImportError:  # optional: same output, a few times slower
+    orjson = None
+
+settings = get_settings()
+
+# get_full_url(code) is just this plus the code; FRONTEND_URL is fixed for the process
+SHORT_URL_PREFIX = f"{settings.FRONTEND_URL.rstrip('/')}/short/"
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        # pydantic writes a zero UTC offset as "Z"
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON, as FastAPI's JSONResponse would render the equivalent models."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    """A JSON response whose content is already plain dicts/lists: encoded as-is, no validation."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def url_item(u) -> dict:
+    """A URLResponse as a dict, from a URL row."""
+    return {
+        "original_url": u.original_url,
+        "short_code": u.short_code,
+        "short_url": SHORT_URL_PREFIX + u.short_code,
+        "clicks": u.clicks,
+        "created_at": u.created_at,
+    }
+
+
+def bookmark_item(b) -> dict:
+    """A BookmarkResponse as a dict, from a Bookmark row (tags split as in BookmarkResponse.from_model)."""
+    tags = b.tags
+    return {
+        "id": b.id,
+        "user_id": b.user_id,
+        "url": b.url,
+        "title": b.title,
+        "description": b.description,
+        "tags": tags.split(",") if tags else None,
+        "created_at": b.created_at,
+    }
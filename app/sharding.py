@@ -0,0 +1,283 @@
+"""
+Hash sharding across several databases (SHARD_COUNT > 1).
+
+URL rows, and the click tables keyed by short code, live on the shard
+picked by a hash of short_code; bookmarks and their tags on the shard picked
+by a hash of user_id. Shard 0 is DATABASE_URL and also holds the unsharded
+tables (users, code sequences). Each shard has its own engine and pool, so
+writes to different shards don't queue behind one SQLite writer lock.
+
+`ShardedSession` routes every statement:
+
+  * flushed objects by their shard key (URL.short_code, Bookmark.user_id);
+  * statements by an explicit shard (`bind_arguments={"shard_id": "2"}`), else
+    by the shard `pinned()` on the session, else by `key == value` /
+    `key IN (...)` comparisons in the WHERE clause;
+  * reads without any of those run on every shard and are concatenated;
+    writes without them raise ShardRoutingError rather than guessing.
+
+A transaction that writes to several shards commits them one after the
+other; there is no two-phase commit between SQLite files.
+
+With SHARD_COUNT=1 the app uses a plain Session and none of this runs;
+group_by_shard() and fan_out() then reduce to a single group / query.
+"""
+import contextvars
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import PurePosixPath
+from typing import Any, Callable, Iterable, Optional, Sequence, TypeVar
+
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext import horizontal_shard
+from sqlalchemy.orm import Mapper, Session, sessionmaker
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BindParameter, ColumnClause
+from sqlalchemy.sql.util import find_tables
+
+T = TypeVar("T")
+
+# Session shard ids are the layout positions as strings ("0", "1", ...): SQLAlchemy
+# treats a falsy identity token as "no token", which would make 0 ambiguous.
+HOME_SHARD = "0"
+
+# Sharded tables -> the column their rows are routed by. None: the table has no
+# key of its own and is only reached with an explicit or pinned shard.
+SHARD_KEYS: dict[str, Optional[str]] = {
+    "urls": "short_code",
+    "click_events": "short_code",
+    "click_rollups_hourly": "short_code",
+    "click_rollups_daily": "short_code",
+    "rollup_watermarks": None,
+    "bookmarks": "user_id",
+    "tags": "user_id",
+    "bookmark_tags": None,
+    "bookmarks_fts": None,
+}
+
+_PIN = "pinned_shard"
+
+
+class ShardRoutingError(RuntimeError):
+    """A statement touches sharded tables but nothing says which shard."""
+
+
+# ── Shard selection ──────────────────────────────────────────
+
+
+def shard_index(key: str, count: int) -> int:
+    """Stable shard position for a key (the same in every process, unlike hash())."""
+    if count == 1:
+        return 0
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big") % count
+
+
+def shard_for_code(short_code: str, count: int) -> int:
+    return shard_index(short_code, count)
+
+
+def shard_for_user(user_id: int, count: int) -> int:
+    return shard_index(str(user_id), count)
+
+
+_BY_KEY: dict[str, Callable[[Any, int], int]] = {
+    "short_code": shard_for_code,
+    "user_id": shard_for_user,
+}
+
+
+def shard_database_urls(database_url: str, count: int, extra_urls: str = "") -> list[str]:
+    """
+    One URL per shard. Shard 0 is always `database_url`; shards 1..count-1 come
+    from `extra_urls` (comma-separated) or, for a SQLite file, sit next to it as
+    `<name>.shard<i>.db`.
+    """
+    if count < 1:
+        raise ValueError("SHARD_COUNT must be at least 1")
+    extra = [u.strip() for u in extra_urls.split(",") if u.strip()]
+    if extra:
+        if len(extra) != count - 1:
+            raise ValueError(f"SHARD_DATABASE_URLS lists {len(extra)} databases; SHARD_COUNT={count} needs {count - 1}")
+        return [database_url, *extra]
+    if count == 1:
+        return [database_url]
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError("Set SHARD_DATABASE_URLS; shard URLs are only derived for SQLite database files")
+    path = PurePosixPath(url.database)
+    return [database_url] + [
+        url.set(database=str(path.with_name(f"{path.stem}.shard{i}{path.suffix}"))).render_as_string(
+            hide_password=False
+        )
+        for i in range(1, count)
+    ]
+
+
+# ── Statement routing ────────────────────────────────────────
+
+
+def _sharded_tables(statement) -> set[str]:
+    tables = find_tables(statement, check_columns=True, include_aliases=True, include_joins=True, include_crud=True)
+    return {table.name for table in tables if getattr(table, "name", None) in SHARD_KEYS}
+
+
+def _where_keys(statement, tables: set[str]) -> Optional[list[tuple[str, Any]]]:
+    """(key column, value) pairs compared with == or IN in the WHERE clause, or None if there are none."""
+    whereclause = getattr(statement, "whereclause", None)
+    if whereclause is None:
+        return None
+    found: list[tuple[str, Any]] = []
+
+    def visit_binary(binary) -> None:
+        column, value = binary.left, binary.right
+        if isinstance(column, BindParameter):
+            column, value = value, column
+        if not isinstance(column, ColumnClause) or not isinstance(value, BindParameter):
+            return
+        table = getattr(column.table, "name", None)
+        if table not in tables or SHARD_KEYS[table] != column.name:
+            return
+        resolved = value.effective_value
+        if resolved is None:
+            return  # e.g. an executemany bindparam, filled per row
+        if binary.operator is operators.eq:
+            found.append((column.name, resolved))
+        elif binary.operator is operators.in_op:
+            found.extend((column.name, item) for item in resolved)
+
+    visitors.traverse(whereclause, {}, {"binary": visit_binary})
+    return found or None
+
+
+class ShardedSession(horizontal_shard.ShardedSession):
+    """A Session over several shard engines that routes each statement as described above."""
+
+    def __init__(self, shards: dict[str, Engine], **kwargs):
+        super().__init__(
+            shard_chooser=self._shard_for_instance,
+            identity_chooser=self._shards_for_identity,
+            execute_chooser=self._shards_for_execute,
+            shards=shards,
+            **kwargs,
+        )
+        self.shards = dict(shards)
+        self.shard_ids = sorted(shards, key=int)
+
+    def _route(self, statement, fan_out: bool) -> list[str]:
+        tables = _sharded_tables(statement)
+        if not tables:
+            return [HOME_SHARD]
+        pinned = self.info.get(_PIN)
+        if pinned is not None:
+            return [pinned]
+        keys = _where_keys(statement, tables)
+        if keys:
+            count = len(self.shard_ids)
+            return sorted({str(_BY_KEY[column](value, count)) for column, value in keys})
+        if fan_out:
+            return self.shard_ids
+        raise ShardRoutingError(f"No shard key for a statement on {', '.join(sorted(tables))}")
+
+    def _single_shard(self, statement) -> str:
+        shards = self._route(statement, fan_out=False)
+        if len(shards) != 1:
+            raise ShardRoutingError(f"Statement spans shards {shards}; run it once per shard")
+        return shards[0]
+
+    def _shard_for_instance(self, mapper, instance, clause=None, **kw) -> str:
+        key = SHARD_KEYS.get(mapper.local_table.name, "")
+        if instance is not None and key:
+            return str(_BY_KEY[key](getattr(instance, key), len(self.shard_ids)))
+        if instance is not None and key == "":
+            return HOME_SHARD
+        return self._single_shard(clause if clause is not None else mapper.local_table.select())
+
+    def _shards_for_identity(self, mapper, primary_key, *, lazy_loaded_from, **kw) -> list[str]:
+        if lazy_loaded_from is not None:
+            return [lazy_loaded_from.identity_token]
+        if mapper.local_table.name not in SHARD_KEYS:
+            return [HOME_SHARD]
+        pinned = self.info.get(_PIN)
+        return [pinned] if pinned is not None else self.shard_ids
+
+    def _shards_for_execute(self, orm_context) -> list[str]:
+        return self._route(orm_context.statement, fan_out=orm_context.is_select)
+
+    def get_bind(self, mapper=None, *, shard_id=None, instance=None, clause=None, **kw):
+        if shard_id is None and instance is None and not isinstance(mapper, Mapper):
+            # e.g. get_bind() with no arguments, to check the dialect
+            shard_id = self._single_shard(clause) if clause is not None else self.info.get(_PIN, HOME_SHARD)
+        return super().get_bind(mapper, shard_id=shard_id, instance=instance, clause=clause, **kw)
+
+
+def sharded_sessionmaker(engines: Sequence[Engine], **kwargs) -> sessionmaker:
+    return sessionmaker(class_=ShardedSession, shards={str(i): e for i, e in enumerate(engines)}, **kwargs)
+
+
+# ── Helpers for crud code (no-ops on a plain Session) ────────
+
+
+def shard_count(db: Session) -> int:
+    return len(db.shard_ids) if isinstance(db, ShardedSession) else 1
+
+
+def code_shard(db: Session, short_code: str) -> str:
+    return str(shard_for_code(short_code, shard_count(db)))
+
+
+def user_shard(db: Session, user_id: int) -> str:
+    return str(shard_for_user(user_id, shard_count(db)))
+
+
+@contextmanager
+def pinned(db: Session, shard_id: str):
+    """Route statements without a shard key of their own (e.g. bookmark_tags) to `shard_id` inside the block."""
+    previous = db.info.get(_PIN)
+    db.info[_PIN] = shard_id
+    try:
+        yield db
+    finally:
+        if previous is None:
+            db.info.pop(_PIN, None)
+        else:
+            db.info[_PIN] = previous
+
+
+def group_by_shard(db: Session, items: Iterable[T], key: Callable[[T], str]) -> dict[str, list[T]]:
+    """Items bucketed by the shard of key(item); everything in one bucket when unsharded, none if empty."""
+    count = shard_count(db)
+    if count == 1:
+        items = list(items)
+        return {HOME_SHARD: items} if items else {}
+    groups: dict[str, list[T]] = {}
+    for item in items:
+        groups.setdefault(str(shard_index(key(item), count)), []).append(item)
+    return groups
+
+
+@lru_cache
+def _read_pool(workers: int) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard-read")
+
+
+def fan_out(db: Session, stmt) -> list[list]:
+    """
+    Run a read on every shard concurrently and return each shard's rows.
+    Each shard is queried in its own short-lived session, so the returned
+    objects are detached: fine to serialize, not to modify.
+    """
+    if not isinstance(db, ShardedSession):
+        return [db.execute(stmt).all()]
+
+    def run(engine: Engine) -> list:
+        with Session(engine) as session:
+            return session.execute(stmt).all()
+
+    pool = _read_pool(len(db.shard_ids))
+    # A context copy per task keeps per-request SQL metrics/profiles attributed to the request.
+    futures = [
+        pool.submit(contextvars.copy_context().run, run, db.shards[shard_id]) for shard_id in db.shard_ids
+    ]
+    return [future.result() for future in futures]
@@ -0,0 +1,75 @@
+"""
+Streamed JSON array responses for the list endpoints (?stream=true).
+
+Rows come from a server-side cursor (yield_per) and are encoded one at a
+time, then written out in chunks of STREAM_BATCH_SIZE rows, so memory and
+time-to-first-byte don't grow with the size of the listing. The body is
+still a single JSON array, same as the paginated response.
+"""
+from typing import AsyncIterator, Callable, Iterable, Iterator, Optional, TypeVar
+
+from fastapi.responses import StreamingResponse
+
+from app.config import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+def json_array(
+    rows: Iterable[T],
+    encode: Callable[[T], str],
+    chunk_size: Optional[int] = None,
+    on_close: Optional[Callable[[], None]] = None,
+) -> Iterator[bytes]:
+    """Yield a JSON array of encode(row) for each row, chunk_size rows per yield."""
+    chunk_size = chunk_size or settings.STREAM_BATCH_SIZE
+    try:
+        parts = ["["]
+        count = 0
+        for row in rows:
+            if count:
+                parts.append(",")
+            parts.append(encode(row))
+            count += 1
+            if count % chunk_size == 0:
+                yield "".join(parts).encode()
+                parts = []
+        parts.append("]")
+        yield "".join(parts).encode()
+    finally:
+        if on_close is not None:
+            on_close()
+
+
+async def json_array_async(
+    rows: AsyncIterator[T],
+    encode: Callable[[T], str],
+    chunk_size: Optional[int] = None,
+    on_close: Optional[Callable[[], object]] = None,
+) -> AsyncIterator[bytes]:
+    """Async counterpart of json_array; on_close may be a coroutine function."""
+    chunk_size = chunk_size or settings.STREAM_BATCH_SIZE
+    try:
+        parts = ["["]
+        count = 0
+        async for row in rows:
+            if count:
+                parts.append(",")
+            parts.append(encode(row))
+            count += 1
+            if count % chunk_size == 0:
+                yield "".join(parts).encode()
+                parts = []
+        parts.append("]")
+        yield "".join(parts).encode()
+    finally:
+        if on_close is not None:
+            result = on_close()
+            if hasattr(result, "__await__"):
+                await result
+
+
+def json_stream_response(body) -> StreamingResponse:
+    return StreamingResponse(body, media_type="application/json")
@@ -0,0 +1,153 @@
+"""
+Normalized tag storage: a `tags` row per (user, tag name) with a
+maintained bookmark_count, and `bookmark_tags` links. Bookmark.tags keeps
+the comma-separated list as entered, for display only.
+"""
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import Select, and_, bindparam, delete, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Bookmark, Tag, bookmark_tags
+
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> list[str]:
+    """Stripped, lower-cased, de-duplicated tag names in their original order."""
+    seen: dict[str, None] = {}
+    for tag in tags or ():
+        name = tag.strip().lower()
+        if name:
+            seen.setdefault(name)
+    return list(seen)
+
+
+def _insert_ignoring_duplicates(db: Session, table, rows: list[dict], index_elements: list[str]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        db.execute(insert(table), rows)
+        return
+    db.execute(dialect_insert(table).on_conflict_do_nothing(index_elements=index_elements), rows)
+
+
+def _get_or_create_tag_ids(db: Session, user_id: int, names: Iterable[str]) -> dict[str, int]:
+    names = list(names)
+    if not names:
+        return {}
+    _insert_ignoring_duplicates(
+        db,
+        Tag.__table__,
+        [{"user_id": user_id, "name": name, "bookmark_count": 0} for name in names],
+        ["user_id", "name"],
+    )
+    rows = db.execute(select(Tag.name, Tag.id).where(Tag.user_id == user_id, Tag.name.in_(names)))
+    return dict(rows.all())
+
+
+def _bump_counts(db: Session, deltas: dict[int, int]) -> None:
+    if deltas:
+        tags = Tag.__table__
+        db.execute(
+            tags.update()
+            .where(tags.c.id == bindparam("b_id"))
+            .values(bookmark_count=tags.c.bookmark_count + bindparam("b_delta")),
+            [{"b_id": tag_id, "b_delta": delta} for tag_id, delta in deltas.items()],
+        )
+
+
+def link_tags(db: Session, user_id: int, names_by_bookmark: dict[int, list[str]]) -> None:
+    """Attach normalized tag names to bookmarks (all owned by user_id) and bump counters."""
+    per_tag = Counter(name for names in names_by_bookmark.values() for name in names)
+    ids = _get_or_create_tag_ids(db, user_id, per_tag)
+    links = [
+        {"bookmark_id": bookmark_id, "tag_id": ids[name]}
+        for bookmark_id, names in names_by_bookmark.items()
+        for name in names
+    ]
+    if links:
+        db.execute(insert(bookmark_tags), links)
+        _bump_counts(db, {ids[name]: count for name, count in per_tag.items()})
+
+
+def unlink_tags(db: Session, bookmark_id: int, names: Optional[list[str]] = None) -> None:
+    """Detach tag names (default: all tags) from a bookmark and decrement their counters."""
+    linked = select(bookmark_tags.c.tag_id).where(bookmark_tags.c.bookmark_id == bookmark_id)
+    if names is not None:
+        linked = linked.join(Tag, Tag.id == bookmark_tags.c.tag_id).where(Tag.name.in_(names))
+    tag_ids = list(db.scalars(linked))
+    if tag_ids:
+        db.execute(
+            delete(bookmark_tags).where(
+                bookmark_tags.c.bookmark_id == bookmark_id,
+                bookmark_tags.c.tag_id.in_(tag_ids),
+            )
+        )
+        _bump_counts(db, {tag_id: -1 for tag_id in tag_ids})
+
+
+def replace_tags(db: Session, user_id: int, bookmark_id: int, old: list[str], new: list[str]) -> None:
+    """Move a bookmark from the `old` tag set to `new`, touching only the difference."""
+    removed = [name for name in old if name not in new]
+    added = [name for name in new if name not in old]
+    if removed:
+        unlink_tags(db, bookmark_id, removed)
+    if added:
+        link_tags(db, user_id, {bookmark_id: added})
+
+
+def tagged_bookmark_ids(user_id: int, names: list[str], match_all: bool = True) -> Select:
+    """Sub-select of bookmark ids carrying all (or any) of the tag names."""
+    query = (
+        select(bookmark_tags.c.bookmark_id)
+        .join(Tag, Tag.id == bookmark_tags.c.tag_id)
+        .where(Tag.user_id == user_id, Tag.name.in_(names))
+    )
+    if match_all and len(names) > 1:
+        query = query.group_by(bookmark_tags.c.bookmark_id).having(
+            func.count(bookmark_tags.c.tag_id) == len(names)
+        )
+    return query
+
+
+def get_tag_counts(db: Session, user_id: int) -> list[tuple[str, int]]:
+    """(name, bookmark count) for every tag in use, most used first."""
+    rows = db.execute(
+        select(Tag.name, Tag.bookmark_count)
+        .where(Tag.user_id == user_id, Tag.bookmark_count > 0)
+        .order_by(Tag.bookmark_count.desc(), Tag.name)
+    )
+    return [(name, count) for name, count in rows]
+
+
+def backfill_tags(db: Session, batch_size: int = 1000) -> int:
+    """
+    Migrate comma-separated Bookmark.tags into the tags tables for bookmarks
+    that have tags but no links yet. Idempotent; returns bookmarks migrated.
+    """
+    migrated, last_id = 0, 0
+    unlinked = and_(
+        Bookmark.tags.isnot(None),
+        Bookmark.tags != "",
+        ~exists().where(bookmark_tags.c.bookmark_id == Bookmark.id),
+    )
+    while True:
+        batch = db.execute(
+            select(Bookmark.id, Bookmark.user_id, Bookmark.tags)
+            .where(unlinked, Bookmark.id > last_id)
+            .order_by(Bookmark.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return migrated
+        by_user: dict[int, dict[int, list[str]]] = {}
+        for bookmark_id, user_id, tags in batch:
+            by_user.setdefault(user_id, {})[bookmark_id] = normalize_tags(tags.split(","))
+        for user_id, names_by_bookmark in by_user.items():
+            link_tags(db, user_id, names_by_bookmark)
+        db.commit()
+        migrated += len(batch)
+        last_id = batch[-1][0]
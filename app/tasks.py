@@ -0,0 +1,60 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Runs a function on a daemon thread every `interval` seconds
+    (interval None: only when triggered).
+
+    `trigger()` wakes the thread early (e.g. when a buffer crosses its size
+    threshold). Exceptions are logged and never kill the thread.
+    """
+
+    def __init__(self, name: str, interval: Optional[float], func: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, run_immediately: bool = False) -> None:
+        """Start the thread; with run_immediately the first run doesn't wait an interval."""
+        if self.running:
+            return
+        self._stopping.clear()
+        if run_immediately:
+            self._wake.set()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def trigger(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the thread and wait for an in-progress run to finish."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+            try:
+                self.func()
+            except Exception:
+                logger.exception("Periodic task %s failed", self.name)
@@ -0,0 +1,71 @@
+"""
+Micro-benchmarks of the hot CRUD functions against a seeded database:
+create_short_url, get_url_by_code, increment_clicks and get_bookmarks with a
+search keyword or a tag (for the user with the most bookmarks).
+
+    python -m benchmarks.bench_crud --urls 2000000 --bookmarks 200000 --ops 5000
+"""
+import argparse
+import itertools
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.schemas import URLCreate
+from benchmarks.common import time_calls, write_results
+from benchmarks.seed import (
+    TAG_VOCABULARY,
+    WORDS,
+    heaviest_bookmark_user,
+    sample_codes,
+    seed_bookmarks,
+    seed_urls,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="sqlite:///./bench.db")
+    parser.add_argument("--urls", type=int, default=1_000_000, help="urls rows before measuring")
+    parser.add_argument("--bookmarks", type=int, default=100_000, help="bookmarks rows before measuring")
+    parser.add_argument("--ops", type=int, default=5_000, help="calls per benchmark (searches use ops // 10)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"seeding {args.db} up to {args.urls:,} urls / {args.bookmarks:,} bookmarks ...")
+    seed_urls(args.db, args.urls, seed=args.seed)
+    seed_bookmarks(args.db, args.bookmarks, seed=args.seed)
+    codes = itertools.cycle(sample_codes(args.db, min(args.ops, 10_000), seed=args.seed))
+    user_id = heaviest_bookmark_user(args.db)
+    words = itertools.cycle(WORDS)
+    tags = itertools.cycle(TAG_VOCABULARY[:20])
+    counter = itertools.count()
+
+    engine = create_engine(args.db, connect_args={"check_same_thread": False})
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with Session() as db:
+        hot = crud.get_url_by_code(db, next(codes))
+        benchmarks = {
+            "create_short_url": (
+                lambda: crud.create_short_url(db, URLCreate(original_url=f"https://bench.example/{next(counter)}")),
+                args.ops,
+            ),
+            "get_url_by_code": (lambda: crud.get_url_by_code(db, next(codes)), args.ops),
+            "increment_clicks": (lambda: crud.increment_clicks(db, hot), args.ops),
+            "get_bookmarks_search": (lambda: crud.get_bookmarks(db, user_id, search=next(words)), args.ops // 10),
+            "get_bookmarks_tag": (lambda: crud.get_bookmarks(db, user_id, tag=next(tags)), args.ops // 10),
+        }
+
+        results = {"urls": args.urls, "bookmarks": args.bookmarks, "bookmark_user_id": user_id}
+        for name, (func, count) in benchmarks.items():
+            results[name] = r = time_calls(func, max(1, count))
+            print(f"{name:>22}: {r['ops_per_sec']:9.0f} ops/s  p50 {r['p50_ms']:.3f} ms  p99 {r['p99_ms']:.3f} ms")
+
+    print("results:", write_results("crud", results))
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
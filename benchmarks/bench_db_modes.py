@@ -0,0 +1,92 @@
+"""
+Sync vs async database mode under concurrent load.
+
+Each mode runs in its own interpreter (DB_MODE is read at import time) and
+drives the ASGI app in-process with httpx, mixing redirects and shortens.
+
+    python -m benchmarks.bench_db_modes --requests 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import drive, write_results
+
+
+async def _drive(requests: int, concurrency: int, shorten_ratio: float) -> dict:
+    import httpx
+
+    from app.database import Base, engine
+    from app.main import app
+
+    Base.metadata.create_all(bind=engine)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        codes = []
+        for i in range(100):
+            resp = await client.post("/shorten", json={"original_url": f"https://example.com/{i}"})
+            codes.append(resp.json()["short_code"])
+
+        rng = random.Random(0)
+
+        async def send(i: int) -> None:
+            if rng.random() < shorten_ratio:
+                resp = await client.post("/shorten", json={"original_url": f"https://load.example/{i}"})
+            else:
+                resp = await client.get(f"/{rng.choice(codes)}")
+            resp.raise_for_status()
+
+        return await drive(send, requests, concurrency)
+
+
+def _run_child(args) -> None:
+    result = asyncio.run(_drive(args.requests, args.concurrency, args.shorten_ratio))
+    print(json.dumps(result))
+
+
+def _run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DB_MODE": mode,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+        }
+        out = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.bench_db_modes", "--child",
+                "--requests", str(args.requests),
+                "--concurrency", str(args.concurrency),
+                "--shorten-ratio", str(args.shorten_ratio),
+            ],
+            env=env, check=True, capture_output=True, text=True,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--shorten-ratio", type=float, default=0.1, help="fraction of requests that are shortens")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child(args)
+        return
+
+    results = {"concurrency": args.concurrency, "shorten_ratio": args.shorten_ratio}
+    for mode in ("sync", "async"):
+        results[mode] = _run_mode(mode, args)
+        r = results[mode]
+        print(f"{mode:>6}: {r['req_per_sec']:8.0f} req/s  p50 {r['p50_ms']:.2f} ms  p99 {r['p99_ms']:.2f} ms")
+    print("results:", write_results("db_modes", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+In-process load test of the ASGI app (httpx, no network) against a seeded
+database. Each scenario runs on its own and reports throughput and
+p50/p95/p99:
+
+    redirect   GET /{short_code}, Zipf-skewed over existing codes
+    shorten    POST /shorten with fresh URLs
+    bookmarks  GET /bookmarks for the heaviest user: first page, search, tag
+
+    python -m benchmarks.bench_load --urls 1000000 --bookmarks 100000 --requests 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+
+from benchmarks.common import drive, write_results
+
+SCENARIOS = ("redirect", "shorten", "bookmarks")
+
+
+async def _run(args) -> dict:
+    # Imported here: the app reads DATABASE_URL at import time.
+    import httpx
+
+    from app.auth import create_jwt
+    from app.main import app
+    from benchmarks.seed import (
+        TAG_VOCABULARY,
+        WORDS,
+        heaviest_bookmark_user,
+        sample_codes,
+        seed_bookmarks,
+        seed_urls,
+    )
+
+    print(f"seeding {args.db} up to {args.urls:,} urls / {args.bookmarks:,} bookmarks ...")
+    seed_urls(args.db, args.urls, seed=args.seed)
+    seed_bookmarks(args.db, args.bookmarks, seed=args.seed)
+    codes = sample_codes(args.db, 1_000, seed=args.seed)
+    code_weights = [1 / rank for rank in range(1, len(codes) + 1)]
+    user_id = heaviest_bookmark_user(args.db)
+    auth = {"Authorization": f"Bearer {create_jwt(user_id, f'bench-user-{user_id}@example.com')}"}
+    rng = random.Random(args.seed)
+
+    async def redirect(client, i: int) -> httpx.Response:
+        return await client.get(f"/{rng.choices(codes, weights=code_weights)[0]}")
+
+    async def shorten(client, i: int) -> httpx.Response:
+        return await client.post("/shorten", json={"original_url": f"https://load.example/{args.seed}/{i}"})
+
+    async def bookmarks(client, i: int) -> httpx.Response:
+        params = [{}, {"search": rng.choice(WORDS)}, {"tag": rng.choice(TAG_VOCABULARY[:20])}][i % 3]
+        return await client.get("/bookmarks", params={**params, "limit": 50}, headers=auth)
+
+    scenarios = {"redirect": redirect, "shorten": shorten, "bookmarks": bookmarks}
+    results = {"urls": args.urls, "bookmarks": args.bookmarks, "concurrency": args.concurrency}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenarios:
+                scenario = scenarios[name]
+
+                async def send(i: int) -> None:
+                    (await scenario(client, i)).raise_for_status()
+
+                await drive(send, min(200, args.requests), args.concurrency)  # warm caches and pools
+                results[name] = r = await drive(send, args.requests, args.concurrency)
+                print(f"{name:>10}: {r['req_per_sec']:8.0f} req/s  p50 {r['p50_ms']:.2f} ms  "
+                      f"p95 {r['p95_ms']:.2f} ms  p99 {r['p99_ms']:.2f} ms")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="reuse this SQLite URL instead of a temporary database")
+    parser.add_argument("--urls", type=int, default=1_000_000)
+    parser.add_argument("--bookmarks", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=5_000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        args.db = args.db or f"sqlite:///{tmp}/bench.db"
+        os.environ["DATABASE_URL"] = args.db
+        results = asyncio.run(_run(args))
+    print("results:", write_results("load", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Per-row cost of serializing list responses, model path vs FAST_SERIALIZATION.
+
+    encode   rows -> JSON bytes in-process: URLResponse/BookmarkResponse per row,
+             validated and dumped against list[...] as FastAPI does, vs
+             app.serialization (orjson, and the stdlib fallback)
+    http     GET /my-urls and /bookmarks (one page of --rows) end to end,
+             with FAST_SERIALIZATION off and on
+
+    python -m benchmarks.bench_serialization --rows 1000 --repeat 50
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from benchmarks.common import write_results
+
+
+def _rows(count: int) -> tuple[list, list]:
+    start = datetime(2024, 1, 1)
+    urls = [
+        SimpleNamespace(
+            original_url=f"https://example.com/articles/{i}?ref=feed",
+            short_code=f"c{i:06d}",
+            clicks=i % 97,
+            created_at=start + timedelta(seconds=i, microseconds=i),
+        )
+        for i in range(count)
+    ]
+    bookmarks = [
+        SimpleNamespace(
+            id=i,
+            user_id=1,
+            url=f"https://example.org/notes/{i}",
+            title=f"Note {i}",
+            description="Something worth keeping" if i % 2 else None,
+            tags="python,reading,later" if i % 3 else None,
+            created_at=start + timedelta(seconds=i),
+        )
+        for i in range(count)
+    ]
+    return urls, bookmarks
+
+
+def _per_row_us(func, rows: int, repeat: int) -> float:
+    func()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / (repeat * rows) * 1e6
+
+
+def _encode(args) -> dict:
+    from pydantic import TypeAdapter
+
+    from app import serialization
+    from app.routers.url import get_full_url
+    from app.schemas import BookmarkResponse, URLResponse
+    from app.serialization import bookmark_item, dumps, url_item
+
+    urls, bookmarks = _rows(args.rows)
+    url_list = TypeAdapter(list[URLResponse])
+    bookmark_list = TypeAdapter(list[BookmarkResponse])
+
+    def fastapi_json(adapter, content) -> bytes:
+        # What FastAPI does with a returned list: validate against response_model, dump, json.dumps
+        data = adapter.dump_python(adapter.validate_python(content), mode="json")
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def url_models():
+        return fastapi_json(url_list, [
+            URLResponse(
+                original_url=u.original_url,
+                short_code=u.short_code,
+                short_url=get_full_url(u.short_code),
+                clicks=u.clicks,
+                created_at=u.created_at,
+            )
+            for u in urls
+        ])
+
+    def bookmark_models():
+        return fastapi_json(bookmark_list, [BookmarkResponse.from_model(b) for b in bookmarks])
+
+    def url_fast():
+        return dumps([url_item(u) for u in urls])
+
+    def bookmark_fast():
+        return dumps([bookmark_item(b) for b in bookmarks])
+
+    assert url_fast() == url_models() and bookmark_fast() == bookmark_models()
+    results = {
+        "urls_models_us": _per_row_us(url_models, args.rows, args.repeat),
+        "urls_fast_us": _per_row_us(url_fast, args.rows, args.repeat),
+        "bookmarks_models_us": _per_row_us(bookmark_models, args.rows, args.repeat),
+        "bookmarks_fast_us": _per_row_us(bookmark_fast, args.rows, args.repeat),
+    }
+    if serialization.orjson is not None:
+        orjson, serialization.orjson = serialization.orjson, None
+        try:
+            results["urls_fast_stdlib_us"] = _per_row_us(url_fast, args.rows, args.repeat)
+            results["bookmarks_fast_stdlib_us"] = _per_row_us(bookmark_fast, args.rows, args.repeat)
+        finally:
+            serialization.orjson = orjson
+    return results
+
+
+def _http(args) -> dict:
+    from fastapi.testclient import TestClient
+
+    from app.auth import create_jwt
+    from app.config import get_settings
+    from app.crud import bulk_create_bookmarks, create_short_urls
+    from app.database import SessionLocal
+    from app.main import app
+    from app.manage import ensure_schema
+    from app.models import User
+    from app.schemas import BookmarkCreate, URLCreate
+
+    settings = get_settings()
+    ensure_schema()
+    with SessionLocal() as db:
+        user = User(email="bench@example.com")
+        db.add(user)
+        db.commit()
+        create_short_urls(db, [URLCreate(original_url=f"https://example.com/a/{i}") for i in range(args.rows)], user.id)
+        bulk_create_bookmarks(
+            db,
+            user.id,
+            [BookmarkCreate(url=f"https://example.org/{i}", title=f"Note {i}", tags=["a", "b"]) for i in range(args.rows)],
+        )
+        headers = {"Authorization": f"Bearer {create_jwt(user.id, user.email)}"}
+
+    results = {}
+    with TestClient(app) as client:
+        for path in ("/my-urls", "/bookmarks"):
+            for fast in (False, True):
+                settings.FAST_SERIALIZATION = fast
+
+                def get():
+                    assert client.get(path, params={"limit": args.rows}, headers=headers).status_code == 200
+
+                key = f"{path.strip('/').replace('-', '_')}_{'fast' if fast else 'models'}_us"
+                results[key] = _per_row_us(get, args.rows, max(1, args.repeat // 5))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="rows per response")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before any app import: the app reads DATABASE_URL at import time.
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/serialization.db"
+        results = {"rows": args.rows, "encode": _encode(args), "http": _http(args)}
+
+    for section in ("encode", "http"):
+        for key, value in results[section].items():
+            print(f"{section:>6} {key:>26}: {value:8.2f} µs/row")
+    print("results:", write_results("serialization", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Write throughput by shard count.
+
+Each shard count runs in its own interpreter (SHARD_COUNT is read at import
+time) against fresh SQLite files; `--writers` threads shorten links through
+crud.create_short_url, one transaction per link.
+
+    python -m benchmarks.bench_shards --shards 1 2 4 --writes 20000 --writers 16
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import percentiles, write_results
+
+
+def _run_child(args) -> None:
+    from app.crud import create_short_url
+    from app.database import SessionLocal
+    from app.manage import ensure_schema
+    from app.schemas import URLCreate
+
+    ensure_schema()
+    samples: list[float] = []
+
+    def write(i: int) -> None:
+        with SessionLocal() as db:
+            t0 = time.perf_counter()
+            create_short_url(db, URLCreate(original_url=f"https://shard.example/{i}"))
+            samples.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.writers) as pool:
+        list(pool.map(write, range(args.writes)))
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"writes": args.writes, "seconds": elapsed, "writes_per_sec": args.writes / elapsed, **percentiles(samples)}))
+
+
+def _run_shards(count: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "SHARD_COUNT": str(count),
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "CLICK_ROLLUP_INTERVAL_SECONDS": "0",
+        }
+        out = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.bench_shards", "--child",
+                "--writes", str(args.writes),
+                "--writers", str(args.writers),
+            ],
+            env=env, check=True, capture_output=True, text=True,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--writes", type=int, default=20_000)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child(args)
+        return
+
+    results = {"writers": args.writers}
+    for count in args.shards:
+        results[f"shards_{count}"] = r = _run_shards(count, args)
+        print(f"{count:>3} shards: {r['writes_per_sec']:8.0f} writes/s  p50 {r['p50_ms']:.2f} ms  p99 {r['p99_ms']:.2f} ms")
+    print("results:", write_results("shards", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Shorten throughput against a large, pre-populated urls table.
+
+Compares the old random.choice + SELECT-per-attempt loop with the
+"random" (CSPRNG + unique index) and "sequence" allocators.
+
+    python -m benchmarks.bench_shorten --rows 10000000 --ops 5000
+"""
+import argparse
+import random
+import string
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.codes import RandomCodeAllocator, SequenceCodeAllocator
+from app.config import get_settings
+from app.models import URL
+from app.schemas import URLCreate
+from benchmarks.common import time_calls, write_results
+from benchmarks.seed import seed_urls
+
+settings = get_settings()
+
+
+def legacy_create(db, url: URLCreate) -> URL:
+    """The pre-allocator implementation, kept here as the baseline."""
+    chars = string.ascii_letters + string.digits
+    while True:
+        code = "".join(random.choice(chars) for _ in range(settings.SHORT_CODE_LENGTH))
+        if not db.query(URL).filter(URL.short_code == code).first():
+            break
+    db_url = URL(short_code=code, original_url=str(url.original_url))
+    db.add(db_url)
+    db.commit()
+    db.refresh(db_url)
+    return db_url
+
+
+@contextmanager
+def using_allocator(allocator):
+    original = crud.get_code_allocator
+    crud.get_code_allocator = lambda: allocator
+    try:
+        yield
+    finally:
+        crud.get_code_allocator = original
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000, help="existing urls rows before measuring")
+    parser.add_argument("--ops", type=int, default=5_000, help="shorten calls per strategy")
+    parser.add_argument("--db", default="sqlite:///./bench_shorten.db")
+    args = parser.parse_args()
+
+    print(f"seeding {args.db} up to {args.rows:,} rows ...")
+    seed_urls(args.db, args.rows, settings.SHORT_CODE_LENGTH)
+
+    engine = create_engine(args.db, connect_args={"check_same_thread": False})
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    payload = URLCreate(original_url="https://example.com/benchmark")
+
+    strategies = {
+        "legacy_select_loop": lambda db: legacy_create(db, payload),
+        "random": lambda db: crud.create_short_url(db, payload),
+        "sequence": lambda db: crud.create_short_url(db, payload),
+    }
+    allocators = {
+        "legacy_select_loop": None,
+        "random": RandomCodeAllocator(settings.SHORT_CODE_LENGTH),
+        "sequence": SequenceCodeAllocator(
+            settings.SHORT_CODE_LENGTH, settings.SHORT_CODE_BLOCK_SIZE, settings.SHORT_CODE_SCRAMBLE_KEY
+        ),
+    }
+
+    results = {"existing_rows": args.rows}
+    for name, create in strategies.items():
+        with Session() as db, using_allocator(allocators[name]):
+            results[name] = time_calls(lambda: create(db), args.ops)
+        print(f"{name:>20}: {results[name]['ops_per_sec']:8.0f} ops/s  p99 {results[name]['p99_ms']:.2f} ms")
+
+    print("results:", write_results("shorten", results))
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Cold start: how long a fresh worker takes to import the app, run its
+startup, and answer a first redirect. Each sample is a new interpreter, as
+with a worker started by the autoscaler. Exits non-zero when the median cold
+start is over `--budget-ms`, so it can gate CI.
+
+    python -m benchmarks.bench_startup --runs 10 --budget-ms 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import write_results
+
+# Modules a worker that only serves redirects should never import
+HEAVY_MODULES = ("jose", "requests", "cryptography", "app.manage")
+
+
+def _run_child(spawned_at: float) -> None:
+    started = time.perf_counter()
+    from app.main import app
+
+    imported = time.perf_counter()
+    heavy = sorted(name for name in HEAVY_MODULES if name in sys.modules)
+    from fastapi.testclient import TestClient
+
+    harness = time.perf_counter()  # loading the test client isn't part of a worker's start
+    with TestClient(app) as client:
+        ready = time.perf_counter()
+        status = client.get("/nosuchcode").status_code
+        answered = time.perf_counter()
+        answered_at = time.time()
+    print(
+        json.dumps(
+            {
+                # Spawning the interpreter to the first response, less the test client
+                "cold_start_ms": ((answered_at - spawned_at) - (harness - imported)) * 1000,
+                "import_ms": (imported - started) * 1000,
+                "startup_ms": (ready - harness) * 1000,
+                "first_request_ms": (answered - ready) * 1000,
+                "status": status,
+                "heavy_modules": heavy,
+            }
+        )
+    )
+
+
+def _sample(env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", str(time.time())],
+        env=env, check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="median cold start to stay under")
+    parser.add_argument("--child", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        _run_child(args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp}/startup.db"}
+        subprocess.run([sys.executable, "-m", "app.manage", "migrate"], env=env, check=True, capture_output=True)
+        samples = [_sample(env) for _ in range(args.runs)]
+
+    results = {
+        key: statistics.median(s[key] for s in samples)
+        for key in ("cold_start_ms", "import_ms", "startup_ms", "first_request_ms")
+    }
+    results["heavy_modules"] = samples[-1]["heavy_modules"]
+    results["budget_ms"] = args.budget_ms
+    for key, value in results.items():
+        print(f"{key:>18}: {value:.1f}" if isinstance(value, float) else f"{key:>18}: {value}")
+    print("results:", write_results("startup", results))
+    if results["cold_start_ms"] > args.budget_ms:
+        sys.exit(f"median cold start {results['cold_start_ms']:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Peak memory and time-to-first-byte of listing every URL of one heavy user:
+the buffered path (load all rows, build the response models, serialize the
+list) against ?stream=true (server-side cursor, rows encoded one by one).
+
+Each mode runs in a fresh interpreter so peak RSS is not shared between them.
+
+    python -m benchmarks.bench_stream_memory --rows 500000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import write_results
+from benchmarks.seed import seed_urls, seed_user
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _buffered(db, user_id: int):
+    """What /my-urls did before pagination and streaming: one list, one JSON dump."""
+    from pydantic import TypeAdapter
+
+    from app.crud import get_urls_by_user
+    from app.routers.url import get_full_url
+    from app.schemas import URLResponse
+
+    models = [
+        URLResponse(
+            original_url=u.original_url,
+            short_code=u.short_code,
+            short_url=get_full_url(u.short_code),
+            clicks=u.clicks,
+            created_at=u.created_at,
+        )
+        for u in get_urls_by_user(db, user_id)
+    ]
+    yield TypeAdapter(list[URLResponse]).dump_json(models)
+
+
+def _streamed(db, user_id: int):
+    from app.crud import stream_urls
+    from app.routers.url import encode_url_row
+    from app.streaming import json_array
+
+    yield from json_array(stream_urls(db, user_id), encode_url_row)
+
+
+def _run_child(mode: str, user_id: int) -> None:
+    from app.database import SessionLocal
+
+    body = _buffered if mode == "buffered" else _streamed
+    with SessionLocal() as db:
+        baseline = _max_rss_mb()
+        started = time.perf_counter()
+        first_byte = None
+        size = 0
+        for chunk in body(db, user_id):
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+        elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "seconds": elapsed,
+        "ttfb_ms": first_byte * 1000,
+        "bytes": size,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": _max_rss_mb(),
+        "rss_growth_mb": _max_rss_mb() - baseline,
+    }))
+
+
+def _run_mode(mode: str, database_url: str, user_id: int) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_stream_memory", "--child", mode, "--user-id", str(user_id)],
+        env={**os.environ, "DATABASE_URL": database_url},
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--db", help="reuse this SQLite URL instead of a temporary database")
+    parser.add_argument("--child", choices=["buffered", "streamed"], help=argparse.SUPPRESS)
+    parser.add_argument("--user-id", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child(args.child, args.user_id)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.db or f"sqlite:///{tmp}/bench.db"
+        user_id = seed_user(database_url)
+        seed_urls(database_url, args.rows, user_id=user_id)
+
+        results = {"rows": args.rows}
+        for mode in ("buffered", "streamed"):
+            results[mode] = r = _run_mode(mode, database_url, user_id)
+            print(
+                f"{mode:>8}: +{r['rss_growth_mb']:7.1f} MB peak RSS  "
+                f"ttfb {r['ttfb_ms']:8.1f} ms  total {r['seconds']:6.2f} s  {r['bytes'] / 1e6:.1f} MB body"
+            )
+    print("results:", write_results("stream_memory", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Small helpers shared by the benchmark scripts: timing, percentiles, a
+concurrent request driver and JSON result files.
+"""
+import asyncio
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentiles(samples: list[float]) -> dict:
+    """p50/p95/p99/mean/max of a list of latencies (seconds), reported in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def time_calls(func, count: int) -> dict:
+    """Call `func()` `count` times; returns throughput and latency percentiles."""
+    samples = []
+    started = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    return {"ops": count, "seconds": elapsed, "ops_per_sec": count / elapsed, **percentiles(samples)}
+
+
+async def drive(send, requests: int, concurrency: int) -> dict:
+    """
+    Await `send(i)` for i in range(requests), at most `concurrency` at a time;
+    returns throughput and latency percentiles. `send` raises on failure.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: list[float] = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            t0 = time.perf_counter()
+            await send(i)
+            samples.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {"requests": requests, "seconds": elapsed, "req_per_sec": requests / elapsed, **percentiles(samples)}
+
+
+def write_results(name: str, results: dict, out_dir: Path = RESULTS_DIR) -> Path:
+    """Save results as JSON (timestamped) so runs can be compared later."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = out_dir / f"{name}-{stamp}.json"
+    payload = {
+        "benchmark": name,
+        "timestamp": stamp,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    path.write_text(json.dumps(payload, indent=2, default=str))
+    return path
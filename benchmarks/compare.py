@@ -0,0 +1,78 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Every numeric metric present in both runs is compared. Throughput metrics
+(`*_per_sec`) regress when they drop, latency and memory metrics (`*_ms`, `*_mb`)
+when they grow, by more than --threshold. Exits 1 if anything regressed,
+so it can gate CI.
+
+    python -m benchmarks.compare results/crud-A.json results/crud-B.json --threshold 0.10
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def _direction(metric: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 if not a performance metric."""
+    leaf = metric.rsplit(".", 1)[-1]
+    if leaf.endswith("_per_sec"):
+        return 1
+    if leaf.endswith("_ms") or leaf.endswith("_mb"):
+        return -1
+    return 0
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    """One row per comparable metric: baseline, current, relative change and whether it regressed."""
+    old, new = _flatten(baseline["results"]), _flatten(current["results"])
+    rows = []
+    for metric in sorted(old.keys() & new.keys()):
+        direction = _direction(metric)
+        if not direction or not old[metric]:
+            continue
+        change = (new[metric] - old[metric]) / old[metric]
+        rows.append({
+            "metric": metric,
+            "baseline": old[metric],
+            "current": new[metric],
+            "change": change,
+            "regressed": change * direction < -threshold,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    baseline, current = (json.loads(path.read_text()) for path in (args.baseline, args.current))
+    if baseline["benchmark"] != current["benchmark"]:
+        sys.exit(f"cannot compare {baseline['benchmark']!r} with {current['benchmark']!r}")
+
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else ""
+        print(f"{row['metric']:<40} {row['baseline']:>12.3f} -> {row['current']:>12.3f}  {row['change']:+7.1%}  {flag}")
+    regressions = sum(row["regressed"] for row in rows)
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Synthetic data seeding for benchmarks. Writes straight through sqlite3 with
+executemany so millions of rows take seconds rather than minutes.
+
+    python -m benchmarks.seed --db sqlite:///./bench.db --urls 2000000 --bookmarks 200000
+"""
+import argparse
+import random
+import sqlite3
+import string
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.dedup import url_hash
+from app.tags import backfill_tags
+import app.models  # noqa: F401  (register tables on Base.metadata)
+
+_ALPHABET = string.ascii_letters + string.digits
+
+
+def sqlite_path(database_url: str) -> str:
+    return database_url.split("sqlite:///", 1)[1]
+
+
+def create_schema(database_url: str) -> None:
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+
+def count_rows(database_url: str, table: str) -> int:
+    with sqlite3.connect(sqlite_path(database_url)) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def seed_user(database_url: str, email: str = "bench@example.com") -> int:
+    """Get or create a user to own seeded rows; returns its id."""
+    create_schema(database_url)
+    with sqlite3.connect(sqlite_path(database_url)) as conn:
+        row = conn.execute("SELECT id FROM users WHERE email = ?", (email,)).fetchone()
+        if row:
+            return row[0]
+        cur = conn.execute(
+            "INSERT INTO users (email, name, created_at) VALUES (?, ?, ?)",
+            (email, "Bench", datetime(2024, 1, 1).isoformat(sep=" ")),
+        )
+        return cur.lastrowid
+
+
+def seed_urls(
+    database_url: str,
+    rows: int,
+    code_length: int = 6,
+    chunk: int = 50_000,
+    seed: int = 0,
+    user_id: Optional[int] = None,
+) -> int:
+    """
+    Top the urls table up to `rows` rows of legacy-style random codes, owned
+    by `user_id` if given. Returns how many rows were added. Not
+    cryptographic — speed matters here.
+    """
+    create_schema(database_url)
+    rng = random.Random(seed)
+    existing = count_rows(database_url, "urls")
+    start = datetime(2024, 1, 1)
+    added = 0
+    with sqlite3.connect(sqlite_path(database_url)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        while existing + added < rows:
+            n = min(chunk, rows - existing - added)
+            batch = [
+                (
+                    "".join(rng.choices(_ALPHABET, k=code_length)),
+                    f"https://example.com/{existing + added + i}",
+                    rng.randint(0, 1000),
+                    (start + timedelta(seconds=existing + added + i)).isoformat(sep=" "),
+                    user_id,
+                    url_hash(f"https://example.com/{existing + added + i}"),
+                )
+                for i in range(n)
+            ]
+            cur = conn.executemany(
+                "INSERT OR IGNORE INTO urls (short_code, original_url, clicks, created_at, user_id, url_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            conn.commit()
+            added += cur.rowcount
+    return added
+
+
+def sample_codes(database_url: str, n: int, seed: int = 0) -> list[str]:
+    """`n` existing short codes picked uniformly by rowid (fast even on millions of rows)."""
+    rng = random.Random(seed)
+    codes: list[str] = []
+    with sqlite3.connect(sqlite_path(database_url)) as conn:
+        max_id = conn.execute("SELECT MAX(id) FROM urls").fetchone()[0] or 0
+        while max_id and len(codes) < n:
+            row = conn.execute(
+                "SELECT short_code FROM urls WHERE id >= ? ORDER BY id LIMIT 1", (rng.randint(1, max_id),)
+            ).fetchone()
+            if row:
+                codes.append(row[0])
+    return codes
+
+
+def heaviest_bookmark_user(database_url: str) -> int:
+    """Id of the user with the most bookmarks (the worst case for listing and search)."""
+    with sqlite3.connect(sqlite_path(database_url)) as conn:
+        return conn.execute(
+            "SELECT user_id FROM bookmarks GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()[0]
+
+
+# ── Bookmarks ────────────────────────────────────────────────
+
+WORDS = (
+    "python async database index query cache latency router schema deploy docker kubernetes "
+    "react frontend backend design pattern tutorial guide reference benchmark profiling memory "
+    "network security oauth token sqlite postgres search ranking vector stream queue worker "
+    "testing debugging release notes architecture scaling replication sharding compiler rust go"
+).split()
+_DOMAINS = ["github.com", "docs.python.org", "news.ycombinator.com", "medium.com", "stackoverflow.com",
+            "en.wikipedia.org", "martinfowler.com", "blog.example.org", "arxiv.org", "youtube.com"]
+TAG_VOCABULARY = [f"{word}{suffix}" for word in WORDS for suffix in ("", "-notes", "-tips")][:200]
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> list[float]:
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def seed_users(database_url: str, count: int) -> list[int]:
+    """Ids of `count` bench users (bench0@example.com ...), creating the missing ones."""
+    return [seed_user(database_url, f"bench{i}@example.com") for i in range(count)]
+
+
+def seed_bookmarks(
+    database_url: str,
+    rows: int,
+    users: int = 100,
+    chunk: int = 20_000,
+    seed: int = 0,
+) -> int:
+    """
+    Top the bookmarks table up to `rows` realistic-looking bookmarks spread
+    over `users` users (Zipf-skewed, so a few users are heavy), with 0-4
+    Zipf-distributed tags each. The FTS index fills through its triggers,
+    then normalized tags are backfilled. Returns how many rows were added.
+    """
+    create_schema(database_url)
+    rng = random.Random(seed)
+    user_ids = seed_users(database_url, users)
+    user_weights = _zipf_weights(len(user_ids))
+    tag_weights = _zipf_weights(len(TAG_VOCABULARY))
+    existing = count_rows(database_url, "bookmarks")
+    start = datetime(2024, 1, 1)
+    added = 0
+    with sqlite3.connect(sqlite_path(database_url)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        while existing + added < rows:
+            n = min(chunk, rows - existing - added)
+            batch = []
+            for i in range(n):
+                title_words = rng.choices(WORDS, k=rng.randint(2, 7))
+                tags = set(rng.choices(TAG_VOCABULARY, weights=tag_weights, k=rng.randint(0, 4)))
+                batch.append((
+                    rng.choices(user_ids, weights=user_weights)[0],
+                    f"https://{rng.choice(_DOMAINS)}/{'-'.join(title_words)}/{existing + added + i}",
+                    " ".join(title_words).title(),
+                    " ".join(rng.choices(WORDS, k=rng.randint(8, 30))).capitalize() + ".",
+                    ",".join(sorted(tags)) or None,
+                    (start + timedelta(seconds=30 * (existing + added + i))).isoformat(sep=" "),
+                ))
+            conn.executemany(
+                "INSERT INTO bookmarks (user_id, url, title, description, tags, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            conn.commit()
+            added += n
+
+    engine = create_engine(database_url)
+    with Session(engine) as db:
+        backfill_tags(db, batch_size=5_000)
+    engine.dispose()
+    return added
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="sqlite:///./bench.db")
+    parser.add_argument("--urls", type=int, default=1_000_000)
+    parser.add_argument("--bookmarks", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed, for reproducible data")
+    args = parser.parse_args()
+
+    added = seed_urls(args.db, args.urls, seed=args.seed)
+    print(f"urls: +{added:,} (total {count_rows(args.db, 'urls'):,})")
+    added = seed_bookmarks(args.db, args.bookmarks, users=args.users, seed=args.seed)
+    print(f"bookmarks: +{added:,} (total {count_rows(args.db, 'bookmarks'):,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,27 @@
 Shared test fixtures for the URL shortener tests.
 Uses a test SQLite database so tests are fast and isolated.
 """
+import os
+
+# Point the app itself (lifespan, background flushers) at the test DB too.
+TEST_DATABASE_URL = "sqlite:///./test.db"
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.database import Base, get_db
+from app.cache import url_cache
+from app.clicks import click_buffer
+from app.bloom import short_code_filter
+from app.principals import principal_cache
 from app.models import User
 from app.auth import create_jwt
 from app.main import app
 
 # Test SQLite DB
-TEST_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -26,6 +35,20 @@ def setup_database():
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """In-process caches outlive the per-test database, so start each test empty."""
+    url_cache.clear()
+    click_buffer.clear()
+    short_code_filter.reset()
+    principal_cache.clear()
+    yield
+    url_cache.clear()
+    click_buffer.clear()
+    short_code_filter.reset()
+    principal_cache.clear()
+
+
 @pytest.fixture
 def db_session():
     """Yield a clean DB session for each test."""
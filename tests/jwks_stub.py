@@ -0,0 +1,144 @@
+"""
+Local stand-in for Google's JWKS endpoint, for testing ID-token login offline.
+
+JWKSStub serves a JSON Web Key Set over HTTP on 127.0.0.1 and signs ID tokens
+with the matching private keys. Run it directly to try a login by hand:
+
+    python -m tests.jwks_stub --client-id my-client-id
+    GOOGLE_JWKS_URL=<printed url> GOOGLE_CLIENT_ID=my-client-id uvicorn app.main:app
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+
+def _new_key(kid: str) -> tuple[str, dict]:
+    """(private PEM, public JWK) for a fresh RSA key."""
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    public = {k: v.decode() if isinstance(v, bytes) else v for k, v in public.items()}
+    return pem, {**public, "kid": kid, "use": "sig"}
+
+
+class JWKSStub:
+    """A JWKS server plus an ID-token issuer sharing the same keys."""
+
+    def __init__(self, max_age: int = 3600, issuer: str = "https://accounts.google.com"):
+        self.max_age = max_age
+        self.issuer = issuer
+        self.requests = 0
+        self.fail = False
+        self._private: dict[str, str] = {}
+        self._public: list[dict] = []
+        self._version = 0
+        self.kid = self.rotate()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def rotate(self, keep_old: bool = True) -> str:
+        """Publish a new signing key (optionally dropping the old ones); returns its kid."""
+        self._version += 1
+        kid = f"stub-key-{self._version}"
+        pem, public = _new_key(kid)
+        if not keep_old:
+            self._private.clear()
+            self._public.clear()
+        self._private[kid] = pem
+        self._public.append(public)
+        self.kid = kid
+        return kid
+
+    def issue(self, audience: str, email: str = "user@example.com", kid: Optional[str] = None, **claims) -> str:
+        """A signed ID token shaped like Google's."""
+        kid = kid or self.kid
+        now = int(time.time())
+        payload = {
+            "iss": self.issuer,
+            "aud": audience,
+            "sub": email,
+            "email": email,
+            "email_verified": True,
+            "name": email.split("@")[0].title(),
+            "iat": now,
+            "exp": now + 3600,
+            **claims,
+        }
+        return jwt.encode(payload, self._private[kid], algorithm="RS256", headers={"kid": kid})
+
+    @property
+    def etag(self) -> str:
+        return f'"v{self._version}-{len(self._public)}"'
+
+    # ── HTTP server ──────────────────────────────────────────
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/oauth2/v3/certs"
+
+    def start(self) -> "JWKSStub":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                if self.headers.get("If-None-Match") == stub.etag:
+                    self.send_response(304)
+                    self.send_header("Cache-Control", f"public, max-age={stub.max_age}")
+                    self.end_headers()
+                    return
+                body = json.dumps({"keys": stub._public}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", f"public, max-age={stub.max_age}, must-revalidate")
+                self.send_header("ETag", stub.etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, name="jwks-stub", daemon=True
+        ).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--client-id", required=True)
+    parser.add_argument("--email", default="user@example.com")
+    args = parser.parse_args()
+
+    stub = JWKSStub().start()
+    print("GOOGLE_JWKS_URL =", stub.url)
+    print("ID token        =", stub.issue(args.client_id, email=args.email))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Tests for the async database mode: async CRUD and the async URL router.
+"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import crud_async
+from app.database import async_database_url, get_async_db
+from app.main import invalid_cursor_handler
+from app.pagination import InvalidCursor
+from app.routers import url_async
+from app.schemas import URLCreate
+from tests.conftest import TEST_DATABASE_URL
+
+
+@pytest.fixture
+def async_session_factory():
+    # NullPool: TestClient and asyncio.run each use their own event loop.
+    engine = create_async_engine(async_database_url(TEST_DATABASE_URL), poolclass=NullPool)
+    yield async_sessionmaker(engine, autoflush=False)
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def async_client(async_session_factory):
+    app = FastAPI()
+    app.include_router(url_async.router)
+    app.add_exception_handler(InvalidCursor, invalid_cursor_handler)
+
+    async def _override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = _override_get_async_db
+    with TestClient(app) as c:
+        yield c
+
+
+class TestAsyncDatabaseUrl:
+    def test_sqlite(self):
+        assert async_database_url("sqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            async_database_url("oracle://u:p@host/db")
+
+
+class TestAsyncCrud:
+    def test_create_and_resolve(self, async_session_factory, test_user):
+        async def scenario():
+            async with async_session_factory() as db:
+                created = await crud_async.create_short_url(
+                    db, URLCreate(original_url="https://example.com"), user_id=test_user.id
+                )
+                resolved = await crud_async.resolve_url(db, created.short_code)
+                owned = await crud_async.get_urls_by_user(db, test_user.id)
+                return created, resolved, owned
+
+        created, resolved, owned = asyncio.run(scenario())
+        assert resolved.original_url == "https://example.com/"
+        assert [u.short_code for u in owned] == [created.short_code]
+
+    def test_dedupe_matches_redirect_status(self, async_session_factory, test_user):
+        async def scenario():
+            async with async_session_factory() as db:
+                codes = []
+                for status in (301, 302, 301):
+                    url = URLCreate(original_url="https://example.com", dedupe=True, redirect_status=status)
+                    codes.append((await crud_async.create_short_url(db, url, user_id=test_user.id)).short_code)
+                return codes
+
+        permanent, temporary, again = asyncio.run(scenario())
+        assert again == permanent != temporary
+
+    def test_resolve_missing(self, async_session_factory):
+        async def scenario():
+            async with async_session_factory() as db:
+                return await crud_async.resolve_url(db, "zzzzzz")
+
+        assert asyncio.run(scenario()) is None
+
+
+class TestAsyncRouter:
+    def test_shorten_redirect_info(self, async_client):
+        code = async_client.post("/shorten", json={"original_url": "https://example.com"}).json()["short_code"]
+        assert async_client.get(f"/{code}").json() == {"original_url": "https://example.com/"}
+        assert async_client.get(f"/info/{code}").json()["clicks"] == 1
+
+    def test_my_urls(self, async_client, auth_headers):
+        async_client.post("/shorten", json={"original_url": "https://mine.com"}, headers=auth_headers)
+        urls = async_client.get("/my-urls", headers=auth_headers).json()
+        assert [u["original_url"] for u in urls] == ["https://mine.com/"]
+
+    def test_batch(self, async_client):
+        data = async_client.post(
+            "/shorten/batch", json={"items": [{"original_url": "https://a.com"}, {"original_url": "bad"}]}
+        ).json()
+        assert (data["created"], data["failed"]) == (1, 1)
+
+    def test_direct_redirect(self, async_client):
+        code = async_client.post(
+            "/shorten", json={"original_url": "https://example.com", "redirect_status": 301}
+        ).json()["short_code"]
+        response = async_client.get(f"/r/{code}", follow_redirects=False)
+        assert response.status_code == 301
+        assert response.headers["location"] == "https://example.com/"
+        assert async_client.get(f"/info/{code}").json()["clicks"] == 1
+
+    def test_my_urls_etag(self, async_client, auth_headers):
+        etag = async_client.get("/my-urls", headers=auth_headers).headers["etag"]
+        assert async_client.get("/my-urls", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+        async_client.post("/shorten", json={"original_url": "https://mine.com"}, headers=auth_headers)
+        assert async_client.get("/my-urls", headers={**auth_headers, "If-None-Match": etag}).status_code == 200
+
+    def test_unknown_code(self, async_client):
+        assert async_client.get("/nope42").status_code == 404
+
+    def test_my_urls_streamed(self, async_client, auth_headers):
+        for i in range(3):
+            async_client.post("/shorten", json={"original_url": f"https://s{i}.com"}, headers=auth_headers)
+        paged = async_client.get("/my-urls", headers=auth_headers).json()
+        streamed = async_client.get("/my-urls", params={"stream": "true"}, headers=auth_headers)
+        assert streamed.headers["content-type"] == "application/json"
+        assert streamed.json() == paged
+
+    def test_streamed_malformed_cursor_is_400(self, async_client, auth_headers):
+        response = async_client.get("/my-urls", params={"stream": "true", "cursor": "garbage"}, headers=auth_headers)
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Malformed cursor"}
@@ -0,0 +1,67 @@
+"""
+Tests for batch shortening.
+"""
+from app.config import get_settings
+from app.crud import create_short_urls, resolve_url
+from app.schemas import URLCreate
+
+settings = get_settings()
+
+
+class TestCreateShortUrls:
+    def test_creates_all_in_order(self, db_session, test_user):
+        urls = [URLCreate(original_url=f"https://example.com/{i}") for i in range(5)]
+        created = create_short_urls(db_session, urls, user_id=test_user.id)
+
+        assert [u.original_url for u in created] == [f"https://example.com/{i}" for i in range(5)]
+        assert len({u.short_code for u in created}) == 5
+        for u in created:
+            assert resolve_url(db_session, u.short_code).user_id == test_user.id
+
+    def test_empty(self, db_session):
+        assert create_short_urls(db_session, []) == []
+
+
+class TestBatchEndpoint:
+    def test_anonymous_batch_with_per_item_errors(self, client):
+        resp = client.post(
+            "/shorten/batch",
+            json={"items": [
+                {"original_url": "https://a.com"},
+                {"original_url": "not a url"},
+                {"original_url": "https://b.com"},
+                {},
+            ]},
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["created"] == 2
+        assert data["failed"] == 2
+        results = data["results"]
+        assert [r["index"] for r in results] == [0, 1, 2, 3]
+        assert results[0]["url"]["original_url"] == "https://a.com/"
+        assert results[1]["url"] is None and "original_url" in results[1]["error"]
+        assert results[2]["url"]["original_url"] == "https://b.com/"
+        assert results[3]["error"]
+
+        code = results[2]["url"]["short_code"]
+        assert client.get(f"/{code}").json() == {"original_url": "https://b.com/"}
+
+    def test_authenticated_batch_is_linked_to_user(self, client, auth_headers):
+        client.post(
+            "/shorten/batch",
+            json={"items": [{"original_url": "https://one.com"}, {"original_url": "https://two.com"}]},
+            headers=auth_headers,
+        )
+        assert len(client.get("/my-urls", headers=auth_headers).json()) == 2
+
+    def test_created_at_matches_single_shorten(self, client):
+        single = client.post("/shorten", json={"original_url": "https://one.com"}).json()
+        batch = client.post("/shorten/batch", json={"items": [{"original_url": "https://two.com"}]}).json()
+        created_at = batch["results"][0]["url"]["created_at"]
+        assert created_at == client.get(f"/info/{batch['results'][0]['url']['short_code']}").json()["created_at"]
+        assert created_at.endswith("Z") == single["created_at"].endswith("Z")
+
+    def test_rejects_oversized_batch(self, client):
+        items = [{"original_url": "https://a.com"}] * (settings.SHORTEN_BATCH_MAX_SIZE + 1)
+        assert client.post("/shorten/batch", json={"items": items}).status_code == 413
@@ -0,0 +1,110 @@
+"""
+Tests for the Bloom filter negative-lookup path.
+"""
+import pytest
+from sqlalchemy import delete, event, insert
+
+from app.bloom import BloomFilter, ShortCodeFilter, short_code_filter
+from app.config import get_settings
+from app.crud import create_short_url, resolve_url
+from app.models import URL
+from app.schemas import URLCreate
+from tests.conftest import engine
+
+settings = get_settings()
+
+
+def _insert_elsewhere(short_code):
+    """Insert a URL on a separate connection, as another worker would (no after_insert hook)."""
+    with engine.begin() as conn:
+        conn.execute(insert(URL).values(short_code=short_code, original_url="https://other.com/"))
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, fp_rate=0.01)
+        codes = [f"code{i}" for i in range(1000)]
+        for code in codes:
+            bloom.add(code)
+        assert all(code in bloom for code in codes)
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(capacity=2000, fp_rate=0.01)
+        for i in range(2000):
+            bloom.add(f"in{i}")
+        false_positives = sum(f"out{i}" in bloom for i in range(10_000))
+        assert false_positives < 10_000 * 0.03
+
+    def test_sizing(self):
+        bloom = BloomFilter(capacity=1_000_000, fp_rate=0.001)
+        # ~14.4 bits per item, ~10 hashes at 0.1%
+        assert 1_700_000 < bloom.memory_bytes < 1_900_000
+        assert bloom.num_hashes == 10
+
+
+class TestShortCodeFilter:
+    def test_unready_filter_allows_everything(self):
+        assert ShortCodeFilter(0.01, 10, 2.0).might_exist("anything")
+
+    def test_rebuild_from_database(self, db_session):
+        db_session.add_all([URL(short_code=f"c{i}", original_url="https://x.com/") for i in range(50)])
+        db_session.commit()
+        codes = ShortCodeFilter(0.001, 10, 2.0)
+        codes.rebuild(db_session)
+
+        assert all(codes.might_exist(f"c{i}") for i in range(50))
+        assert not codes.might_exist("definitely-missing")
+        stats = codes.stats()
+        assert stats["ready"] and stats["rebuilds"] == 1
+        assert stats["capacity"] == 100
+        assert stats["memory_bytes"] > 0
+
+
+class TestResolveWithFilter:
+    def test_definite_miss_skips_the_database(self, db_session):
+        short_code_filter.rebuild(db_session)
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            assert resolve_url(db_session, "garbage") is None
+            assert resolve_url(db_session, "garbage") is None
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert statements == []
+
+    def test_catch_up_adds_codes_from_other_processes(self, db_session):
+        short_code_filter.rebuild(db_session)
+        _insert_elsewhere("other1")
+        assert not short_code_filter.might_exist("other1")
+        assert short_code_filter.catch_up(db_session) == 1
+        assert resolve_url(db_session, "other1").original_url == "https://other.com/"
+
+    def test_catch_up_rereads_reused_ids(self, db_session):
+        _insert_elsewhere("first1")
+        short_code_filter.rebuild(db_session)
+        with engine.begin() as conn:
+            conn.execute(delete(URL).where(URL.short_code == "first1"))
+        _insert_elsewhere("second")  # SQLite hands the freed rowid out again
+        short_code_filter.catch_up(db_session)
+        assert short_code_filter.might_exist("second")
+
+    def test_new_codes_are_added(self, db_session):
+        short_code_filter.rebuild(db_session)
+        db_url = create_short_url(db_session, URLCreate(original_url="https://example.com"))
+        assert resolve_url(db_session, db_url.short_code).original_url == "https://example.com/"
+
+
+class TestStatsEndpoint:
+    def test_bloom_stats(self, client, monkeypatch):
+        monkeypatch.setattr(settings, "STATS_ADMIN_TOKEN", "ops-token")
+        data = client.get("/stats/bloom", headers={"X-Admin-Token": "ops-token"}).json()
+        assert {"ready", "memory_bytes", "rebuilds", "last_rebuild_seconds"} <= data.keys()
+
+    @pytest.mark.parametrize("path", ["/stats/bloom", "/stats/principals", "/stats/google-keys"])
+    def test_stats_need_the_admin_token(self, client, monkeypatch, path):
+        assert client.get(path).status_code == 404  # no token configured: off
+        monkeypatch.setattr(settings, "STATS_ADMIN_TOKEN", "ops-token")
+        assert client.get(path).status_code == 403
+        assert client.get(path, headers={"X-Admin-Token": "guess"}).status_code == 403
+        assert client.get(path, headers={"X-Admin-Token": "ops-token"}).status_code == 200
@@ -0,0 +1,134 @@
+"""
+Tests for streaming bookmark import/export.
+"""
+import json
+
+import pytest
+
+from app.bookmark_io import LineTooLong, NDJSONParser, NetscapeParser, RecordError
+from app.config import get_settings
+
+settings = get_settings()
+
+NETSCAPE_FILE = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<TITLE>Bookmarks</TITLE>
+<DL><p>
+    <DT><H3>Dev</H3>
+    <DL><p>
+        <DT><A HREF="https://python.org" ADD_DATE="1700000000" TAGS="python,lang">Python &amp; friends</A>
+        <DD>The language
+        <DT><A HREF="https://fastapi.tiangolo.com">FastAPI</A>
+    </DL><p>
+    <DT><A HREF="https://react.dev"></A>
+</DL><p>
+"""
+
+
+class TestParsers:
+    def test_ndjson_across_chunk_boundaries(self):
+        parser = NDJSONParser()
+        records = parser.feed('{"url": "https://a.com"}\n{"url": "ht')
+        records += parser.feed('tps://b.com"}\n\nnot json\n{"url": "https://c.com"}')
+        records += parser.close()
+        assert [r[1]["url"] for r in records if not isinstance(r[1], RecordError)] == [
+            "https://a.com", "https://b.com", "https://c.com",
+        ]
+        assert [n for n, r in records if isinstance(r, RecordError)] == [4]
+
+    def test_ndjson_line_length_is_capped(self):
+        parser = NDJSONParser(max_line_length=20)
+        parser.feed('{"url": "https://a.com"}\n'[:20])
+        with pytest.raises(LineTooLong) as exc:
+            parser.feed("x" * 10)  # still no newline: the buffered line is now too long
+        assert exc.value.line == 1
+
+    def test_netscape(self):
+        parser = NetscapeParser()
+        records = []
+        for i in range(0, len(NETSCAPE_FILE), 7):  # awkward chunking on purpose
+            records += parser.feed(NETSCAPE_FILE[i:i + 7])
+        records += parser.close()
+        entries = [r for _, r in records]
+        assert entries[0] == {
+            "url": "https://python.org",
+            "title": "Python & friends",
+            "tags": ["python", "lang"],
+            "description": "The language",
+        }
+        assert entries[1]["title"] == "FastAPI" and "description" not in entries[1]
+        assert entries[2] == {"url": "https://react.dev", "title": None, "tags": None}
+
+
+class TestImport:
+    def test_ndjson_import(self, client, auth_headers):
+        body = "\n".join([
+            json.dumps({"url": "https://a.com", "title": "A", "tags": ["x"]}),
+            "{broken",
+            json.dumps({"title": "missing url"}),
+            json.dumps({"url": "https://b.com"}),
+        ])
+        resp = client.post(
+            "/bookmarks/import", content=body,
+            headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["imported"] == 2
+        assert data["failed"] == 2
+        assert data["errors"][0].startswith("line 2")
+
+        listed = client.get("/bookmarks", headers=auth_headers).json()
+        assert {b["url"] for b in listed} == {"https://a.com", "https://b.com"}
+
+    def test_html_import(self, client, auth_headers):
+        resp = client.post(
+            "/bookmarks/import", content=NETSCAPE_FILE,
+            headers={**auth_headers, "Content-Type": "text/html"},
+        )
+        assert resp.json()["imported"] == 3
+        tagged = client.get("/bookmarks", params={"tag": "python"}, headers=auth_headers).json()
+        assert tagged[0]["description"] == "The language"
+
+    def test_overlong_ndjson_line_is_413(self, client, auth_headers, monkeypatch):
+        monkeypatch.setattr(settings, "BOOKMARK_IMPORT_MAX_LINE_LENGTH", 100)
+        body = json.dumps({"url": "https://a.com"}) + "\n" + "x" * 1000
+        resp = client.post(
+            "/bookmarks/import", content=body,
+            headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+        )
+        assert resp.status_code == 413
+        assert resp.json()["detail"].startswith("line 2 is longer than 100 characters")
+
+    def test_import_requires_auth(self, client):
+        assert client.post("/bookmarks/import", content="").status_code == 401
+
+
+class TestExport:
+    def _seed(self, client, headers):
+        client.post("/bookmarks", json={"url": "https://a.com", "title": "A <b>", "tags": ["x", "y"]}, headers=headers)
+        client.post("/bookmarks", json={"url": "https://b.com", "description": "note"}, headers=headers)
+
+    def test_ndjson_export(self, client, auth_headers, second_auth_headers):
+        self._seed(client, auth_headers)
+        client.post("/bookmarks", json={"url": "https://other.com"}, headers=second_auth_headers)
+
+        resp = client.get("/bookmarks/export", headers=auth_headers)
+        assert resp.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        assert [r["url"] for r in rows] == ["https://a.com", "https://b.com"]
+        assert rows[0]["tags"] == ["x", "y"]
+
+    def test_html_export_round_trips(self, client, auth_headers, second_auth_headers):
+        self._seed(client, auth_headers)
+        exported = client.get("/bookmarks/export", params={"format": "html"}, headers=auth_headers).text
+        assert "A &lt;b&gt;" in exported
+
+        client.post(
+            "/bookmarks/import", params={"format": "html"}, content=exported, headers=second_auth_headers,
+        )
+        imported = client.get("/bookmarks/export", headers=second_auth_headers).text
+        rows = [json.loads(line) for line in imported.splitlines()]
+        assert [(r["url"], r["title"], r["tags"], r["description"]) for r in rows] == [
+            ("https://a.com", "A <b>", ["x", "y"], None),
+            ("https://b.com", None, None, "note"),
+        ]
@@ -0,0 +1,59 @@
+"""
+Tests for FTS5-backed bookmark search.
+"""
+from app import fts
+from app.crud import create_bookmark, get_bookmarks, update_bookmark, delete_bookmark
+from app.schemas import BookmarkCreate, BookmarkUpdate
+from tests.conftest import engine
+
+
+def _titles(results):
+    return [b.title for b in results]
+
+
+class TestBuildMatchQuery:
+    def test_words_become_prefix_terms(self):
+        assert fts.build_match_query("fast API") == '"fast"* "API"*'
+
+    def test_fts_syntax_is_neutralised(self):
+        assert fts.build_match_query('title:"x" OR NEAR(') == '"title"* "x"* "OR"* "NEAR"*'
+
+    def test_no_words(self):
+        assert fts.build_match_query("...") is None
+
+
+class TestFtsSearch:
+    def test_prefix_match(self, db_session, test_user):
+        create_bookmark(db_session, test_user.id, BookmarkCreate(url="https://fastapi.tiangolo.com", title="FastAPI Docs"))
+        create_bookmark(db_session, test_user.id, BookmarkCreate(url="https://react.dev", title="React"))
+        assert _titles(get_bookmarks(db_session, test_user.id, search="fast")) == ["FastAPI Docs"]
+
+    def test_bm25_ranks_title_matches_first(self, db_session, test_user):
+        create_bookmark(db_session, test_user.id, BookmarkCreate(url="https://a.com", title="Cooking", description="a python recipe"))
+        create_bookmark(db_session, test_user.id, BookmarkCreate(url="https://b.com", title="Python tricks"))
+        create_bookmark(db_session, test_user.id, BookmarkCreate(url="https://c.com", title="Gardening"))
+        assert _titles(get_bookmarks(db_session, test_user.id, search="python")) == ["Python tricks", "Cooking"]
+
+    def test_index_follows_updates_and_deletes(self, db_session, test_user):
+        bm = create_bookmark(db_session, test_user.id, BookmarkCreate(url="https://a.com", title="Old name"))
+        update_bookmark(db_session, bm, BookmarkUpdate(title="Shiny name"))
+        assert get_bookmarks(db_session, test_user.id, search="old") == []
+        assert _titles(get_bookmarks(db_session, test_user.id, search="shiny")) == ["Shiny name"]
+
+        delete_bookmark(db_session, bm)
+        assert get_bookmarks(db_session, test_user.id, search="shiny") == []
+
+    def test_search_is_scoped_to_user(self, db_session, test_user, second_user):
+        create_bookmark(db_session, second_user.id, BookmarkCreate(url="https://a.com", title="Secret"))
+        assert get_bookmarks(db_session, test_user.id, search="secret") == []
+
+    def test_punctuation_only_falls_back_to_like(self, db_session, test_user):
+        create_bookmark(db_session, test_user.id, BookmarkCreate(url="https://a.com/?q=1", title="Query"))
+        assert _titles(get_bookmarks(db_session, test_user.id, search="?q=")) == ["Query"]
+
+    def test_rebuild_indexes_existing_rows(self, db_session, test_user):
+        create_bookmark(db_session, test_user.id, BookmarkCreate(url="https://a.com", title="Indexed"))
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"DROP TABLE {fts.FTS_TABLE}")
+        assert fts.ensure_fts(engine)  # recreates and rebuilds
+        assert _titles(get_bookmarks(db_session, test_user.id, search="index")) == ["Indexed"]
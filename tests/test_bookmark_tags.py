@@ -0,0 +1,117 @@
+"""
+Tests for normalized tag storage, tag filtering and tag counts.
+"""
+from app.crud import (
+    create_bookmark,
+    bulk_create_bookmarks,
+    get_bookmarks,
+    update_bookmark,
+    delete_bookmark,
+)
+from app.models import Bookmark
+from app.schemas import BookmarkCreate, BookmarkUpdate
+from app.tags import backfill_tags, get_tag_counts, normalize_tags
+
+
+def _seed(db_session, user_id):
+    for title, tags in [
+        ("Python", ["python"]),
+        ("NumPy", ["numpy", "python"]),
+        ("FastAPI", ["python", "api"]),
+        ("React", ["frontend", "API"]),
+    ]:
+        create_bookmark(db_session, user_id, BookmarkCreate(url=f"https://{title.lower()}.org", title=title, tags=tags))
+
+
+def _titles(results):
+    return sorted(b.title for b in results)
+
+
+class TestNormalizeTags:
+    def test_normalize(self):
+        assert normalize_tags([" Python", "python", "", "API "]) == ["python", "api"]
+        assert normalize_tags(None) == []
+
+
+class TestTagFiltering:
+    def test_exact_match_not_substring(self, db_session, test_user):
+        _seed(db_session, test_user.id)
+        create_bookmark(db_session, test_user.id, BookmarkCreate(url="https://np.org", title="Only numpy", tags=["numpy"]))
+        assert _titles(get_bookmarks(db_session, test_user.id, tag="py")) == []
+        assert _titles(get_bookmarks(db_session, test_user.id, tag="numpy")) == ["NumPy", "Only numpy"]
+
+    def test_case_insensitive(self, db_session, test_user):
+        _seed(db_session, test_user.id)
+        assert _titles(get_bookmarks(db_session, test_user.id, tag="api")) == ["FastAPI", "React"]
+
+    def test_all_and_any(self, db_session, test_user):
+        _seed(db_session, test_user.id)
+        assert _titles(get_bookmarks(db_session, test_user.id, tags=["python", "api"])) == ["FastAPI"]
+        assert _titles(
+            get_bookmarks(db_session, test_user.id, tags=["numpy", "frontend"], match_all_tags=False)
+        ) == ["NumPy", "React"]
+
+    def test_isolated_by_user(self, db_session, test_user, second_user):
+        _seed(db_session, test_user.id)
+        assert get_bookmarks(db_session, second_user.id, tag="python") == []
+
+
+class TestTagCounts:
+    def test_counts_follow_create_update_delete(self, db_session, test_user):
+        _seed(db_session, test_user.id)
+        assert get_tag_counts(db_session, test_user.id) == [
+            ("python", 3), ("api", 2), ("frontend", 1), ("numpy", 1),
+        ]
+
+        react = get_bookmarks(db_session, test_user.id, tag="frontend")[0]
+        update_bookmark(db_session, react, BookmarkUpdate(tags=["frontend", "js"]))
+        numpy = get_bookmarks(db_session, test_user.id, tag="numpy")[0]
+        delete_bookmark(db_session, numpy)
+
+        assert dict(get_tag_counts(db_session, test_user.id)) == {
+            "python": 2, "api": 1, "frontend": 1, "js": 1,
+        }
+        assert _titles(get_bookmarks(db_session, test_user.id, tag="js")) == ["React"]
+        assert get_bookmarks(db_session, test_user.id, tags=["frontend", "api"]) == []
+
+    def test_bulk_create_links_tags(self, db_session, test_user):
+        bulk_create_bookmarks(db_session, test_user.id, [
+            BookmarkCreate(url="https://a.com", tags=["x", "y"]),
+            BookmarkCreate(url="https://b.com", tags=["x"]),
+            BookmarkCreate(url="https://c.com"),
+        ])
+        assert get_tag_counts(db_session, test_user.id) == [("x", 2), ("y", 1)]
+
+
+class TestBackfill:
+    def test_backfill_from_comma_separated(self, db_session, test_user):
+        db_session.add_all([
+            Bookmark(user_id=test_user.id, url="https://a.com", tags="Python,dev"),
+            Bookmark(user_id=test_user.id, url="https://b.com", tags="python"),
+            Bookmark(user_id=test_user.id, url="https://c.com", tags=" , "),
+            Bookmark(user_id=test_user.id, url="https://d.com"),
+        ])
+        db_session.commit()
+
+        assert backfill_tags(db_session, batch_size=1) == 3
+        assert backfill_tags(db_session) == 1  # only the tag-less-after-normalizing row is revisited
+        assert get_tag_counts(db_session, test_user.id) == [("python", 2), ("dev", 1)]
+
+
+class TestTagsEndpoint:
+    def test_list_tags(self, client, auth_headers):
+        client.post("/bookmarks", json={"url": "https://a.com", "tags": ["python", "api"]}, headers=auth_headers)
+        client.post("/bookmarks", json={"url": "https://b.com", "tags": ["python"]}, headers=auth_headers)
+        resp = client.get("/bookmarks/tags", headers=auth_headers)
+        assert resp.json() == [{"name": "python", "count": 2}, {"name": "api", "count": 1}]
+
+    def test_filter_modes(self, client, auth_headers):
+        client.post("/bookmarks", json={"url": "https://a.com", "tags": ["python", "api"]}, headers=auth_headers)
+        client.post("/bookmarks", json={"url": "https://b.com", "tags": ["python"]}, headers=auth_headers)
+        both = client.get("/bookmarks", params={"tags": ["python", "api"]}, headers=auth_headers).json()
+        either = client.get(
+            "/bookmarks", params={"tags": ["python", "api"], "tag_mode": "any"}, headers=auth_headers
+        ).json()
+        assert [b["url"] for b in both] == ["https://a.com"]
+        assert len(either) == 2
+        assert both[0]["tags"] == ["python", "api"]  # response shape unchanged
@@ -0,0 +1,151 @@
+"""
+Tests for the click event log, the hourly/daily rollups and /info/{code}/timeseries.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app import analytics
+from app.analytics import CommitHorizon, click_event, get_click_timeseries, prune_click_events, roll_up_clicks
+from app.clicks import ClickBuffer, click_buffer
+from app.config import get_settings
+from app.crud import create_short_url, record_click
+from app.models import ClickEvent, ClickRollupDaily, ClickRollupHourly
+from app.schemas import URLCreate
+
+settings = get_settings()
+
+
+def _events(db_session, code, *times):
+    db_session.add_all(ClickEvent(short_code=code, occurred_at=t) for t in times)
+    db_session.commit()
+
+
+def _rollup(db_session, model, code):
+    rows = db_session.execute(
+        select(model.bucket_start, model.clicks).where(model.short_code == code).order_by(model.bucket_start)
+    )
+    return [tuple(r) for r in rows]
+
+
+class TestEventLog:
+    def test_buffer_flush_appends_events(self, db_session):
+        url = create_short_url(db_session, URLCreate(original_url="https://a.com"))
+        buffer = ClickBuffer(flush_interval=60, flush_threshold=1000)
+        for _ in range(3):
+            buffer.add(url.short_code, event=click_event(url.short_code, "https://ref.example", "Mozilla/5.0"))
+        buffer.flush(db_session)
+        events = db_session.scalars(select(ClickEvent)).all()
+        assert len(events) == 3
+        assert events[0].referrer_hash and events[0].referrer_hash != "https://ref.example"
+        assert buffer.stats()["flushed_events"] == 3
+
+    def test_pending_events_bounded(self):
+        buffer = ClickBuffer(flush_interval=60, flush_threshold=1000, max_pending_events=2)
+        for _ in range(5):
+            buffer.add("abc", event=click_event("abc"))
+        assert buffer.stats()["pending_events"] == 2
+        assert buffer.stats()["dropped_events"] == 3
+        assert buffer.pending("abc") == 5
+
+    def test_write_through_logs_event(self, db_session, monkeypatch):
+        monkeypatch.setattr(settings, "CLICK_BUFFER_ENABLED", False)
+        url = create_short_url(db_session, URLCreate(original_url="https://a.com"))
+        record_click(db_session, url.short_code, user_agent="curl/8")
+        assert db_session.scalar(select(func.count()).select_from(ClickEvent)) == 1
+
+
+class TestRollups:
+    def test_hourly_and_daily(self, db_session):
+        day = datetime(2024, 3, 1)
+        _events(
+            db_session, "abc",
+            day.replace(hour=9, minute=5), day.replace(hour=9, minute=55),
+            day.replace(hour=10), day + timedelta(days=1, hours=3),
+        )
+        assert roll_up_clicks(db_session) == 4
+        assert _rollup(db_session, ClickRollupHourly, "abc") == [
+            (day.replace(hour=9), 2), (day.replace(hour=10), 1), (day + timedelta(days=1, hours=3), 1)
+        ]
+        assert _rollup(db_session, ClickRollupDaily, "abc") == [(day, 3), (day + timedelta(days=1), 1)]
+
+    def test_incremental_and_idempotent(self, db_session):
+        hour = datetime(2024, 3, 1, 9)
+        _events(db_session, "abc", hour, hour)
+        roll_up_clicks(db_session)
+        assert roll_up_clicks(db_session) == 0
+        _events(db_session, "abc", hour + timedelta(minutes=30))
+        roll_up_clicks(db_session, batch_size=1)
+        assert _rollup(db_session, ClickRollupHourly, "abc") == [(hour, 3)]
+
+    def test_small_batches_fold_everything(self, db_session):
+        _events(db_session, "abc", *(datetime(2024, 3, 1, h) for h in range(7)))
+        assert roll_up_clicks(db_session, batch_size=2) == 7
+
+    def test_prune_only_rolled_up_old_events(self, db_session):
+        now = datetime(2024, 6, 1)
+        _events(db_session, "abc", now - timedelta(days=90), now - timedelta(days=1))
+        roll_up_clicks(db_session)
+        _events(db_session, "abc", now - timedelta(days=120))  # old but not yet rolled up
+        assert prune_click_events(db_session, timedelta(days=30), now=now) == 1
+        assert db_session.scalar(select(func.count()).select_from(ClickEvent)) == 2
+
+    def test_timeseries_window(self, db_session):
+        _events(db_session, "abc", *(datetime(2024, 3, 1, h, 30) for h in range(5)))
+        roll_up_clicks(db_session)
+        points = get_click_timeseries(
+            db_session, "abc", "hour", datetime(2024, 3, 1, 1, 15), datetime(2024, 3, 1, 3)
+        )
+        assert points == [(datetime(2024, 3, 1, 1), 1), (datetime(2024, 3, 1, 2), 1)]
+
+
+class TestCommitHorizon:
+    def test_only_ids_seen_a_grace_period_ago(self):
+        horizon = CommitHorizon(grace_seconds=30)
+        assert horizon.observe(10, now=0) == 0
+        assert horizon.observe(20, now=20) == 0
+        assert horizon.observe(25, now=30) == 10
+        assert horizon.observe(40, now=55) == 20
+        assert horizon.observe(40, now=100) == 40
+
+    def test_rollup_waits_for_the_horizon_when_ids_may_commit_out_of_order(self, db_session, monkeypatch):
+        monkeypatch.setattr(analytics, "_ids_commit_in_order", lambda db: False)
+        monkeypatch.setattr(analytics, "commit_horizons", {})
+        monkeypatch.setattr(settings, "CLICK_ROLLUP_GRACE_SECONDS", 3600)
+        _events(db_session, "abc", datetime(2024, 3, 1, 9))
+        assert roll_up_clicks(db_session) == 0
+        monkeypatch.setattr(analytics, "commit_horizons", {})
+        monkeypatch.setattr(settings, "CLICK_ROLLUP_GRACE_SECONDS", 0)
+        assert roll_up_clicks(db_session) == 1
+
+    def test_one_horizon_per_database(self, db_session, tmp_path, monkeypatch):
+        monkeypatch.setattr(analytics, "commit_horizons", {})
+        with Session(create_engine(f"sqlite:///{tmp_path}/shard1.db")) as other:
+            assert analytics._commit_horizon(db_session) is not analytics._commit_horizon(other)
+        assert analytics._commit_horizon(db_session) is analytics._commit_horizon(db_session)
+
+
+class TestTimeseriesApi:
+    def test_redirects_show_up_after_rollup(self, client, db_session):
+        code = client.post("/shorten", json={"original_url": "https://example.com"}).json()["short_code"]
+        for _ in range(3):
+            client.get(f"/{code}", headers={"Referer": "https://ref.example"})
+        click_buffer.flush(db_session)
+        roll_up_clicks(db_session)
+
+        data = client.get(f"/info/{code}/timeseries").json()
+        assert data["granularity"] == "hour"
+        assert sum(p["clicks"] for p in data["points"]) == 3
+        daily = client.get(f"/info/{code}/timeseries", params={"granularity": "day"}).json()
+        assert [p["clicks"] for p in daily["points"]] == [3]
+
+    def test_unknown_code(self, client):
+        assert client.get("/info/nope42/timeseries").status_code == 404
+
+    def test_window_limits(self, client):
+        code = client.post("/shorten", json={"original_url": "https://example.com"}).json()["short_code"]
+        too_wide = {"start": "2000-01-01T00:00:00", "end": "2024-01-01T00:00:00"}
+        assert client.get(f"/info/{code}/timeseries", params=too_wide).status_code == 400
+        backwards = {"start": "2024-01-02T00:00:00", "end": "2024-01-01T00:00:00"}
+        assert client.get(f"/info/{code}/timeseries", params=backwards).status_code == 400
@@ -0,0 +1,83 @@
+"""
+Tests for write-behind click counting.
+"""
+import time
+
+from app.clicks import ClickBuffer, click_buffer
+from app.crud import create_short_url, get_url_by_code, get_click_count
+from app.schemas import URLCreate
+from tests.conftest import TestSessionLocal
+
+
+def _make_url(db_session, url="https://example.com"):
+    return create_short_url(db_session, URLCreate(original_url=url))
+
+
+class TestClickBuffer:
+    def test_flush_writes_batched_deltas(self, db_session):
+        a = _make_url(db_session, "https://a.com")
+        b = _make_url(db_session, "https://b.com")
+        buffer = ClickBuffer(flush_interval=60, flush_threshold=1000)
+        for _ in range(3):
+            buffer.add(a.short_code)
+        buffer.add(b.short_code)
+
+        assert buffer.pending(a.short_code) == 3
+        assert buffer.flush(db_session) == 4
+        assert buffer.pending(a.short_code) == 0
+
+        assert get_url_by_code(db_session, a.short_code).clicks == 3
+        assert get_url_by_code(db_session, b.short_code).clicks == 1
+
+    def test_flush_accumulates_on_existing_count(self, db_session):
+        a = _make_url(db_session)
+        buffer = ClickBuffer(flush_interval=60, flush_threshold=1000)
+        buffer.add(a.short_code, 2)
+        buffer.flush(db_session)
+        buffer.add(a.short_code, 5)
+        buffer.flush(db_session)
+        assert get_url_by_code(db_session, a.short_code).clicks == 7
+
+    def test_empty_flush(self, db_session):
+        buffer = ClickBuffer(flush_interval=60, flush_threshold=1000)
+        assert buffer.flush(db_session) == 0
+
+    def test_stop_flushes_everything(self, db_session):
+        a = _make_url(db_session)
+        buffer = ClickBuffer(flush_interval=60, flush_threshold=1000)
+        buffer.start(TestSessionLocal)
+        buffer.add(a.short_code, 42)
+        buffer.stop()
+
+        db_session.expire_all()
+        assert get_url_by_code(db_session, a.short_code).clicks == 42
+        assert buffer.pending_total() == 0
+
+    def test_threshold_triggers_background_flush(self, db_session):
+        a = _make_url(db_session)
+        buffer = ClickBuffer(flush_interval=60, flush_threshold=5)
+        buffer.start(TestSessionLocal)
+        try:
+            buffer.add(a.short_code, 5)
+            deadline = time.monotonic() + 5
+            while buffer.flushes == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert buffer.flushes == 1  # well before the 60s interval
+        finally:
+            buffer.stop()
+        db_session.expire_all()
+        assert get_url_by_code(db_session, a.short_code).clicks == 5
+
+
+class TestClickCount:
+    def test_includes_pending_delta(self, db_session):
+        a = _make_url(db_session)
+        click_buffer.add(a.short_code, 2)
+        assert get_click_count(a) == 2
+
+    def test_info_includes_pending_clicks(self, client):
+        code = client.post("/shorten", json={"original_url": "https://example.com"}).json()["short_code"]
+        client.get(f"/{code}")
+        client.get(f"/{code}")
+        assert click_buffer.pending(code) == 2
+        assert client.get(f"/info/{code}").json()["clicks"] == 2
@@ -0,0 +1,73 @@
+"""
+Tests for short-code allocation.
+"""
+import pytest
+
+from app.codes import (
+    ALPHABET,
+    RandomCodeAllocator,
+    SequenceCodeAllocator,
+    encode_base62,
+)
+from app.crud import create_short_url
+from app.models import URL, CodeSequence
+from app.schemas import URLCreate
+
+
+class TestEncodeBase62:
+    def test_fixed_width(self):
+        assert encode_base62(0, 4) == "aaaa"
+        assert len(encode_base62(61, 6)) == 6
+
+    def test_overflow(self):
+        with pytest.raises(ValueError):
+            encode_base62(62 ** 2, 2)
+
+
+class TestSequenceCodeAllocator:
+    def test_scramble_is_a_permutation(self):
+        allocator = SequenceCodeAllocator(length=2, block_size=10, key="k")
+        images = [allocator.scramble(i) for i in range(allocator.space)]
+        assert sorted(images) == list(range(allocator.space))
+
+    def test_key_changes_permutation(self):
+        a = SequenceCodeAllocator(length=6, block_size=10, key="a")
+        b = SequenceCodeAllocator(length=6, block_size=10, key="b")
+        assert [a.code_for(i) for i in range(5)] != [b.code_for(i) for i in range(5)]
+
+    def test_allocates_unique_codes_across_blocks(self, db_session):
+        allocator = SequenceCodeAllocator(length=6, block_size=10, key="k")
+        codes = allocator.allocate_many(db_session, 25) + [allocator.allocate(db_session) for _ in range(10)]
+        assert len(set(codes)) == 35
+        assert all(len(c) == 6 and set(c) <= set(ALPHABET) for c in codes)
+        # 25 fits in one oversized block, then one more block of 10
+        assert db_session.get(CodeSequence, "urls").next_value == 35
+
+    def test_two_allocators_share_the_sequence(self, db_session):
+        first = SequenceCodeAllocator(length=6, block_size=5, key="k")
+        second = SequenceCodeAllocator(length=6, block_size=5, key="k")
+        codes = first.allocate_many(db_session, 5) + second.allocate_many(db_session, 5) + first.allocate_many(db_session, 5)
+        assert len(set(codes)) == 15
+
+
+class TestRandomCodeAllocator:
+    def test_length_and_alphabet(self, db_session):
+        code = RandomCodeAllocator(length=8).allocate(db_session)
+        assert len(code) == 8
+        assert set(code) <= set(ALPHABET)
+
+
+class TestCreateShortUrl:
+    def test_retries_on_legacy_collision(self, db_session, monkeypatch):
+        codes = iter(["legacy", "fresh1"])
+
+        class FixedAllocator:
+            def allocate(self, db):
+                return next(codes)
+
+        monkeypatch.setattr("app.crud.get_code_allocator", lambda: FixedAllocator())
+        db_session.add(URL(short_code="legacy", original_url="https://old.com/"))
+        db_session.commit()
+
+        db_url = create_short_url(db_session, URLCreate(original_url="https://new.com"))
+        assert db_url.short_code == "fresh1"
@@ -0,0 +1,123 @@
+"""
+Tests for ETag / 304 on /my-urls, /bookmarks and /info/{short_code}, and the
+per-user data version the list ETags derive from.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.clicks import ClickBuffer
+from app.models import User
+from tests.conftest import engine
+
+
+@contextmanager
+def statements():
+    """Collect the SQL the test database runs inside the block."""
+    seen: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield seen
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _version(db_session, user) -> int:
+    db_session.expire_all()
+    return db_session.get(User, user.id).data_version
+
+
+class TestListETags:
+    def test_my_urls_304_skips_the_list_query(self, client, auth_headers):
+        client.post("/shorten", json={"original_url": "https://a.com"}, headers=auth_headers)
+        first = client.get("/my-urls", headers=auth_headers)
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        with statements() as seen:
+            again = client.get("/my-urls", headers={**auth_headers, "If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.headers["etag"] == etag
+        assert not any("FROM urls" in sql for sql in seen)
+
+    def test_new_url_changes_etag(self, client, auth_headers):
+        etag = client.get("/my-urls", headers=auth_headers).headers["etag"]
+        client.post("/shorten", json={"original_url": "https://b.com"}, headers=auth_headers)
+        response = client.get("/my-urls", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert len(response.json()) == 1
+
+    def test_etag_differs_per_page_and_filter(self, client, auth_headers):
+        plain = client.get("/bookmarks", headers=auth_headers).headers["etag"]
+        searched = client.get("/bookmarks", params={"search": "x"}, headers=auth_headers).headers["etag"]
+        small_page = client.get("/bookmarks", params={"limit": 1}, headers=auth_headers).headers["etag"]
+        assert len({plain, searched, small_page}) == 3
+
+    def test_etag_differs_per_user(self, client, auth_headers, second_auth_headers):
+        assert (
+            client.get("/bookmarks", headers=auth_headers).headers["etag"]
+            != client.get("/bookmarks", headers=second_auth_headers).headers["etag"]
+        )
+
+    def test_bookmark_writes_change_etag(self, client, auth_headers):
+        def etag():
+            return client.get("/bookmarks", headers=auth_headers).headers["etag"]
+
+        before = etag()
+        bookmark = client.post("/bookmarks", json={"url": "https://x.com", "title": "X"}, headers=auth_headers).json()
+        created = etag()
+        client.put(f"/bookmarks/{bookmark['id']}", json={"title": "Y"}, headers=auth_headers)
+        updated = etag()
+        client.delete(f"/bookmarks/{bookmark['id']}", headers=auth_headers)
+        deleted = etag()
+        assert len({before, created, updated, deleted}) == 4
+
+    def test_bookmarks_304(self, client, auth_headers):
+        client.post("/bookmarks", json={"url": "https://x.com", "title": "X"}, headers=auth_headers)
+        etag = client.get("/bookmarks", headers=auth_headers).headers["etag"]
+        response = client.get("/bookmarks", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_streamed_listing_carries_etag(self, client, auth_headers):
+        response = client.get("/my-urls", params={"stream": "true"}, headers=auth_headers)
+        etag = response.headers["etag"]
+        again = client.get("/my-urls", params={"stream": "true"}, headers={**auth_headers, "If-None-Match": etag})
+        assert again.status_code == 304
+
+
+class TestDataVersion:
+    def test_click_flush_bumps_owner_only(self, client, db_session, test_user, second_user, auth_headers):
+        code = client.post("/shorten", json={"original_url": "https://a.com"}, headers=auth_headers).json()[
+            "short_code"
+        ]
+        owner_before, other_before = _version(db_session, test_user), _version(db_session, second_user)
+
+        buffer = ClickBuffer(flush_interval=60, flush_threshold=1000)
+        buffer.add(code, 3)
+        buffer.flush(db_session)
+
+        assert _version(db_session, test_user) == owner_before + 1
+        assert _version(db_session, second_user) == other_before
+
+    def test_anonymous_links_bump_nobody(self, client, db_session, test_user):
+        before = _version(db_session, test_user)
+        client.post("/shorten", json={"original_url": "https://anon.com"})
+        assert _version(db_session, test_user) == before
+
+
+class TestInfoETag:
+    def test_info_304_until_clicked(self, client):
+        code = client.post("/shorten", json={"original_url": "https://a.com"}).json()["short_code"]
+        etag = client.get(f"/info/{code}").headers["etag"]
+        assert client.get(f"/info/{code}", headers={"If-None-Match": etag}).status_code == 304
+
+        client.get(f"/{code}")
+        response = client.get(f"/info/{code}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["clicks"] == 1
@@ -0,0 +1,46 @@
+"""
+Tests for the SQLite storage profile and engine options.
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.config import get_settings
+from app.database import configure_engine, engine_options, run_sqlite_maintenance
+
+settings = get_settings()
+
+
+def _pragma(conn, name):
+    return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+class TestSqliteProfile:
+    def test_pragmas_applied_on_connect(self, tmp_path):
+        url = f"sqlite:///{tmp_path}/profile.db"
+        engine = configure_engine(create_engine(url, **engine_options(url)))
+        with engine.connect() as conn:
+            assert _pragma(conn, "journal_mode") == settings.SQLITE_JOURNAL_MODE.lower()
+            assert _pragma(conn, "synchronous") == 1  # NORMAL
+            assert _pragma(conn, "busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+            assert _pragma(conn, "cache_size") == settings.SQLITE_CACHE_SIZE
+            assert _pragma(conn, "temp_store") == 2  # MEMORY
+        engine.dispose()
+
+    def test_pool_options(self, tmp_path):
+        url = f"sqlite:///{tmp_path}/pool.db"
+        engine = create_engine(url, **engine_options(url))
+        assert isinstance(engine.pool, QueuePool)
+        assert engine.pool.size() == settings.DB_POOL_SIZE
+        engine.dispose()
+
+    def test_memory_database_skips_pool_sizing(self):
+        assert "pool_size" not in engine_options("sqlite://")
+
+    def test_maintenance_runs(self, tmp_path):
+        url = f"sqlite:///{tmp_path}/maint.db"
+        engine = configure_engine(create_engine(url, **engine_options(url)))
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+            conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+        run_sqlite_maintenance(engine)
+        engine.dispose()
@@ -0,0 +1,156 @@
+"""
+Tests for idempotent shortening (dedupe on the canonical-URL hash).
+"""
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app import manage
+from app.config import get_settings
+from app.crud import backfill_url_hashes, create_short_url, create_short_urls
+from app.dedup import canonicalize_url, url_hash
+from app.models import URL
+from app.schemas import URLCreate
+
+settings = get_settings()
+
+
+def _create(db_session, url, user_id=None, dedupe=True):
+    return create_short_url(db_session, URLCreate(original_url=url, dedupe=dedupe), user_id=user_id)
+
+
+class TestCanonicalize:
+    @pytest.mark.parametrize(
+        "a, b",
+        [
+            ("HTTPS://Example.COM", "https://example.com/"),
+            ("http://example.com:80/a", "http://example.com/a"),
+            ("https://example.com:443/a?x=1", "https://example.com/a?x=1"),
+        ],
+    )
+    def test_equivalent(self, a, b):
+        assert canonicalize_url(a) == canonicalize_url(b)
+        assert url_hash(a) == url_hash(b)
+
+    @pytest.mark.parametrize(
+        "a, b",
+        [
+            ("https://example.com/A", "https://example.com/a"),
+            ("https://example.com/?a=1&b=2", "https://example.com/?b=2&a=1"),
+            ("https://example.com:8443/", "https://example.com/"),
+        ],
+    )
+    def test_distinct(self, a, b):
+        assert url_hash(a) != url_hash(b)
+
+
+class TestCreateShortUrl:
+    def test_reuses_existing(self, db_session, test_user):
+        first = _create(db_session, "https://example.com/page", test_user.id)
+        again = _create(db_session, "https://EXAMPLE.com/page", test_user.id)
+        assert again.short_code == first.short_code
+        assert db_session.query(URL).count() == 1
+
+    def test_opt_out_creates_new(self, db_session, test_user):
+        first = _create(db_session, "https://example.com", test_user.id)
+        other = _create(db_session, "https://example.com", test_user.id, dedupe=False)
+        assert other.short_code != first.short_code
+
+    def test_scoped_per_user(self, db_session, test_user, second_user):
+        mine = _create(db_session, "https://example.com", test_user.id)
+        theirs = _create(db_session, "https://example.com", second_user.id)
+        anonymous = _create(db_session, "https://example.com")
+        assert len({mine.short_code, theirs.short_code, anonymous.short_code}) == 3
+        assert _create(db_session, "https://example.com").short_code == anonymous.short_code
+
+    def test_redirect_status_must_match(self, db_session, test_user):
+        def create(status):
+            url = URLCreate(original_url="https://example.com", dedupe=True, redirect_status=status)
+            return create_short_url(db_session, url, user_id=test_user.id)
+
+        permanent = create(301)
+        temporary = create(302)
+        default = create(None)
+        assert len({permanent.short_code, temporary.short_code, default.short_code}) == 3
+        assert create(301).short_code == permanent.short_code
+        assert create(None).short_code == default.short_code
+
+    def test_server_default(self, db_session, monkeypatch):
+        first = _create(db_session, "https://example.com", dedupe=None)
+        assert _create(db_session, "https://example.com", dedupe=None).short_code != first.short_code
+        monkeypatch.setattr(settings, "URL_DEDUP_DEFAULT", True)
+        assert _create(db_session, "https://example.com", dedupe=None).short_code == first.short_code
+
+
+class TestBatch:
+    def test_existing_and_in_batch_repeats(self, db_session):
+        existing = _create(db_session, "https://a.com")
+        urls = [
+            URLCreate(original_url="https://a.com", dedupe=True),
+            URLCreate(original_url="https://b.com", dedupe=True),
+            URLCreate(original_url="https://B.com/", dedupe=True),
+            URLCreate(original_url="https://b.com", dedupe=False),
+        ]
+        results = create_short_urls(db_session, urls)
+        assert results[0].short_code == existing.short_code
+        assert results[1].short_code == results[2].short_code
+        assert results[3].short_code != results[1].short_code
+        assert db_session.query(URL).count() == 3
+
+    def test_redirect_status_must_match(self, db_session):
+        existing = create_short_url(
+            db_session, URLCreate(original_url="https://a.com", dedupe=True, redirect_status=301)
+        )
+        urls = [
+            URLCreate(original_url="https://a.com", dedupe=True, redirect_status=301),
+            URLCreate(original_url="https://a.com", dedupe=True, redirect_status=302),
+            URLCreate(original_url="https://a.com", dedupe=True, redirect_status=302),
+        ]
+        results = create_short_urls(db_session, urls)
+        assert results[0].short_code == existing.short_code
+        assert results[1].short_code == results[2].short_code != existing.short_code
+        assert results[1].redirect_status == 302
+
+    def test_api_counts_reused(self, client):
+        client.post("/shorten", json={"original_url": "https://a.com"})
+        data = client.post(
+            "/shorten/batch",
+            json={"items": [
+                {"original_url": "https://a.com", "dedupe": True},
+                {"original_url": "https://c.com", "dedupe": True},
+                {"original_url": "https://c.com", "dedupe": True},
+            ]},
+        ).json()
+        assert (data["created"], data["reused"], data["failed"]) == (1, 2, 0)
+
+
+class TestApi:
+    def test_shorten_returns_existing(self, client, auth_headers):
+        first = client.post("/shorten", json={"original_url": "https://example.com"}, headers=auth_headers).json()
+        client.get(f"/{first['short_code']}")
+        again = client.post(
+            "/shorten", json={"original_url": "https://example.com", "dedupe": True}, headers=auth_headers
+        ).json()
+        assert again["short_code"] == first["short_code"]
+        assert again["clicks"] == 1
+
+
+class TestBackfill:
+    def test_backfill_enables_matching(self, db_session):
+        db_session.add(URL(short_code="legacy1", original_url="https://old.com/"))
+        db_session.commit()
+        assert backfill_url_hashes(db_session, batch_size=1) == 1
+        assert _create(db_session, "https://old.com").short_code == "legacy1"
+
+    def test_add_missing_columns(self, tmp_path, monkeypatch):
+        legacy = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+        with legacy.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE urls (id INTEGER PRIMARY KEY, short_code VARCHAR NOT NULL, "
+                "original_url VARCHAR NOT NULL, clicks INTEGER, created_at DATETIME, user_id INTEGER)"
+            ))
+        monkeypatch.setattr(manage, "engine", legacy)
+        assert manage.ensure_schema() == ["urls.url_hash", "urls.redirect_status"]
+        assert "url_hash" in {c["name"] for c in inspect(legacy).get_columns("urls")}
+        assert "ix_urls_user_id_url_hash" in {i["name"] for i in inspect(legacy).get_indexes("urls")}
+        assert manage.ensure_schema() == []
+        legacy.dispose()
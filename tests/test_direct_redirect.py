@@ -0,0 +1,85 @@
+"""
+Tests for GET /r/{short_code}: real HTTP redirects with cache validators.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.config import get_settings
+from app.http_cache import etag_matches, http_date
+
+settings = get_settings()
+
+
+def _shorten(client, **extra) -> str:
+    return client.post("/shorten", json={"original_url": "https://example.com/page", **extra}).json()["short_code"]
+
+
+class TestDirectRedirect:
+    def test_default_is_temporary_and_revalidated(self, client):
+        code = _shorten(client)
+        response = client.get(f"/r/{code}", follow_redirects=False)
+        assert response.status_code == settings.REDIRECT_DEFAULT_STATUS
+        assert response.headers["location"] == "https://example.com/page"
+        assert response.headers["cache-control"] == settings.REDIRECT_TEMPORARY_CACHE_CONTROL
+        assert response.headers["etag"].startswith('"')
+        assert response.headers["last-modified"].endswith("GMT")
+
+    @pytest.mark.parametrize("status_code", [301, 308])
+    def test_permanent_links_are_cacheable(self, client, status_code):
+        code = _shorten(client, redirect_status=status_code)
+        response = client.get(f"/r/{code}", follow_redirects=False)
+        assert response.status_code == status_code
+        assert response.headers["cache-control"] == settings.REDIRECT_PERMANENT_CACHE_CONTROL
+
+    def test_307_per_link(self, client):
+        code = _shorten(client, redirect_status=307)
+        assert client.get(f"/r/{code}", follow_redirects=False).status_code == 307
+
+    def test_unsupported_status_rejected(self, client):
+        response = client.post("/shorten", json={"original_url": "https://example.com", "redirect_status": 200})
+        assert response.status_code == 422
+
+    def test_conditional_requests_get_304(self, client):
+        code = _shorten(client)
+        first = client.get(f"/r/{code}", follow_redirects=False)
+
+        by_etag = client.get(f"/r/{code}", headers={"If-None-Match": first.headers["etag"]}, follow_redirects=False)
+        assert by_etag.status_code == 304
+        assert by_etag.headers["etag"] == first.headers["etag"]
+
+        by_date = client.get(
+            f"/r/{code}", headers={"If-Modified-Since": first.headers["last-modified"]}, follow_redirects=False
+        )
+        assert by_date.status_code == 304
+
+        stale = client.get(f"/r/{code}", headers={"If-None-Match": '"other"'}, follow_redirects=False)
+        assert stale.status_code == settings.REDIRECT_DEFAULT_STATUS
+
+    def test_every_hit_is_counted(self, client):
+        code = _shorten(client)
+        first = client.get(f"/r/{code}", follow_redirects=False)
+        client.get(f"/r/{code}", headers={"If-None-Match": first.headers["etag"]}, follow_redirects=False)
+        assert client.get(f"/info/{code}").json()["clicks"] == 2
+
+    def test_etag_differs_per_link(self, client):
+        first, second = _shorten(client), _shorten(client, redirect_status=301)
+        assert (
+            client.get(f"/r/{first}", follow_redirects=False).headers["etag"]
+            != client.get(f"/r/{second}", follow_redirects=False).headers["etag"]
+        )
+
+    def test_unknown_code(self, client):
+        assert client.get("/r/nope42", follow_redirects=False).status_code == 404
+
+
+class TestValidators:
+    def test_etag_matching(self):
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('W/"abc"', '"abc"')
+        assert etag_matches('"x", "abc"', '"abc"')
+        assert etag_matches("*", '"abc"')
+        assert not etag_matches('"abcd"', '"abc"')
+
+    def test_http_date_treats_naive_as_utc(self):
+        assert http_date(datetime(2024, 1, 2, 3, 4, 5)) == "Tue, 02 Jan 2024 03:04:05 GMT"
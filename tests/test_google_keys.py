@@ -0,0 +1,126 @@
+"""
+Tests for local Google ID-token verification against the cached key set,
+using the JWKS stand-in server from tests.jwks_stub.
+"""
+import time
+
+import pytest
+
+from app.config import get_settings
+from app.google_keys import GoogleKeySet, cache_ttl
+from tests.jwks_stub import JWKSStub
+
+settings = get_settings()
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+
+
+@pytest.fixture
+def jwks_stub():
+    stub = JWKSStub(max_age=3600).start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def clock():
+    now = [1_000.0]
+    return now
+
+
+@pytest.fixture
+def key_set(jwks_stub, clock):
+    return GoogleKeySet(jwks_stub.url, clock=lambda: clock[0])
+
+
+class TestCacheTTL:
+    def test_max_age_minus_age(self):
+        assert cache_ttl({"Cache-Control": "public, max-age=20000", "Age": "500"}, 3600, 60, 86400) == 19500
+
+    def test_no_store_and_missing(self):
+        assert cache_ttl({"Cache-Control": "no-store"}, 3600, 60, 86400) == 60
+        assert cache_ttl({}, 3600, 60, 86400) == 3600
+
+    def test_clamped(self):
+        assert cache_ttl({"Cache-Control": "max-age=5"}, 3600, 60, 86400) == 60
+        assert cache_ttl({"Cache-Control": "max-age=999999"}, 3600, 60, 86400) == 86400
+
+
+class TestVerify:
+    def test_valid_token_verified_locally(self, key_set, jwks_stub):
+        for _ in range(3):
+            claims = key_set.verify(jwks_stub.issue(CLIENT_ID, email="a@example.com"), CLIENT_ID)
+        assert claims["email"] == "a@example.com"
+        assert jwks_stub.requests == 1
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [{"aud": "someone-else"}, {"iss": "https://evil.example"}, {"exp": int(time.time()) - 10}],
+    )
+    def test_rejects_bad_claims(self, key_set, jwks_stub, overrides):
+        with pytest.raises(ValueError):
+            key_set.verify(jwks_stub.issue(CLIENT_ID, **overrides), CLIENT_ID)
+
+    def test_rejects_foreign_signature(self, key_set, jwks_stub):
+        other = JWKSStub()
+        forged = other.issue(CLIENT_ID, kid=None)
+        with pytest.raises(ValueError):
+            key_set.verify(forged, CLIENT_ID)
+
+
+class TestKeyRefresh:
+    def test_expiry_revalidates_with_etag(self, key_set, jwks_stub, clock):
+        token = jwks_stub.issue(CLIENT_ID)
+        key_set.verify(token, CLIENT_ID)
+        clock[0] += 3601
+        key_set.verify(token, CLIENT_ID)
+        assert (jwks_stub.requests, key_set.not_modified) == (2, 1)
+
+    def test_rotation_fetches_new_key_once(self, key_set, jwks_stub, clock):
+        key_set.verify(jwks_stub.issue(CLIENT_ID), CLIENT_ID)
+        clock[0] += settings.GOOGLE_JWKS_UNKNOWN_KID_COOLDOWN_SECONDS
+        jwks_stub.rotate()
+        key_set.verify(jwks_stub.issue(CLIENT_ID), CLIENT_ID)
+        key_set.verify(jwks_stub.issue(CLIENT_ID), CLIENT_ID)
+        assert jwks_stub.requests == 2
+
+    def test_unknown_kid_refetch_is_rate_limited(self, key_set, jwks_stub):
+        key_set.verify(jwks_stub.issue(CLIENT_ID), CLIENT_ID)
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                key_set.get_key("made-up")
+        assert jwks_stub.requests == 1
+
+    def test_background_refresh_before_expiry(self, key_set, jwks_stub, clock):
+        key_set.refresh_if_due()
+        key_set.refresh_if_due()
+        assert jwks_stub.requests == 1
+        clock[0] += 3600 - settings.GOOGLE_JWKS_REFRESH_MARGIN_SECONDS
+        key_set.refresh_if_due()
+        assert jwks_stub.requests == 2
+
+    def test_keeps_stale_keys_when_fetch_fails(self, key_set, jwks_stub, clock):
+        token = jwks_stub.issue(CLIENT_ID)
+        key_set.verify(token, CLIENT_ID)
+        jwks_stub.fail = True
+        clock[0] += 3601
+        assert key_set.verify(token, CLIENT_ID)["aud"] == CLIENT_ID
+        assert key_set.failures == 1
+
+    def test_no_keys_and_unreachable(self, key_set, jwks_stub):
+        jwks_stub.fail = True
+        with pytest.raises(ValueError):
+            key_set.verify(jwks_stub.issue(CLIENT_ID), CLIENT_ID)
+
+
+class TestGoogleLogin:
+    def test_login_with_stub_token(self, client, key_set, jwks_stub, monkeypatch):
+        monkeypatch.setattr("app.auth.google_keys", key_set)
+        monkeypatch.setattr(settings, "GOOGLE_CLIENT_ID", CLIENT_ID)
+        resp = client.post("/auth/google", json={"token": jwks_stub.issue(CLIENT_ID, email="new@example.com")})
+        assert resp.status_code == 200
+        assert resp.json()["user"]["email"] == "new@example.com"
+
+    def test_login_rejects_bad_token(self, client, key_set, monkeypatch):
+        monkeypatch.setattr("app.auth.google_keys", key_set)
+        assert client.post("/auth/google", json={"token": "garbage"}).status_code == 401
@@ -0,0 +1,110 @@
+"""
+Tests for the Prometheus metrics: per-thread registry, request middleware,
+SQL statement timing and the /metrics endpoint.
+"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.database import TimedQueuePool, configure_engine
+from app.metrics import MetricsRegistry, _request_db, metrics
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.clear()
+    yield
+    metrics.clear()
+
+
+def _route_key(name, method, route, **extra):
+    labels = (("method", method), ("route", route)) + tuple(extra.items())
+    return (name, labels)
+
+
+class TestRegistry:
+    def test_counters_from_many_threads_are_summed(self):
+        registry = MetricsRegistry()
+        registry.counter("hits_total", "Hits.")
+
+        def work():
+            for _ in range(1000):
+                registry.inc("hits_total", (("kind", "a"),))
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert registry.snapshot()[("hits_total", (("kind", "a"),))] == 8000
+
+    def test_histogram_buckets_are_cumulative_in_text(self):
+        registry = MetricsRegistry()
+        registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            registry.observe("latency_seconds", value)
+
+        lines = registry.render().splitlines()
+        assert "# TYPE latency_seconds histogram" in lines
+        assert 'latency_seconds_bucket{le="0.1"} 2' in lines  # le is inclusive
+        assert 'latency_seconds_bucket{le="1"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert "latency_seconds_count 4" in lines
+        assert "latency_seconds_sum 2.65" in lines
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("odd_total", "Odd labels.")
+        registry.inc("odd_total", (("path", 'a"b\\c'),))
+        assert 'odd_total{path="a\\"b\\\\c"} 1' in registry.render()
+
+
+class TestRequestMetrics:
+    def test_requests_counted_by_route_template(self, client):
+        code = client.post("/shorten", json={"original_url": "https://example.com/metrics"}).json()["short_code"]
+        client.get(f"/{code}")
+        client.get(f"/{code}")
+        client.get("/doesnotexist")
+
+        snapshot = metrics.snapshot()
+        assert snapshot[_route_key("http_requests_total", "GET", "/{short_code}", status="200")] == 2
+        assert snapshot[_route_key("http_requests_total", "GET", "/{short_code}", status="404")] == 1
+        assert snapshot[_route_key("http_requests_total", "POST", "/shorten", status="200")] == 1
+        assert snapshot[_route_key("http_request_duration_seconds", "GET", "/{short_code}")]["count"] == 3
+
+    def test_unmatched_paths_share_one_series(self, client):
+        client.post("/no/such/path")
+        client.post("/another/missing/path")
+        snapshot = metrics.snapshot()
+        assert snapshot[_route_key("http_requests_total", "POST", "unmatched", status="404")] == 2
+
+    def test_metrics_endpoint_serves_prometheus_text(self, client):
+        client.get("/")
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert 'http_requests_total{method="GET",route="/",status="200"} 1' in body
+        assert "# TYPE http_request_duration_seconds histogram" in body
+        assert 'cache_hit_ratio{cache="url"}' in body
+        assert "bloom_negative_hits_total" in body
+
+
+class TestDatabaseMetrics:
+    def test_statements_timed_by_operation_and_counted_per_request(self, tmp_path):
+        engine = configure_engine(create_engine(f"sqlite:///{tmp_path}/m.db", poolclass=TimedQueuePool))
+        request_db = [0, 0.0]
+        token = _request_db.set(request_db)
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+        finally:
+            _request_db.reset(token)
+            engine.dispose()
+
+        snapshot = metrics.snapshot()
+        assert snapshot[("db_query_duration_seconds", (("operation", "select"),))]["count"] >= 2
+        assert snapshot[("db_pool_checkout_wait_seconds", ())]["count"] >= 1
+        assert request_db[0] >= 2 and request_db[1] > 0
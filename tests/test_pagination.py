@@ -0,0 +1,115 @@
+"""
+Tests for keyset (cursor) pagination of /my-urls and /bookmarks.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.crud import create_bookmark, get_bookmarks_page, get_urls_page
+from app.models import URL
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.schemas import BookmarkCreate
+
+
+def _add_urls(db_session, user_id, count, created_at=None):
+    for i in range(count):
+        url = URL(original_url=f"https://site{i}.com", short_code=f"pg{i:04d}", user_id=user_id)
+        if created_at is not None:
+            url.created_at = created_at
+        db_session.add(url)
+    db_session.commit()
+
+
+def _walk(fetch, limit):
+    """Follow cursors until the last page; return every item served."""
+    items, cursor, pages = [], None, 0
+    while True:
+        page, cursor = fetch(limit=limit, cursor=cursor)
+        items.extend(page)
+        pages += 1
+        assert len(page) <= limit
+        if cursor is None:
+            return items, pages
+
+
+class TestCursor:
+    def test_round_trip(self):
+        values = [datetime(2024, 5, 1, 12, 30, 15, 123456), 42, 1.5, "x"]
+        assert decode_cursor(encode_cursor(values), 4) == values
+
+    def test_rejects_garbage(self):
+        with pytest.raises(InvalidCursor):
+            decode_cursor("not-a-cursor!!", 2)
+
+    def test_rejects_wrong_shape(self):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor([1, 2, 3]), 2)
+
+
+class TestUrlPages:
+    def test_pages_cover_all_rows_once(self, db_session, test_user):
+        _add_urls(db_session, test_user.id, 25)
+        urls, pages = _walk(lambda **kw: get_urls_page(db_session, test_user.id, **kw), limit=10)
+        assert pages == 3
+        assert len({u.id for u in urls}) == 25
+        assert [u.created_at for u in urls] == sorted((u.created_at for u in urls), reverse=True)
+
+    def test_created_at_ties_broken_by_id(self, db_session, test_user):
+        _add_urls(db_session, test_user.id, 7, created_at=datetime(2024, 1, 1))
+        urls, _ = _walk(lambda **kw: get_urls_page(db_session, test_user.id, **kw), limit=3)
+        ids = [u.id for u in urls]
+        assert ids == sorted(ids, reverse=True)
+        assert len(set(ids)) == 7
+
+    def test_exact_multiple_has_no_empty_trailing_page(self, db_session, test_user):
+        _add_urls(db_session, test_user.id, 4)
+        urls, next_cursor = get_urls_page(db_session, test_user.id, limit=4)
+        assert len(urls) == 4
+        assert next_cursor is None
+
+
+class TestBookmarkPages:
+    def test_search_pages_follow_rank(self, db_session, test_user):
+        for i in range(6):
+            create_bookmark(
+                db_session,
+                test_user.id,
+                BookmarkCreate(url=f"https://py{i}.org", title=f"Python {i}", description="python " * i),
+            )
+        everything, _ = get_bookmarks_page(db_session, test_user.id, search="python", limit=100)
+        paged, pages = _walk(
+            lambda **kw: get_bookmarks_page(db_session, test_user.id, search="python", **kw), limit=4
+        )
+        assert pages == 2
+        assert [b.id for b in paged] == [b.id for b in everything]
+
+
+class TestPaginationApi:
+    def test_my_urls_next_cursor_header(self, client, auth_headers, db_session, test_user):
+        _add_urls(db_session, test_user.id, 5)
+        first = client.get("/my-urls", params={"limit": 3}, headers=auth_headers)
+        assert first.status_code == 200
+        assert len(first.json()) == 3
+        cursor = first.headers["X-Next-Cursor"]
+
+        second = client.get("/my-urls", params={"limit": 3, "cursor": cursor}, headers=auth_headers)
+        assert len(second.json()) == 2
+        assert "X-Next-Cursor" not in second.headers
+        codes = [u["short_code"] for u in first.json() + second.json()]
+        assert len(set(codes)) == 5
+
+    def test_bookmarks_paged(self, client, auth_headers):
+        for i in range(3):
+            client.post("/bookmarks", json={"url": f"https://b{i}.org", "title": f"B{i}"}, headers=auth_headers)
+        first = client.get("/bookmarks", params={"limit": 2}, headers=auth_headers)
+        second = client.get(
+            "/bookmarks", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]}, headers=auth_headers
+        )
+        assert [b["title"] for b in first.json() + second.json()] == ["B2", "B1", "B0"]
+
+    def test_invalid_cursor_is_400(self, client, auth_headers):
+        resp = client.get("/my-urls", params={"cursor": "garbage"}, headers=auth_headers)
+        assert resp.status_code == 400
+
+    def test_limit_bounds(self, client, auth_headers):
+        assert client.get("/my-urls", params={"limit": 0}, headers=auth_headers).status_code == 422
@@ -0,0 +1,76 @@
+"""
+Tests for the authenticated-principal cache used by get_current_user / get_optional_user.
+"""
+import time
+
+from jose import jwt
+
+from app.auth import create_jwt
+from app.config import get_settings
+from app.principals import PrincipalCache, principal_cache
+
+settings = get_settings()
+
+
+class TestPrincipalCache:
+    def test_claims_cached_until_exp(self):
+        now = [1_000.0]
+        cache = PrincipalCache(max_size=10, ttl=60, clock=lambda: now[0])
+        token = jwt.encode(
+            {"sub": "1", "exp": int(time.time()) + 3600}, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM
+        )
+        assert cache.claims(token)["sub"] == "1"
+        assert cache.claims(token)["sub"] == "1"
+        assert cache.decodes == 1
+
+    def test_ttl_capped_by_exp(self):
+        token_exp = int(time.time()) + 3600
+        # The clock says the token expires in 2 seconds: the entry must not outlive that.
+        cache = PrincipalCache(max_size=10, ttl=60, clock=lambda: token_exp - 2)
+        token = jwt.encode({"sub": "1", "exp": token_exp}, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        cache.claims(token)
+        expires_at, _ = next(iter(cache.claims_cache._data.values()))
+        assert expires_at - time.monotonic() <= 2
+
+    def test_disabled(self):
+        cache = PrincipalCache(max_size=0, ttl=60)
+        token = create_jwt(1, "a@example.com")
+        cache.claims(token)
+        cache.claims(token)
+        assert cache.decodes == 2
+
+
+class TestDependencies:
+    def test_one_user_lookup_for_repeated_requests(self, client, auth_headers):
+        for _ in range(3):
+            assert client.get("/my-urls", headers=auth_headers).status_code == 200
+        client.post("/shorten", json={"original_url": "https://example.com"}, headers=auth_headers)
+        stats = principal_cache.stats()
+        assert stats["user_lookups"] == 1
+        assert stats["jwt_decodes"] == 1
+
+    def test_snapshot_serves_me(self, client, auth_headers, test_user):
+        client.get("/auth/me", headers=auth_headers)
+        me = client.get("/auth/me", headers=auth_headers).json()
+        assert (me["id"], me["email"], me["name"]) == (test_user.id, test_user.email, "Test User")
+
+    def test_google_login_invalidates_snapshot(self, client, auth_headers, monkeypatch):
+        assert client.get("/auth/me", headers=auth_headers).json()["name"] == "Test User"
+        monkeypatch.setattr(
+            "app.routers.auth.verify_google_token",
+            lambda token: {"email": "test@example.com", "name": "Renamed", "picture": None},
+        )
+        assert client.post("/auth/google", json={"token": "x"}).status_code == 200
+        assert client.get("/auth/me", headers=auth_headers).json()["name"] == "Renamed"
+
+    def test_invalid_token_not_cached(self, client):
+        headers = {"Authorization": "Bearer not-a-jwt"}
+        assert client.get("/my-urls", headers=headers).status_code == 401
+        assert client.get("/my-urls", headers=headers).status_code == 401
+        assert len(principal_cache.claims_cache) == 0
+
+    def test_stats_endpoint(self, client, auth_headers, monkeypatch):
+        monkeypatch.setattr(settings, "STATS_ADMIN_TOKEN", "ops-token")
+        client.get("/my-urls", headers=auth_headers)
+        data = client.get("/stats/principals", headers={"X-Admin-Token": "ops-token"}).json()
+        assert data["users"]["size"] == 1
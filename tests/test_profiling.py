@@ -0,0 +1,145 @@
+"""
+Tests for the on-demand profiling hook: request selection, saved profiles
+with their SQL, and the on-disk ring buffer.
+"""
+import cProfile
+import json
+import pstats
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app import profiling
+from app.config import get_settings
+from app.database import configure_engine
+from app.profiling import PROFILE_ID_HEADER, ProfilingMiddleware, install_endpoint_hooks, prune_profiles
+
+settings = get_settings()
+
+
+@pytest.fixture
+def profiled_app(tmp_path, monkeypatch):
+    """A small app with profiling on, one endpoint that queries the database and one that doesn't."""
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", "let-me-profile")
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "PROFILING_ROUTES", "")
+    engine = configure_engine(create_engine(f"sqlite:///{tmp_path}/profiled.db"))
+
+    def build(**overrides) -> TestClient:
+        for name, value in overrides.items():
+            monkeypatch.setattr(settings, name, value)
+        app = FastAPI()
+
+        @app.get("/query")
+        def run_query():
+            with engine.connect() as conn:
+                return {"value": conn.execute(text("SELECT 42")).scalar()}
+
+        @app.get("/plain")
+        def plain():
+            return {"ok": True}
+
+        @app.get("/async")
+        async def async_endpoint():
+            return {"ok": True}
+
+        install_endpoint_hooks(app.routes)
+        app.add_middleware(ProfilingMiddleware)
+        return TestClient(app)
+
+    yield build
+    engine.dispose()
+
+
+def _saved(directory):
+    return sorted(directory.glob("*.json"))
+
+
+class TestProfilingMiddleware:
+    def test_admin_header_profiles_request_with_its_sql(self, profiled_app, tmp_path):
+        client = profiled_app()
+        response = client.get("/query", headers={"X-Profile": "let-me-profile"})
+        assert response.json() == {"value": 42}
+
+        profile_id = response.headers[PROFILE_ID_HEADER]
+        meta = json.loads((tmp_path / "profiles" / f"{profile_id}.json").read_text())
+        assert meta["route"] == "run_query"
+        assert meta["trigger"] == "header"
+        assert meta["status"] == 200
+        assert [q["statement"] for q in meta["sql"]] == ["SELECT 42"]
+        assert (tmp_path / "profiles" / f"{profile_id}.collapsed").exists()
+
+    def test_wrong_token_or_no_header_is_not_profiled(self, profiled_app, tmp_path):
+        client = profiled_app()
+        assert PROFILE_ID_HEADER not in client.get("/query", headers={"X-Profile": "guess"}).headers
+        assert PROFILE_ID_HEADER not in client.get("/query").headers
+        assert not (tmp_path / "profiles").exists()
+
+    def test_sampling_limited_to_configured_routes(self, profiled_app, tmp_path):
+        client = profiled_app(PROFILING_SAMPLE_RATE=1.0, PROFILING_ROUTES="run_query")
+        assert PROFILE_ID_HEADER in client.get("/query").headers
+        assert PROFILE_ID_HEADER not in client.get("/plain").headers
+        meta = json.loads(_saved(tmp_path / "profiles")[0].read_text())
+        assert meta["trigger"] == "sample"
+
+    def test_cprofile_mode_covers_the_endpoint_thread(self, profiled_app, tmp_path):
+        client = profiled_app(PROFILING_MODE="cprofile")
+        profile_id = client.get("/query", headers={"X-Profile": "let-me-profile"}).headers[PROFILE_ID_HEADER]
+        stats = pstats.Stats(str(tmp_path / "profiles" / f"{profile_id}.prof"))
+        assert any(func[2] == "run_query" for func in stats.stats)
+
+    def test_cprofile_mode_covers_async_endpoints(self, profiled_app, tmp_path):
+        client = profiled_app(PROFILING_MODE="cprofile")
+        profile_id = client.get("/async", headers={"X-Profile": "let-me-profile"}).headers[PROFILE_ID_HEADER]
+        stats = pstats.Stats(str(tmp_path / "profiles" / f"{profile_id}.prof"))
+        assert any(func[2] == "async_endpoint" for func in stats.stats)
+
+    def test_cprofile_mode_enables_one_profiler_per_request(self, profiled_app, monkeypatch):
+        enabled = []
+
+        class CountingProfile(cProfile.Profile):
+            def enable(self, *args, **kwargs):
+                enabled.append(self)
+                super().enable(*args, **kwargs)
+
+        monkeypatch.setattr(profiling.cProfile, "Profile", CountingProfile)
+        client = profiled_app(PROFILING_MODE="cprofile")
+        client.get("/query", headers={"X-Profile": "let-me-profile"})
+        assert len(enabled) == 1
+
+    def test_cprofile_busy_falls_back_to_sampling(self, profiled_app, tmp_path, monkeypatch):
+        class BusyProfile(cProfile.Profile):
+            def enable(self, *args, **kwargs):
+                raise ValueError("Another profiling tool is already active")
+
+        monkeypatch.setattr(profiling.cProfile, "Profile", BusyProfile)
+        client = profiled_app(PROFILING_MODE="cprofile")
+        response = client.get("/query", headers={"X-Profile": "let-me-profile"})
+        assert response.json() == {"value": 42}
+        profile_id = response.headers[PROFILE_ID_HEADER]
+        assert json.loads((tmp_path / "profiles" / f"{profile_id}.json").read_text())["mode"] == "sampling"
+        assert (tmp_path / "profiles" / f"{profile_id}.collapsed").exists()
+
+
+class TestRingBuffer:
+    def test_keeps_newest_profiles(self, tmp_path):
+        for i in range(5):
+            (tmp_path / f"20260101T00000{i}-00000{i}.json").write_text("{}")
+            (tmp_path / f"20260101T00000{i}-00000{i}.collapsed").write_text("")
+        prune_profiles(tmp_path, 2)
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "20260101T000003-000003.collapsed",
+            "20260101T000003-000003.json",
+            "20260101T000004-000004.collapsed",
+            "20260101T000004-000004.json",
+        ]
+
+    def test_saving_prunes(self, profiled_app, tmp_path):
+        client = profiled_app(PROFILING_MAX_PROFILES=3)
+        for _ in range(5):
+            client.get("/plain", headers={"X-Profile": "let-me-profile"})
+        assert len(_saved(tmp_path / "profiles")) == 3
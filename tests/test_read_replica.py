@@ -0,0 +1,124 @@
+"""
+Tests for the read replica: read engine URLs, read-only connections, backup
+copies and their staleness bound, and the read-only routes on get_read_db.
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.database import create_configured_engine
+from app.models import URL
+from app.replica import BackupReplica, read_database_url, replica_copy_url, sqlite_readonly_url
+from tests.conftest import TEST_DATABASE_URL
+
+
+@pytest.fixture
+def backup_replica(tmp_path):
+    copy_path = str(tmp_path / "replica.db")
+    engine = create_configured_engine(sqlite_readonly_url(f"sqlite:///{copy_path}"), read_only=True)
+    replica = BackupReplica(engine, max_lag=60, source_path="./test.db", copy_path=copy_path)
+    yield replica
+    engine.dispose()
+
+
+@pytest.fixture
+def replica_routes(backup_replica, monkeypatch):
+    """Route get_read_db to the backup replica, as READ_REPLICA_MODE=backup does."""
+    monkeypatch.setattr(database, "read_replica", backup_replica)
+    monkeypatch.setattr(
+        database, "ReadSessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=backup_replica.engine)
+    )
+    return backup_replica
+
+
+def _shorten(client, url, headers=None) -> str:
+    return client.post("/shorten", json={"original_url": url}, headers=headers).json()["short_code"]
+
+
+class TestReadDatabaseUrl:
+    def test_modes(self):
+        assert read_database_url("off", "sqlite:///./a.db") is None
+        assert read_database_url("readonly", "sqlite:///./a.db") == "sqlite:///file:./a.db?mode=ro&uri=true"
+        assert read_database_url("backup", "sqlite:///./a.db") == "sqlite:///file:a.replica.db?mode=ro&uri=true"
+        assert read_database_url("url", "sqlite:///./a.db", "postgresql://replica/app") == "postgresql://replica/app"
+        assert replica_copy_url("sqlite:////data/app.db") == "sqlite:////data/app.replica.db"
+
+    def test_bad_settings(self):
+        with pytest.raises(ValueError):
+            read_database_url("sometimes", "sqlite:///./a.db")
+        with pytest.raises(ValueError):
+            read_database_url("readonly", "postgresql://db/app")
+        with pytest.raises(ValueError):
+            read_database_url("url", "sqlite:///./a.db")
+
+
+class TestReadOnlyEngine:
+    def test_reads_the_primary_but_cannot_write(self, db_session, test_user):
+        engine = create_configured_engine(sqlite_readonly_url(TEST_DATABASE_URL), read_only=True)
+        try:
+            with engine.connect() as conn:
+                assert conn.exec_driver_sql("SELECT email FROM users").scalar() == "test@example.com"
+                with pytest.raises(OperationalError):
+                    conn.exec_driver_sql("DELETE FROM users")
+        finally:
+            engine.dispose()
+
+
+class TestBackupReplica:
+    def test_copy_lags_until_refreshed(self, backup_replica, db_session):
+        assert not backup_replica.is_fresh()  # no copy yet
+
+        db_session.add(URL(original_url="https://a.com", short_code="first1"))
+        db_session.commit()
+        backup_replica.refresh()
+        assert backup_replica.is_fresh()
+
+        db_session.add(URL(original_url="https://b.com", short_code="second"))
+        db_session.commit()
+        with backup_replica.engine.connect() as conn:
+            assert list(conn.scalars(select(URL.short_code))) == ["first1"]
+
+        backup_replica.refresh()
+        with backup_replica.engine.connect() as conn:
+            assert sorted(conn.scalars(select(URL.short_code))) == ["first1", "second"]
+
+    def test_staleness_bound(self, backup_replica):
+        backup_replica.refresh()
+        backup_replica.max_lag = 0
+        assert not backup_replica.is_fresh()
+
+
+class TestReadRoutes:
+    def test_listing_is_served_by_the_replica(self, client, auth_headers, replica_routes):
+        _shorten(client, "https://a.com", auth_headers)
+        replica_routes.refresh()
+        _shorten(client, "https://b.com", auth_headers)
+
+        listed = client.get("/my-urls", headers=auth_headers).json()
+        assert [u["original_url"] for u in listed] == ["https://a.com/"]
+
+        replica_routes.refresh()
+        assert len(client.get("/my-urls", headers=auth_headers).json()) == 2
+
+    def test_new_links_resolve_before_the_next_refresh(self, client, replica_routes):
+        replica_routes.refresh()
+        code = _shorten(client, "https://new.com")
+
+        assert client.get(f"/{code}").json()["original_url"] == "https://new.com/"
+        assert client.get(f"/info/{code}").status_code == 200
+        assert client.get("/nothere").status_code == 404
+
+    def test_stale_replica_falls_back_to_primary(self, client, auth_headers, replica_routes):
+        replica_routes.refresh()
+        _shorten(client, "https://a.com", auth_headers)
+        replica_routes.max_lag = 0
+        assert len(client.get("/my-urls", headers=auth_headers).json()) == 1
+
+    def test_replica_session_refuses_writes(self, replica_routes):
+        replica_routes.refresh()
+        with database.ReadSessionLocal() as read_db:
+            read_db.add(URL(original_url="https://a.com", short_code="nope12"))
+            with pytest.raises(OperationalError):
+                read_db.commit()
@@ -0,0 +1,69 @@
+"""
+Tests for the fast list serialization: the same bytes as the pydantic
+response models, with and without orjson.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import serialization
+from app.config import get_settings
+from app.serialization import dumps
+
+settings = get_settings()
+
+
+@pytest.fixture
+def listings(client, auth_headers):
+    """Links and bookmarks with the awkward bits: unicode, empty fields, tags."""
+    for i in range(5):
+        client.post("/shorten", json={"original_url": f"https://例え.jp/päth/{i}?q=ü"}, headers=auth_headers)
+    client.post(
+        "/bookmarks",
+        json={"url": "https://a.org", "title": "Çafé \"quoted\"", "description": None, "tags": ["x", "y"]},
+        headers=auth_headers,
+    )
+    client.post("/bookmarks", json={"url": "https://b.org"}, headers=auth_headers)
+
+
+def _both_modes(client, monkeypatch, path, **kwargs):
+    fast = client.get(path, **kwargs)
+    monkeypatch.setattr(settings, "FAST_SERIALIZATION", False)
+    slow = client.get(path, **kwargs)
+    monkeypatch.setattr(settings, "FAST_SERIALIZATION", True)
+    return fast, slow
+
+
+class TestSameOutput:
+    @pytest.mark.parametrize("path", ["/my-urls", "/bookmarks"])
+    def test_pages_match_the_models(self, client, auth_headers, listings, monkeypatch, path):
+        fast, slow = _both_modes(client, monkeypatch, path, params={"limit": 3}, headers=auth_headers)
+        assert fast.content == slow.content
+        assert fast.headers["content-type"] == slow.headers["content-type"]
+        assert fast.headers["etag"] == slow.headers["etag"]
+        assert fast.headers.get("x-next-cursor") == slow.headers.get("x-next-cursor")
+
+    @pytest.mark.parametrize("path", ["/my-urls", "/bookmarks"])
+    def test_streams_match_the_models(self, client, auth_headers, listings, monkeypatch, path):
+        fast, slow = _both_modes(client, monkeypatch, path, params={"stream": "true"}, headers=auth_headers)
+        assert fast.content == slow.content
+
+
+class TestDumps:
+    @pytest.mark.parametrize(
+        "value",
+        [
+            datetime(2024, 5, 1, 12, 30),
+            datetime(2024, 5, 1, 12, 30, 0, 1234),
+            datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+            datetime(2024, 5, 1, 12, 30, tzinfo=timezone(timedelta(hours=2))),
+        ],
+    )
+    def test_stdlib_fallback_matches_orjson(self, monkeypatch, value):
+        payload = {"at": value, "name": "naïve", "tags": None, "n": 3}
+        with_orjson = dumps(payload)
+        monkeypatch.setattr(serialization, "orjson", None)
+        assert dumps(payload) == with_orjson
+
+    def test_utc_is_written_as_z(self):
+        assert dumps(datetime(2024, 1, 1, tzinfo=timezone.utc)) == b'"2024-01-01T00:00:00Z"'
@@ -0,0 +1,233 @@
+"""
+Tests for hash sharding: shard selection, statement routing, cross-shard
+reads, sharded click flushes, the API on a sharded session, and resharding.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from app import crud, fts
+from app.analytics import bucket_start
+from app.auth import create_jwt
+from app.clicks import ClickBuffer
+from app.config import get_settings
+from app.database import Base, configure_engine, get_db
+from app.main import app
+from app.models import URL, Bookmark, ClickRollupDaily, Tag, User, bookmark_tags
+from app.reshard import reshard
+from app.schemas import BookmarkCreate, BookmarkUpdate, URLCreate
+from app.sharding import (
+    ShardRoutingError,
+    shard_database_urls,
+    shard_for_code,
+    shard_for_user,
+    shard_index,
+    sharded_sessionmaker,
+)
+from app.tags import get_tag_counts
+
+settings = get_settings()
+
+SHARDS = 3
+
+
+@pytest.fixture
+def shard_engines(tmp_path):
+    engines = []
+    for i in range(SHARDS):
+        engine = configure_engine(
+            create_engine(f"sqlite:///{tmp_path}/shard{i}.db", connect_args={"check_same_thread": False})
+        )
+        Base.metadata.create_all(bind=engine)
+        fts.ensure_fts(engine)
+        engines.append(engine)
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def sharded_db(shard_engines):
+    session = sharded_sessionmaker(shard_engines, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def owner(sharded_db):
+    user = User(email="sharded@example.com", name="Sharded")
+    sharded_db.add(user)
+    sharded_db.commit()
+    return user
+
+
+def _rows_per_shard(engines, model) -> list[int]:
+    with_counts = []
+    for engine in engines:
+        with Session(engine) as session:
+            with_counts.append(session.scalar(select(func.count()).select_from(model)))
+    return with_counts
+
+
+def _codes(urls) -> list[str]:
+    return [url.short_code for url in urls]
+
+
+class TestShardSelection:
+    def test_stable_and_spread(self):
+        codes = [f"code{i}" for i in range(3000)]
+        shards = [shard_index(code, SHARDS) for code in codes]
+        assert shards == [shard_index(code, SHARDS) for code in codes]
+        assert all(shards.count(i) > 800 for i in range(SHARDS))
+        assert shard_index("anything", 1) == 0
+
+    def test_derived_database_urls(self):
+        assert shard_database_urls("sqlite:///./url_shortener.db", 3) == [
+            "sqlite:///./url_shortener.db",
+            "sqlite:///url_shortener.shard1.db",
+            "sqlite:///url_shortener.shard2.db",
+        ]
+        assert shard_database_urls("sqlite:///./a.db", 2, "sqlite:///./b.db") == ["sqlite:///./a.db", "sqlite:///./b.db"]
+
+    def test_bad_layouts(self):
+        with pytest.raises(ValueError):
+            shard_database_urls("sqlite:///./a.db", 3, "sqlite:///./b.db")
+        with pytest.raises(ValueError):
+            shard_database_urls("postgresql://db/app", 2)
+
+
+class TestShardedUrls:
+    def test_rows_land_on_their_shard(self, sharded_db, shard_engines, owner):
+        urls = [crud.create_short_url(sharded_db, URLCreate(original_url=f"https://e.com/{i}"), owner.id) for i in range(12)]
+        urls += crud.create_short_urls(sharded_db, [URLCreate(original_url=f"https://b.com/{i}") for i in range(12)], owner.id)
+
+        for engine_index, engine in enumerate(shard_engines):
+            with Session(engine) as session:
+                stored = set(session.scalars(select(URL.short_code)))
+            assert stored == {u.short_code for u in urls if shard_for_code(u.short_code, SHARDS) == engine_index}
+        assert all(count > 0 for count in _rows_per_shard(shard_engines, URL))
+        assert crud.get_url_by_code(sharded_db, urls[5].short_code).original_url == "https://e.com/5"
+
+    def test_user_listing_merges_shards_in_order(self, sharded_db, owner):
+        for i in range(20):
+            crud.create_short_url(sharded_db, URLCreate(original_url=f"https://e.com/{i}"), owner.id)
+
+        everything, cursor = crud.get_urls_page(sharded_db, owner.id)
+        assert cursor is None
+        assert [u.original_url for u in everything] == [f"https://e.com/{i}" for i in reversed(range(20))]
+
+        paged, cursor = [], None
+        while True:
+            page, cursor = crud.get_urls_page(sharded_db, owner.id, limit=6, cursor=cursor)
+            paged += page
+            if cursor is None:
+                break
+        assert _codes(paged) == _codes(everything)
+        assert _codes(crud.stream_urls(sharded_db, owner.id, batch_size=4)) == _codes(everything)
+
+    def test_click_flush_spans_shards(self, sharded_db, owner):
+        codes = [crud.create_short_url(sharded_db, URLCreate(original_url=f"https://e.com/{i}"), owner.id).short_code for i in range(9)]
+        version = sharded_db.scalar(select(User.data_version).where(User.id == owner.id))
+        buffer = ClickBuffer(flush_interval=60, flush_threshold=1000)
+        for i, code in enumerate(codes):
+            buffer.add(code, i + 1)
+        assert buffer.flush(sharded_db) == sum(range(1, 10))
+
+        sharded_db.expire_all()
+        assert [crud.get_url_by_code(sharded_db, code).clicks for code in codes] == list(range(1, 10))
+        assert sharded_db.scalar(select(User.data_version).where(User.id == owner.id)) == version + 1
+
+    def test_unbuffered_click(self, sharded_db, owner, monkeypatch):
+        monkeypatch.setattr(settings, "CLICK_BUFFER_ENABLED", False)
+        code = crud.create_short_url(sharded_db, URLCreate(original_url="https://e.com"), owner.id).short_code
+        crud.record_click(sharded_db, code)
+        sharded_db.expire_all()
+        assert crud.get_url_by_code(sharded_db, code).clicks == 1
+
+    def test_write_without_shard_key_is_refused(self, sharded_db):
+        with pytest.raises(ShardRoutingError):
+            sharded_db.execute(insert(bookmark_tags), [{"bookmark_id": 1, "tag_id": 1}])
+
+
+class TestShardedBookmarks:
+    def test_bookmarks_and_tags_live_on_the_owners_shard(self, sharded_db, shard_engines):
+        users = [User(email=f"u{i}@example.com") for i in range(6)]
+        sharded_db.add_all(users)
+        sharded_db.commit()
+        for user in users:
+            crud.create_bookmark(sharded_db, user.id, BookmarkCreate(url="https://a.org", title="Alpha", tags=["x", "y"]))
+            crud.bulk_create_bookmarks(sharded_db, user.id, [BookmarkCreate(url="https://b.org", title="Beta", tags=["y"])])
+
+        for user in users:
+            home = shard_for_user(user.id, SHARDS)
+            for engine_index, engine in enumerate(shard_engines):
+                with Session(engine) as session:
+                    count = session.scalar(select(func.count()).select_from(Bookmark).where(Bookmark.user_id == user.id))
+                assert count == (2 if engine_index == home else 0)
+            assert get_tag_counts(sharded_db, user.id) == [("y", 2), ("x", 1)]
+            assert [b.title for b in crud.get_bookmarks(sharded_db, user.id, search="alph")] == ["Alpha"]
+            assert [b.title for b in crud.get_bookmarks(sharded_db, user.id, tag="x")] == ["Alpha"]
+
+    def test_update_and_delete(self, sharded_db, owner):
+        bookmark = crud.create_bookmark(sharded_db, owner.id, BookmarkCreate(url="https://a.org", title="A", tags=["x"]))
+        found = crud.get_bookmark_by_id(sharded_db, bookmark.id, owner.id)
+        crud.update_bookmark(sharded_db, found, BookmarkUpdate(tags=["z"]))
+        assert get_tag_counts(sharded_db, owner.id) == [("z", 1)]
+        crud.delete_bookmark(sharded_db, found)
+        assert get_tag_counts(sharded_db, owner.id) == []
+        assert crud.get_bookmark_by_id(sharded_db, bookmark.id, owner.id) is None
+
+
+class TestShardedApi:
+    def test_shorten_redirect_and_list(self, sharded_db, owner):
+        app.dependency_overrides[get_db] = lambda: sharded_db
+        headers = {"Authorization": f"Bearer {create_jwt(owner.id, owner.email)}"}
+        try:
+            with TestClient(app) as client:
+                codes = [
+                    client.post("/shorten", json={"original_url": f"https://e.com/{i}"}, headers=headers).json()["short_code"]
+                    for i in range(8)
+                ]
+                assert client.get(f"/{codes[3]}").json()["original_url"] == "https://e.com/3"
+                assert client.get(f"/r/{codes[5]}", follow_redirects=False).headers["location"] == "https://e.com/5"
+                listed = client.get("/my-urls", headers=headers).json()
+                assert [u["short_code"] for u in listed] == list(reversed(codes))
+
+                created = client.post("/bookmarks", json={"url": "https://a.org", "title": "A"}, headers=headers).json()
+                assert client.delete(f"/bookmarks/{created['id']}", headers=headers).status_code == 204
+        finally:
+            app.dependency_overrides.clear()
+
+
+class TestReshard:
+    def _seed(self, engine):
+        with Session(engine) as db:
+            user = User(email="r@example.com")
+            db.add(user)
+            db.commit()
+            urls = crud.create_short_urls(db, [URLCreate(original_url=f"https://e.com/{i}") for i in range(30)], user.id)
+            db.add(ClickRollupDaily(short_code=urls[0].short_code, bucket_start=bucket_start(urls[0].created_at, "day"), clicks=7))
+            for i in range(5):
+                crud.create_bookmark(db, user.id, BookmarkCreate(url=f"https://b.org/{i}", title=f"B{i}", tags=["t"]))
+            db.commit()
+            return user.id, _codes(urls)
+
+    def test_grow_then_shrink(self, shard_engines):
+        user_id, codes = self._seed(shard_engines[0])
+
+        moved = reshard(shard_engines[:1], shard_engines)
+        assert moved["urls"] == sum(1 for code in codes if shard_for_code(code, SHARDS) != 0)
+        assert sum(_rows_per_shard(shard_engines, URL)) == 30
+        with sharded_sessionmaker(shard_engines)() as db:
+            assert sorted(_codes(crud.get_urls_by_user(db, user_id))) == sorted(codes)
+            assert db.scalar(select(ClickRollupDaily.clicks).where(ClickRollupDaily.short_code == codes[0])) == 7
+            assert len(crud.get_bookmarks(db, user_id, tag="t")) == 5
+            assert get_tag_counts(db, user_id) == [("t", 5)]
+
+        reshard(shard_engines, shard_engines[:1])
+        assert _rows_per_shard(shard_engines, URL) == [30, 0, 0]
+        assert _rows_per_shard(shard_engines, Bookmark) == [5, 0, 0]
+        assert _rows_per_shard(shard_engines, Tag) == [1, 0, 0]
@@ -0,0 +1,46 @@
+"""
+Tests for a lean worker start: no login-only imports, no schema work in the
+lifespan, and a clear failure when the database hasn't been migrated.
+"""
+import json
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app import main
+from app.auth import InvalidToken, create_jwt, decode_jwt
+from app.database import missing_tables
+
+
+class TestLazyImports:
+    def test_app_import_skips_login_and_migration_modules(self):
+        code = (
+            "import json, sys; import app.main; "
+            "print(json.dumps([m for m in ('jose', 'requests', 'app.manage') if m in sys.modules]))"
+        )
+        out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+        assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+    def test_jwt_round_trip_and_invalid_token(self):
+        assert decode_jwt(create_jwt(7, "a@example.com"))["sub"] == "7"
+        with pytest.raises(InvalidToken):
+            decode_jwt("not-a-jwt")
+
+    def test_bad_token_is_401(self, client):
+        response = client.get("/my-urls", headers={"Authorization": "Bearer not-a-jwt"})
+        assert response.status_code == 401
+
+
+class TestSchemaCheck:
+    def test_missing_tables(self, tmp_path):
+        empty = create_engine(f"sqlite:///{tmp_path}/empty.db")
+        assert {"users", "urls", "bookmarks"} <= set(missing_tables(empty))
+
+    def test_unmigrated_database_refuses_to_start(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(main, "engine", create_engine(f"sqlite:///{tmp_path}/empty.db"))
+        with pytest.raises(RuntimeError, match="app.manage migrate"):
+            with TestClient(main.app):
+                pass
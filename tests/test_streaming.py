@@ -0,0 +1,64 @@
+"""
+Tests for streamed JSON listings (?stream=true on /my-urls and /bookmarks).
+"""
+import json
+
+import pytest
+
+from app.models import URL
+from app.streaming import json_array
+
+
+class TestJsonArray:
+    def test_chunks_form_one_array(self):
+        closed = []
+        chunks = list(json_array(range(5), str, chunk_size=2, on_close=lambda: closed.append(True)))
+        assert len(chunks) == 3
+        assert json.loads(b"".join(chunks)) == [0, 1, 2, 3, 4]
+        assert closed == [True]
+
+    def test_empty(self):
+        assert b"".join(json_array([], str)) == b"[]"
+
+    def test_closes_when_abandoned(self):
+        closed = []
+        gen = json_array(range(10), str, chunk_size=1, on_close=lambda: closed.append(True))
+        next(gen)
+        gen.close()
+        assert closed == [True]
+
+
+class TestStreamedListings:
+    def test_my_urls_matches_paged(self, client, auth_headers, db_session, test_user):
+        for i in range(12):
+            db_session.add(URL(original_url=f"https://s{i}.com", short_code=f"st{i:03d}", user_id=test_user.id))
+        db_session.commit()
+        paged = client.get("/my-urls", params={"limit": 1000}, headers=auth_headers).json()
+        streamed = client.get("/my-urls", params={"stream": "true"}, headers=auth_headers)
+        assert streamed.headers["content-type"] == "application/json"
+        assert "X-Next-Cursor" not in streamed.headers
+        assert streamed.json() == paged
+
+    def test_stream_from_cursor(self, client, auth_headers, db_session, test_user):
+        for i in range(5):
+            db_session.add(URL(original_url=f"https://c{i}.com", short_code=f"cu{i:03d}", user_id=test_user.id))
+        db_session.commit()
+        first = client.get("/my-urls", params={"limit": 2}, headers=auth_headers)
+        rest = client.get(
+            "/my-urls", params={"stream": "true", "cursor": first.headers["X-Next-Cursor"]}, headers=auth_headers
+        ).json()
+        assert len(rest) == 3
+        assert not {u["short_code"] for u in rest} & {u["short_code"] for u in first.json()}
+
+    def test_bookmarks_with_filters(self, client, auth_headers):
+        client.post("/bookmarks", json={"url": "https://a.org", "title": "Alpha", "tags": ["x"]}, headers=auth_headers)
+        client.post("/bookmarks", json={"url": "https://b.org", "title": "Beta", "tags": ["y"]}, headers=auth_headers)
+        streamed = client.get("/bookmarks", params={"stream": "true", "tag": "x"}, headers=auth_headers).json()
+        assert [b["title"] for b in streamed] == ["Alpha"]
+        assert streamed == client.get("/bookmarks", params={"tag": "x"}, headers=auth_headers).json()
+
+    @pytest.mark.parametrize("path", ["/my-urls", "/bookmarks"])
+    def test_malformed_cursor_is_400(self, client, auth_headers, path):
+        response = client.get(path, params={"stream": "true", "cursor": "garbage"}, headers=auth_headers)
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Malformed cursor"}
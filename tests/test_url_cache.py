@@ -0,0 +1,100 @@
+"""
+Tests for the short-code resolution cache and the redirect endpoint that uses it.
+"""
+from app.cache import TTLCache, MISSING, url_cache
+from app.crud import create_short_url, resolve_url
+from app.models import URL
+from app.schemas import URLCreate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    def test_get_and_set(self):
+        cache = TTLCache(max_size=10, ttl=60)
+        assert cache.get("a") is MISSING
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_caches_none(self):
+        cache = TTLCache(max_size=10, ttl=60)
+        cache.set("gone", None)
+        assert cache.get("gone") is None
+
+    def test_lru_eviction(self):
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+        assert cache.get("b") is MISSING
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = TTLCache(max_size=10, ttl=60, clock=clock)
+        cache.set("a", 1)
+        cache.set("short", 2, ttl=5)
+        clock.now = 10
+        assert cache.get("short") is MISSING
+        assert cache.get("a") == 1
+        clock.now = 61
+        assert cache.get("a") is MISSING
+        assert cache.stats()["expirations"] == 2
+
+    def test_zero_size_disables(self):
+        cache = TTLCache(max_size=0, ttl=60)
+        cache.set("a", 1)
+        assert cache.get("a") is MISSING
+
+
+class TestResolveUrl:
+    def test_second_lookup_is_a_hit(self, db_session):
+        db_url = create_short_url(db_session, URLCreate(original_url="https://example.com"))
+        first = resolve_url(db_session, db_url.short_code)
+        second = resolve_url(db_session, db_url.short_code)
+        assert first == second
+        assert first.original_url == "https://example.com/"
+        assert url_cache.stats()["hits"] == 1
+
+    def test_miss_is_cached_then_invalidated_on_insert(self, db_session):
+        assert resolve_url(db_session, "abc123") is None
+        assert url_cache.get("abc123") is None  # negative entry
+
+        db_session.add(URL(short_code="abc123", original_url="https://late.com/"))
+        db_session.commit()
+
+        assert resolve_url(db_session, "abc123").original_url == "https://late.com/"
+
+    def test_update_invalidates(self, db_session):
+        db_url = create_short_url(db_session, URLCreate(original_url="https://old.com"))
+        resolve_url(db_session, db_url.short_code)
+
+        db_url.original_url = "https://new.com/"
+        db_session.commit()
+
+        assert resolve_url(db_session, db_url.short_code).original_url == "https://new.com/"
+
+
+class TestRedirect:
+    def test_redirect_counts_clicks(self, client):
+        code = client.post("/shorten", json={"original_url": "https://example.com"}).json()["short_code"]
+        for _ in range(3):
+            resp = client.get(f"/{code}")
+            assert resp.status_code == 200
+            assert resp.json() == {"original_url": "https://example.com/"}
+
+        assert client.get(f"/info/{code}").json()["clicks"] == 3
+
+    def test_unknown_code(self, client):
+        assert client.get("/nope42").status_code == 404
+        assert client.get("/nope42").status_code == 404